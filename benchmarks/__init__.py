@@ -0,0 +1 @@
+"""Performance benchmarks for the verification toolkit (not shipped)."""
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""Compare two benchmark result files and flag regressions.
+
+Usage::
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.2
+
+Every duration metric (keys ending in ``_s`` or ``_ms``) present in both
+files is compared; the exit status is non-zero when any metric is slower
+than the baseline by more than ``threshold`` (a fraction).
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+DURATION_SUFFIXES = ("_s", "_ms")
+
+
+def iter_durations(data, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    """Yield ``(dotted.path, value)`` for every duration leaf in ``data``."""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key == "meta":
+                continue
+            path = f"{prefix}.{key}" if prefix else key
+            if isinstance(value, (int, float)) and key.endswith(DURATION_SUFFIXES):
+                yield path, float(value)
+            else:
+                yield from iter_durations(value, path)
+
+
+def compare(baseline: Dict, candidate: Dict, threshold: float) -> list[Tuple[str, float, float, float, bool]]:
+    """Return ``(metric, baseline, candidate, ratio, regressed)`` rows."""
+    base = dict(iter_durations(baseline))
+    rows = []
+    for metric, value in iter_durations(candidate):
+        if metric not in base:
+            continue
+        before = base[metric]
+        ratio = value / before if before else float("inf") if value else 1.0
+        rows.append((metric, before, value, ratio, ratio > 1.0 + threshold))
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare benchmark results")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown fraction (default 0.2)")
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(Path(args.baseline).read_text())
+    candidate = json.loads(Path(args.candidate).read_text())
+    rows = compare(baseline, candidate, args.threshold)
+
+    regressions = 0
+    for metric, before, after, ratio, regressed in rows:
+        marker = "REGRESSION" if regressed else ""
+        regressions += regressed
+        print(f"{metric:<45} {before:10.4f} -> {after:10.4f}  x{ratio:5.2f} {marker}")
+    print(f"\n{len(rows)} metrics compared, {regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
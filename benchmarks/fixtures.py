@@ -0,0 +1,121 @@
+"""Synthetic git repositories for benchmarks.
+
+Repositories are generated with ``git fast-import`` so that even deep
+histories take well under a second to build. Each fixture lives at
+``<root>/<owner>/<project>`` which lets the preparer clone it through
+``LINGXI_GITHUB_GIT_URL=file://<root>``.
+"""
+
+from __future__ import annotations
+
+import random
+import subprocess
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List
+
+
+@dataclass
+class RepoSpec:
+    """Shape of a synthetic repository."""
+
+    owner: str = "bench"
+    project: str = "repo"
+    files: int = 100
+    commits: int = 50
+    file_size: int = 2048
+    files_per_commit: int = 3
+    seed: int = 0
+
+
+@dataclass
+class FixtureRepo:
+    """A generated repository plus the issue → closing commit mapping."""
+
+    spec: RepoSpec
+    path: Path
+    commits: List[str]
+    issues: Dict[int, str] = field(default_factory=dict)
+
+    @property
+    def slug(self) -> str:
+        return f"{self.spec.owner}/{self.spec.project}"
+
+    def issue_url(self, number: int) -> str:
+        return f"https://github.com/{self.spec.owner}/{self.spec.project}/issues/{number}"
+
+
+def _blob(rng: random.Random, size: int) -> bytes:
+    line = "x = {}\n"
+    body = "".join(line.format(rng.randrange(10**9)) for _ in range(max(1, size // 14)))
+    return body.encode()[:size] or b"\n"
+
+
+def _fast_import_stream(spec: RepoSpec) -> bytes:
+    rng = random.Random(spec.seed)
+    chunks: List[bytes] = []
+    paths = [f"pkg/mod_{i // 50}/file_{i}.py" for i in range(spec.files)]
+    timestamp = 1_600_000_000
+    for index in range(spec.commits):
+        if index == 0:
+            touched = paths
+        else:
+            touched = rng.sample(paths, min(spec.files_per_commit, len(paths)))
+        message = f"commit {index}\n".encode()
+        chunks.append(b"commit refs/heads/main\n")
+        chunks.append(f"mark :{index + 1}\n".encode())
+        chunks.append(f"committer Bench <bench@example.com> {timestamp + index} +0000\n".encode())
+        chunks.append(f"data {len(message)}\n".encode() + message)
+        if index:
+            chunks.append(f"from :{index}\n".encode())
+        for path in touched:
+            data = _blob(rng, spec.file_size)
+            chunks.append(f"M 100644 inline {path}\n".encode())
+            chunks.append(f"data {len(data)}\n".encode() + data + b"\n")
+        chunks.append(b"\n")
+    return b"".join(chunks)
+
+
+def make_repo(root: str | Path, spec: RepoSpec) -> FixtureRepo:
+    """Create a repository described by ``spec`` under ``root``."""
+    path = Path(root) / spec.owner / spec.project
+    path.mkdir(parents=True, exist_ok=True)
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    subprocess.run(
+        ["git", "fast-import", "--quiet"],
+        cwd=path,
+        input=_fast_import_stream(spec),
+        check=True,
+    )
+    subprocess.run(["git", "checkout", "-q", "main"], cwd=path, check=True)
+    log = subprocess.run(
+        ["git", "rev-list", "--reverse", "main"],
+        cwd=path,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.split()
+    fixture = FixtureRepo(spec=spec, path=path, commits=log)
+    # Issue N is closed by commit N (counting from the root), so the parent
+    # checkout always exists.
+    for number in range(1, len(log)):
+        fixture.issues[number] = log[number]
+    return fixture
+
+
+def make_repos(root: str | Path, count: int, template: RepoSpec | None = None) -> List[FixtureRepo]:
+    """Create ``count`` repositories sharing the shape of ``template``."""
+    template = template or RepoSpec()
+    repos = []
+    for index in range(count):
+        spec = RepoSpec(
+            owner=template.owner,
+            project=f"{template.project}{index}",
+            files=template.files,
+            commits=template.commits,
+            file_size=template.file_size,
+            files_per_commit=template.files_per_commit,
+            seed=template.seed + index,
+        )
+        repos.append(make_repo(root, spec))
+    return repos
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Import-time regression benchmark.
+
+Each target is imported in a fresh interpreter several times and the median
+wall time is reported. Pass ``--max-ms`` to fail when any target regresses
+past a budget, and ``--output`` to keep machine-readable results.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SRC_PATH = Path(__file__).resolve().parents[1] / "src"
+
+DEFAULT_TARGETS = [
+    "verification_toolkit",
+    "verification_toolkit.batch_workflow",
+    "verification_toolkit.batch_workflow.cli",
+    "verification_toolkit.batch_workflow.runner",
+]
+
+
+def _time_import(target: str) -> float:
+    code = f"import sys; sys.path.insert(0, {str(SRC_PATH)!r}); import {target}"
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", code], check=True)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def measure(targets: list[str], repeat: int) -> dict[str, dict[str, float]]:
+    """Return median/min wall time in milliseconds for importing each target."""
+    baseline = [_time_import("sys") for _ in range(repeat)]
+    results = {"<interpreter>": {"median_ms": statistics.median(baseline), "min_ms": min(baseline)}}
+    for target in targets:
+        samples = [_time_import(target) for _ in range(repeat)]
+        results[target] = {"median_ms": statistics.median(samples), "min_ms": min(samples)}
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("targets", nargs="*", default=DEFAULT_TARGETS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, help="Fail if any median exceeds this budget")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    args = parser.parse_args()
+
+    results = measure(args.targets, args.repeat)
+    for target, stats in results.items():
+        print(f"{stats['median_ms']:8.1f} ms (min {stats['min_ms']:6.1f})  {target}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"import_time": results}, indent=2))
+
+    if args.max_ms is not None:
+        over = [t for t, s in results.items() if s["median_ms"] > args.max_ms]
+        if over:
+            print(f"Over budget ({args.max_ms} ms): {', '.join(over)}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""End-to-end benchmarks against local fixture repos and a stub GitHub API.
+
+Usage::
+
+    python -m benchmarks.run_benchmarks --repos 8 --commits 200 --output bench.json
+
+Synthetic repositories are served over ``file://`` and the issues/events API
+by :class:`~benchmarks.stub_github.StubGitHubServer`, so no network access is
+needed. Results are written as JSON for :mod:`benchmarks.compare`.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from .fixtures import FixtureRepo, RepoSpec, make_repos
+from .stub_github import StubGitHubConfig, StubGitHubServer
+
+SRC_PATH = Path(__file__).resolve().parents[1] / "src"
+
+PREPARE_PHASES = {
+    "_materialise_repository": "clone",
+    "_reset_repository": "reset",
+    "_fetch_issue_description": "issue_api",
+    "_fetch_closing_commit": "events_api",
+}
+
+
+def summarise(samples: List[float]) -> Dict[str, float]:
+    """Return count/mean/p50/p95/max for a list of durations in seconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    return {
+        "count": len(ordered),
+        "mean_s": statistics.fmean(ordered),
+        "p50_s": statistics.median(ordered),
+        "p95_s": ordered[p95_index],
+        "max_s": ordered[-1],
+    }
+
+
+def instrument_preparer(preparer, timings: Dict[str, List[float]]) -> None:
+    """Wrap the preparer's internal steps so each call records its duration."""
+
+    def wrap(name: str, method: Callable) -> Callable:
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timings[name].append(time.perf_counter() - start)
+
+        return timed
+
+    for attr, phase in PREPARE_PHASES.items():
+        setattr(preparer, attr, wrap(phase, getattr(preparer, attr)))
+
+
+def bench_prepare(repos: List[FixtureRepo], runtime_dir: Path, issues_per_repo: int) -> Dict[str, Dict]:
+    """Time ``GitHubIssuePreparer.prepare`` cold (first clone) and warm."""
+    from verification_toolkit.github import GitHubIssuePreparer
+
+    results = {}
+    for label in ("cold", "warm"):
+        timings: Dict[str, List[float]] = defaultdict(list)
+        preparer = GitHubIssuePreparer(runtime_dir=runtime_dir)
+        instrument_preparer(preparer, timings)
+        for repo in repos:
+            for number in list(repo.issues)[:issues_per_repo]:
+                start = time.perf_counter()
+                preparer.prepare(repo.issue_url(number))
+                timings["total"].append(time.perf_counter() - start)
+        results[label] = {phase: summarise(samples) for phase, samples in timings.items()}
+    return results
+
+
+def bench_batch(repos: List[FixtureRepo], runtime_dir: Path, modes: List[str], max_workers: int) -> Dict[str, Dict]:
+    """Time each ``BatchRunner`` mode from a cold runtime directory."""
+    from verification_toolkit.batch_workflow import BatchRunner, JobConfig, Runbook
+
+    # One job per repository: jobs sharing a clone would race on checkout.
+    jobs = [
+        JobConfig(id=f"job-{index}", type="github", agent="demo", issue_url=repo.issue_url(1))
+        for index, repo in enumerate(repos)
+    ]
+    runbook = Runbook(name="benchmark", jobs=jobs, output_dir=str(runtime_dir.parent / "batch_output"))
+
+    results = {}
+    for mode in modes:
+        shutil.rmtree(runtime_dir, ignore_errors=True)
+        runner = BatchRunner(runbook, max_workers=max_workers)
+        start = time.perf_counter()
+        if mode == "sync":
+            report = runner.run_batch_sync()
+        elif mode == "async":
+            report = asyncio.run(runner.run_batch_async())
+        else:
+            report = runner.run_batch_parallel()
+        wall = time.perf_counter() - start
+        results[mode] = {
+            "wall_s": wall,
+            "jobs": report.total_jobs,
+            "failed": report.failed_jobs,
+            "throughput": report.total_jobs / wall if wall else 0.0,
+        }
+    return results
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run verification toolkit benchmarks")
+    parser.add_argument("--repos", type=int, default=4, help="Number of fixture repositories")
+    parser.add_argument("--files", type=int, default=200, help="Files per repository")
+    parser.add_argument("--commits", type=int, default=100, help="History depth per repository")
+    parser.add_argument("--file-size", type=int, default=2048, help="Bytes per generated file")
+    parser.add_argument("--issues-per-repo", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="Stub API latency in seconds")
+    parser.add_argument("--rate-limit", type=int, help="Stub API requests allowed per window")
+    parser.add_argument("--rate-window", type=float, default=60.0)
+    parser.add_argument("--modes", default="sync,async,parallel")
+    parser.add_argument("--max-workers", type=int, default=4)
+    parser.add_argument("--workdir", help="Keep fixtures here instead of a temp dir")
+    parser.add_argument("--output", help="Write JSON results to this path")
+    args = parser.parse_args(argv)
+
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="vt-bench-"))
+    fixtures_dir = workdir / "fixtures"
+    runtime_dir = workdir / "runtime"
+    template = RepoSpec(files=args.files, commits=args.commits, file_size=args.file_size)
+
+    start = time.perf_counter()
+    repos = make_repos(fixtures_dir, args.repos, template)
+    fixture_seconds = time.perf_counter() - start
+
+    stub_config = StubGitHubConfig(latency=args.latency, rate_limit=args.rate_limit, rate_window=args.rate_window)
+    with StubGitHubServer(stub_config) as server:
+        for repo in repos:
+            for number, sha in repo.issues.items():
+                server.add_issue(repo.spec.owner, repo.spec.project, number, f"Synthetic issue {number}", sha)
+
+        # Defaults are read when verification_toolkit.github is first
+        # imported, so point them at the fixtures before importing anything.
+        os.environ["LINGXI_GITHUB_GIT_URL"] = fixtures_dir.as_uri()
+        os.environ["LINGXI_GITHUB_API_URL"] = server.url
+        os.environ["LINGXI_RUNTIME_DIR"] = str(runtime_dir)
+        if str(SRC_PATH) not in sys.path:
+            sys.path.insert(0, str(SRC_PATH))
+
+        prepare = bench_prepare(repos, runtime_dir, args.issues_per_repo)
+        batch = bench_batch(repos, runtime_dir, [m for m in args.modes.split(",") if m], args.max_workers)
+        api = {"requests": server.stats.requests, "rate_limited": server.stats.rate_limited}
+
+    results = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": vars(args),
+            "fixture_build_s": fixture_seconds,
+        },
+        "prepare": prepare,
+        "batch": batch,
+        "api": api,
+    }
+
+    for label, phases in prepare.items():
+        for phase, stats in sorted(phases.items()):
+            if stats.get("count"):
+                print(f"prepare[{label}] {phase:<11} p50 {stats['p50_s'] * 1000:8.1f} ms  p95 {stats['p95_s'] * 1000:8.1f} ms")
+    for mode, stats in batch.items():
+        print(f"batch[{mode:<8}] {stats['wall_s']:7.2f} s  {stats['throughput']:6.2f} jobs/s  failed {stats['failed']}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2, default=str))
+        print(f"Results written to {args.output}")
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
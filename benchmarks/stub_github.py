@@ -0,0 +1,205 @@
+"""Local stand-in for the GitHub issues/events REST API.
+
+Only the endpoints used by :class:`GitHubIssuePreparer` are served:
+
+* ``GET /repos/<owner>/<project>/issues/<n>``
+* ``GET /repos/<owner>/<project>/issues/<n>/events``
+* ``GET /repos/<owner>/<project>/commits/<ref>`` and
+  ``GET /repos/<owner>/<project>/tarball/<ref>`` (redirecting to a
+  codeload-style ``/codeload/<owner>/<project>/tar.gz/<sha>``), for
+  repositories registered with :meth:`StubGitHubServer.add_repository`
+
+Latency and a fixed-window rate limit are configurable so that benchmarks
+can reproduce slow upstreams and quota exhaustion without touching
+github.com.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+import subprocess
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+_ROUTE = re.compile(r"^/repos/([^/]+)/([^/]+)/issues/(\d+)(/events)?/?$")
+_COMMIT_ROUTE = re.compile(r"^/repos/([^/]+)/([^/]+)/(commits|tarball)/([^/]+)$")
+_CODELOAD_ROUTE = re.compile(r"^/codeload/([^/]+)/([^/]+)/tar\.gz/([0-9a-f]+)$")
+
+IssueKey = Tuple[str, str, int]
+
+
+@dataclass
+class StubIssue:
+    body: str
+    closing_commit: Optional[str] = None
+
+
+@dataclass
+class StubGitHubConfig:
+    """Behaviour knobs for :class:`StubGitHubServer`."""
+
+    latency: float = 0.0
+    rate_limit: Optional[int] = None
+    rate_window: float = 60.0
+
+
+@dataclass
+class _Stats:
+    requests: int = 0
+    rate_limited: int = 0
+    tarballs: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class StubGitHubServer:
+    """Threaded HTTP server that serves canned issues and events."""
+
+    def __init__(self, config: StubGitHubConfig | None = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or StubGitHubConfig()
+        self.issues: Dict[IssueKey, StubIssue] = {}
+        self.repositories: Dict[Tuple[str, str], Path] = {}
+        self.stats = _Stats()
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_issue(self, owner: str, project: str, number: int, body: str, closing_commit: Optional[str] = None) -> None:
+        self.issues[(owner, project, int(number))] = StubIssue(body=body, closing_commit=closing_commit)
+
+    def add_repository(self, owner: str, project: str, path: str | Path) -> None:
+        """Serve commits and tarballs of the git repository at ``path``."""
+        self.repositories[(owner, project)] = Path(path)
+
+    def _git(self, owner: str, project: str, *args: str) -> Optional[bytes]:
+        path = self.repositories.get((owner, project))
+        if path is None:
+            return None
+        completed = subprocess.run(["git", *args], cwd=path, capture_output=True)
+        return completed.stdout if completed.returncode == 0 else None
+
+    def start(self) -> "StubGitHubServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-github", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "StubGitHubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _admit(self) -> Tuple[bool, int, float]:
+        """Count a request against the rate-limit window."""
+        with self.stats.lock:
+            self.stats.requests += 1
+            now = time.monotonic()
+            if now - self._window_start >= self.config.rate_window:
+                self._window_start = now
+                self._window_count = 0
+            reset = self._window_start + self.config.rate_window
+            limit = self.config.rate_limit
+            if limit is None:
+                return True, -1, reset
+            if self._window_count >= limit:
+                self.stats.rate_limited += 1
+                return False, 0, reset
+            self._window_count += 1
+            return True, limit - self._window_count, reset
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):  # noqa: A002 - silence default logging
+                pass
+
+            def _send(self, status: int, payload, remaining: int, reset: float) -> None:
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                if server.config.rate_limit is not None:
+                    self.send_header("X-RateLimit-Limit", str(server.config.rate_limit))
+                    self.send_header("X-RateLimit-Remaining", str(remaining))
+                    reset_epoch = time.time() + max(0.0, reset - time.monotonic())
+                    self.send_header("X-RateLimit-Reset", str(int(reset_epoch)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):  # noqa: N802 - http.server API
+                if server.config.latency:
+                    time.sleep(server.config.latency)
+                allowed, remaining, reset = server._admit()
+                if not allowed:
+                    self._send(403, {"message": "API rate limit exceeded"}, remaining, reset)
+                    return
+                path = self.path.split("?", 1)[0]
+                if _COMMIT_ROUTE.match(path) or _CODELOAD_ROUTE.match(path):
+                    self._repository(path, remaining, reset)
+                    return
+                match = _ROUTE.match(path)
+                if not match:
+                    self._send(404, {"message": "Not Found"}, remaining, reset)
+                    return
+                owner, project, number, events = match.groups()
+                issue = server.issues.get((owner, project, int(number)))
+                if issue is None:
+                    self._send(404, {"message": "Not Found"}, remaining, reset)
+                elif events:
+                    payload = []
+                    if issue.closing_commit:
+                        payload.append({"event": "closed", "commit_id": issue.closing_commit})
+                    self._send(200, payload, remaining, reset)
+                else:
+                    self._send(200, {"number": int(number), "body": issue.body}, remaining, reset)
+
+            def _repository(self, path: str, remaining: int, reset: float) -> None:
+                match = _CODELOAD_ROUTE.match(path)
+                if match:
+                    owner, project, sha = match.groups()
+                    data = server._git(
+                        owner, project, "archive", "--format=tar.gz", f"--prefix={owner}-{project}-{sha[:7]}/", sha
+                    )
+                    if data is None:
+                        self._send(404, {"message": "Not Found"}, remaining, reset)
+                        return
+                    with server.stats.lock:
+                        server.stats.tarballs += 1
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/x-gzip")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                owner, project, kind, ref = _COMMIT_ROUTE.match(path).groups()
+                out = server._git(owner, project, "rev-list", "--parents", "-n", "1", ref, "--")
+                if out is None:
+                    self._send(404, {"message": "Not Found"}, remaining, reset)
+                elif kind == "commits":
+                    sha, *parents = out.decode().split()
+                    self._send(200, {"sha": sha, "parents": [{"sha": p} for p in parents]}, remaining, reset)
+                else:
+                    self.send_response(302)
+                    self.send_header("Location", f"/codeload/{owner}/{project}/tar.gz/{out.split()[0].decode()}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+
+        return Handler
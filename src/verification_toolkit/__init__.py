@@ -1,15 +1,50 @@
-"""Public API for the verification toolkit."""
+"""Public API for the verification toolkit.
 
-from .interfaces import EvaluationResult, VerificationAgent, RepositoryContext
-from .github import GitHubEvaluationRunner, GitHubIssueContext, GitHubIssuePreparer
-from . import batch_workflow
+Attributes are resolved lazily (PEP 562) so that importing the package does
+not pull in ``requests``, GitPython or the batch workflow until they are used.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+from .interfaces import AsyncVerificationAgent, EvaluationResult, VerificationAgent, RepositoryContext, is_async_agent
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type checkers only
+    from . import batch_workflow
+    from .github import GitHubEvaluationRunner, GitHubIssueContext, GitHubIssuePreparer
+
+_LAZY_ATTRS = {
+    "GitHubIssueContext": ".github",
+    "GitHubIssuePreparer": ".github",
+    "GitHubEvaluationRunner": ".github",
+}
+_LAZY_MODULES = {"batch_workflow"}
 
 __all__ = [
     "EvaluationResult",
     "VerificationAgent",
+    "AsyncVerificationAgent",
+    "is_async_agent",
     "RepositoryContext",
     "GitHubIssueContext",
     "GitHubIssuePreparer",
     "GitHubEvaluationRunner",
     "batch_workflow",
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name in _LAZY_MODULES:
+        value: Any = importlib.import_module(f".{name}", __name__)
+    elif name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name], __name__), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,9 +1,34 @@
-"""Batch workflow for running verification agents across multiple issues."""
+"""Batch workflow for running verification agents across multiple issues.
 
-from .config import Runbook, JobConfig, load_runbook
-from .executor import JobExecutor
-from .runner import BatchRunner
-from .report import BatchReport, JobResult
+Public names are resolved lazily (PEP 562) so ``batch-workflow --help`` and
+worker processes only import the modules they actually touch.
+"""
+
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type checkers only
+    from verification_toolkit.cancellation import CancellationToken, JobCancelled, JobTimeoutError
+
+    from .config import Runbook, JobConfig, load_runbook
+    from .executor import JobExecutor
+    from .runner import BatchRunner
+    from .report import BatchReport, JobResult
+
+_LAZY_ATTRS = {
+    "Runbook": ".config",
+    "JobConfig": ".config",
+    "load_runbook": ".config",
+    "JobExecutor": ".executor",
+    "BatchRunner": ".runner",
+    "BatchReport": ".report",
+    "JobResult": ".report",
+    "CancellationToken": ".cancellation",
+    "JobCancelled": ".cancellation",
+    "JobTimeoutError": ".cancellation",
+}
 
 __all__ = [
     "Runbook",
@@ -12,5 +37,21 @@ __all__ = [
     "JobExecutor",
     "BatchRunner",
     "BatchReport",
-    "JobResult"
-]
\ No newline at end of file
+    "JobResult",
+    "CancellationToken",
+    "JobCancelled",
+    "JobTimeoutError",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
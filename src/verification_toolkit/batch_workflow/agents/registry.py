@@ -4,7 +4,7 @@ from __future__ import annotations
 
 from typing import Dict, Type
 
-from verification_toolkit import VerificationAgent
+from verification_toolkit.interfaces import AnyVerificationAgent, is_async_agent
 from verification_toolkit.demo_agent import DemoVerificationAgent
 
 
@@ -12,23 +12,29 @@ class AgentRegistry:
     """Registry for verification agents."""
 
     def __init__(self):
-        self._agents: Dict[str, Type[VerificationAgent]] = {}
+        self._agents: Dict[str, Type[AnyVerificationAgent]] = {}
         self._register_defaults()
 
     def _register_defaults(self):
         """Register built-in agents."""
         self.register("demo", DemoVerificationAgent)
 
-    def register(self, name: str, agent_class: Type[VerificationAgent]) -> None:
+    def register(self, name: str, agent_class: Type[AnyVerificationAgent]) -> None:
         """Register an agent class."""
         self._agents[name] = agent_class
 
-    def get_agent(self, name: str, **kwargs) -> VerificationAgent:
+    def get_agent(self, name: str, **kwargs) -> AnyVerificationAgent:
         """Get an agent instance by name."""
         if name not in self._agents:
             raise ValueError(f"Unknown agent: {name}")
         return self._agents[name](**kwargs)
 
+    def is_async(self, name: str) -> bool:
+        """Whether the agent registered as ``name`` is an ``AsyncVerificationAgent``."""
+        if name not in self._agents:
+            raise ValueError(f"Unknown agent: {name}")
+        return is_async_agent(self._agents[name])
+
     def list_agents(self) -> list[str]:
         """List registered agent names."""
         return list(self._agents.keys())
@@ -38,11 +44,16 @@ class AgentRegistry:
 _registry = AgentRegistry()
 
 
-def get_agent(name: str, **kwargs) -> VerificationAgent:
+def get_agent(name: str, **kwargs) -> AnyVerificationAgent:
     """Get an agent instance from the global registry."""
     return _registry.get_agent(name, **kwargs)
 
 
-def register_agent(name: str, agent_class: Type[VerificationAgent]) -> None:
+def is_async(name: str) -> bool:
+    """Whether the globally registered agent ``name`` is asynchronous."""
+    return _registry.is_async(name)
+
+
+def register_agent(name: str, agent_class: Type[AnyVerificationAgent]) -> None:
     """Register an agent in the global registry."""
     _registry.register(name, agent_class)
\ No newline at end of file
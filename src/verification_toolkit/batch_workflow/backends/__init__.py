@@ -0,0 +1,5 @@
+"""Execution backends that run commands for verification agents."""
+
+from .local import ExecutionResult, LocalExecutionBackend
+
+__all__ = ["ExecutionResult", "LocalExecutionBackend"]
@@ -0,0 +1,261 @@
+"""Local execution backend: run test commands on the host, sharded.
+
+:class:`LocalExecutionBackend` splits a list of test files into shards
+balanced by the durations seen in earlier runs, runs each shard as its own
+subprocess, and streams their output to log files instead of memory. Shards
+beyond the first only start when the process-wide :class:`CpuBudget` has
+free slots, so a batch of jobs never oversubscribes the machine.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import os
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence
+
+from ..cancellation import JobCancelled, current_token, run_process
+from ..resources import CpuBudget, shared_cpu_budget
+
+LOGGER = logging.getLogger(__name__)
+# pytest's exit code for "no tests collected", e.g. a shard of helper-only files.
+NO_TESTS_COLLECTED = 5
+DEFAULT_DURATION = 1.0
+
+_LOG_DIR: contextvars.ContextVar[Optional[Path]] = contextvars.ContextVar(
+    "verification_toolkit_log_dir", default=None
+)
+
+
+def current_log_dir() -> Optional[Path]:
+    """Directory for the running job's logs, set by the batch runner."""
+    return _LOG_DIR.get()
+
+
+@contextmanager
+def use_log_dir(path: Optional[Path]) -> Iterator[None]:
+    reset = _LOG_DIR.set(path)
+    try:
+        yield
+    finally:
+        _LOG_DIR.reset(reset)
+
+
+def tail(path: Path, lines: int, chunk: int = 65536) -> List[str]:
+    """Last ``lines`` lines of a (possibly large) text file."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - chunk))
+        return f.read().decode("utf-8", "replace").splitlines()[-lines:]
+
+
+@dataclass
+class ShardResult:
+    index: int
+    tests: List[str]
+    returncode: int
+    duration: float
+    log_path: Path
+    timed_out: bool = False
+
+
+@dataclass
+class ExecutionResult:
+    """Outcome of a (possibly sharded) test command."""
+
+    returncode: int
+    shards: List[ShardResult] = field(default_factory=list)
+
+    @property
+    def timed_out(self) -> bool:
+        return any(shard.timed_out for shard in self.shards)
+
+    @property
+    def log_paths(self) -> List[str]:
+        return [str(shard.log_path) for shard in self.shards]
+
+    def output_tail(self, lines: int) -> List[str]:
+        """The end of every shard's log, failing shards first."""
+        out: List[str] = []
+        for shard in sorted(self.shards, key=lambda s: s.returncode in (0, NO_TESTS_COLLECTED)):
+            out.append(f"--- shard {shard.index} (exit {shard.returncode}, {shard.duration:.1f}s): {shard.log_path}")
+            out.extend(tail(shard.log_path, lines))
+        return out
+
+
+class DurationHistory:
+    """Per-test-file durations from earlier runs, stored as JSON.
+
+    Commands report one duration per shard, so each shard's wall time is
+    split across its files in proportion to their previous estimates and
+    blended into the history. Estimates converge over repeated runs without
+    needing anything from the test runner.
+    """
+
+    smoothing = 0.5
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self.durations: Dict[str, float] = self._load() if path else {}
+        self._updates: Dict[str, float] = {}
+
+    def _load(self) -> Dict[str, float]:
+        try:
+            return {str(k): float(v) for k, v in json.loads(self.path.read_text(encoding="utf-8")).items()}
+        except (OSError, ValueError, AttributeError):
+            return {}
+
+    def estimates(self, tests: Sequence[str]) -> Dict[str, float]:
+        known = [self.durations[t] for t in tests if t in self.durations]
+        default = statistics.median(known) if known else DEFAULT_DURATION
+        return {t: self.durations.get(t, default) for t in tests}
+
+    def record(self, tests: Sequence[str], estimates: Dict[str, float], elapsed: float) -> None:
+        total = sum(estimates[t] for t in tests) or 1.0
+        for test in tests:
+            observed = elapsed * estimates[test] / total
+            previous = self.durations.get(test)
+            value = observed if previous is None else previous + self.smoothing * (observed - previous)
+            self.durations[test] = self._updates[test] = value
+
+    def save(self) -> None:
+        if not self.path or not self._updates:
+            return
+        try:
+            # Merge with what other jobs wrote since we loaded.
+            merged = {**self._load(), **self._updates}
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}-{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(merged, sort_keys=True), encoding="utf-8")
+            tmp.replace(self.path)
+        except OSError as exc:
+            LOGGER.warning("Unable to save test durations to %s: %s", self.path, exc)
+
+
+def plan_shards(tests: Sequence[str], estimates: Dict[str, float], count: int) -> List[List[str]]:
+    """Split ``tests`` into at most ``count`` shards of similar total duration.
+
+    Longest-processing-time-first: each file, slowest first, goes to the
+    currently lightest shard. Files keep their original order within a shard.
+    """
+    count = max(1, min(count, len(tests)))
+    loads = [0.0] * count
+    assignment: Dict[str, int] = {}
+    for test in sorted(tests, key=lambda t: estimates[t], reverse=True):
+        shard = loads.index(min(loads))
+        assignment[test] = shard
+        loads[shard] += estimates[test]
+    return [[t for t in tests if assignment[t] == shard] for shard in range(count)]
+
+
+def default_history_path(repo_path: str | os.PathLike[str]) -> Optional[Path]:
+    """``<git dir>/lingxi/test-durations.json``, kept alongside the clone."""
+    try:
+        completed = run_process(
+            ["git", "rev-parse", "--git-dir"], cwd=str(repo_path), capture_output=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return Path(repo_path, completed.stdout.decode().strip()) / "lingxi" / "test-durations.json"
+
+
+class LocalExecutionBackend:
+    """Runs a test command on the host, sharded across free CPU slots."""
+
+    def __init__(
+        self,
+        cpu_budget: Optional[CpuBudget] = None,
+        log_dir: Optional[str | os.PathLike[str]] = None,
+        max_shards: Optional[int] = None,
+    ):
+        self.cpu_budget = cpu_budget or shared_cpu_budget()
+        self.log_dir = Path(log_dir) if log_dir else None
+        self.max_shards = max_shards
+
+    def run(
+        self,
+        command: Sequence[str],
+        tests: Sequence[str],
+        cwd: str | os.PathLike[str],
+        timeout: Optional[float] = None,
+        shards: Optional[int] = None,
+        history_path: Optional[Path] = None,
+        env: Optional[Dict[str, str]] = None,
+    ) -> ExecutionResult:
+        """Run ``command + shard`` for each shard of ``tests`` in ``cwd``.
+
+        An empty ``tests`` runs ``command`` once as given. ``shards`` caps the
+        number of processes (default: ``max_shards``, else as many as the CPU
+        budget allows). Raises :class:`JobCancelled` if the job is cancelled.
+        """
+        log_dir = self.log_dir or current_log_dir() or Path(tempfile.mkdtemp(prefix="lingxi-test-logs-"))
+        log_dir.mkdir(parents=True, exist_ok=True)
+        tests = list(tests)
+        wanted = min(shards or self.max_shards or self.cpu_budget.capacity, max(1, len(tests)))
+        # The job's own slot runs the first shard; further shards need free slots.
+        extra = self.cpu_budget.try_acquire(wanted - 1)
+        try:
+            history = DurationHistory(history_path or (default_history_path(cwd) if len(tests) > 1 else None))
+            estimates = history.estimates(tests)
+            groups = plan_shards(tests, estimates, 1 + extra) if tests else [[]]
+            token = current_token()
+            deadline = None if timeout is None else time.monotonic() + timeout
+
+            def run_shard(index: int, group: List[str]) -> ShardResult:
+                log_path = log_dir / f"shard-{index}.log"
+                args = list(command) + group
+                start = time.monotonic()
+                timed_out = False
+                with open(log_path, "wb") as log:
+                    log.write(("$ " + " ".join(args) + "\n").encode("utf-8"))
+                    log.flush()
+                    remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                    try:
+                        returncode = run_process(
+                            args, cwd=str(cwd), timeout=remaining, token=token, env=env,
+                            stdout=log, stderr=subprocess.STDOUT,
+                        ).returncode
+                    except subprocess.TimeoutExpired:
+                        returncode, timed_out = -9, True
+                return ShardResult(index, group, returncode, time.monotonic() - start, log_path, timed_out)
+
+            if len(groups) == 1:
+                results = [run_shard(0, groups[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="test-shard") as pool:
+                    futures = [pool.submit(run_shard, i, group) for i, group in enumerate(groups)]
+                    results = []
+                    cancelled: Optional[JobCancelled] = None
+                    for future in futures:
+                        try:
+                            results.append(future.result())
+                        except JobCancelled as exc:
+                            cancelled = exc
+                    if cancelled is not None:
+                        raise cancelled
+        finally:
+            self.cpu_budget.release(extra)
+
+        for shard in results:
+            if shard.tests and not shard.timed_out:
+                history.record(shard.tests, estimates, shard.duration)
+        history.save()
+        return ExecutionResult(returncode=combine_returncodes([s.returncode for s in results]), shards=results)
+
+
+def combine_returncodes(returncodes: Sequence[int]) -> int:
+    """First real failure; a shard that collected no tests only counts if all did."""
+    failures = [code for code in returncodes if code not in (0, NO_TESTS_COLLECTED)]
+    if failures:
+        return failures[0]
+    return NO_TESTS_COLLECTED if all(code == NO_TESTS_COLLECTED for code in returncodes) else 0
@@ -0,0 +1,21 @@
+"""Cancellation for batch jobs; see :mod:`verification_toolkit.cancellation`."""
+
+from verification_toolkit.cancellation import (
+    CancellationToken,
+    JobCancelled,
+    JobTimeoutError,
+    current_token,
+    kill_process,
+    run_process,
+    use_token,
+)
+
+__all__ = [
+    "CancellationToken",
+    "JobCancelled",
+    "JobTimeoutError",
+    "current_token",
+    "kill_process",
+    "run_process",
+    "use_token",
+]
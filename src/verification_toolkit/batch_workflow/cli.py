@@ -2,16 +2,24 @@
 """CLI for running batch verification workflows."""
 
 import argparse
+import contextlib
 import sys
 from pathlib import Path
 
-from .config import load_runbook
-from .runner import BatchRunner
 
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Subcommands are dispatched by name so that the original
+    # ``batch-workflow <runbook>`` form keeps working unchanged.
+    if argv and argv[0] in COMMANDS:
+        return COMMANDS[argv[0]](argv[1:])
+    return run_main(argv)
 
-def main():
+
+def run_main(argv):
     parser = argparse.ArgumentParser(
-        description="Run batch verification workflows"
+        description="Run batch verification workflows",
+        epilog="Other commands: " + ", ".join(sorted(COMMANDS)) + " (see '<command> --help')",
     )
     parser.add_argument(
         "runbook_path",
@@ -33,8 +41,91 @@ def main():
         "--output",
         help="Output file for the report (optional)"
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write results.jsonl, results.csv, summary.json and per-job files "
+             "to the runbook output_dir as jobs finish"
+    )
+    parser.add_argument(
+        "--shard",
+        help="Run only shard i of N ('i/N', 0-based); results go to "
+             "<output_dir>/shard-i-of-N"
+    )
+    parser.add_argument(
+        "--shard-by",
+        choices=["job", "repo"],
+        default="job",
+        help="Hash jobs by ID, or by repository so a repo's jobs share a node (default: job)"
+    )
+    parser.add_argument(
+        "--db",
+        help="Record the run in this SQLite run database"
+    )
+    parser.add_argument(
+        "--order",
+        choices=["file", "longest-first", "shortest-first"],
+        help="Start jobs in runbook order, longest expected first (shorter batches) "
+             "or shortest first (faster feedback); overrides the runbook"
+    )
+    parser.add_argument(
+        "--history",
+        action="append",
+        default=[],
+        help="Past report JSON or results.jsonl to learn job durations from "
+             "(repeatable; --db is also used when it already exists)"
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Show a live progress line (done, failures, throughput, ETA) on stderr"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help="Rewrite Prometheus metrics to this file while the batch runs"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        help="Serve Prometheus metrics at http://127.0.0.1:<port>/metrics while the batch runs"
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=5.0,
+        help="Seconds between metrics file and progress updates (default: 5)"
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Duplicate straggler jobs on idle workers in parallel mode"
+    )
+    parser.add_argument(
+        "--job-timeout",
+        type=float,
+        help="Seconds each job may run before it is killed (overrides the runbook)"
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="Wall-clock seconds for the whole batch (overrides the runbook)"
+    )
+    parser.add_argument(
+        "--max-failures",
+        type=int,
+        help="Stop scheduling jobs after this many failures (overrides the runbook)"
+    )
+    parser.add_argument(
+        "--max-failure-rate",
+        type=float,
+        help="Stop once the failure percentage exceeds this value (overrides the runbook)"
+    )
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+
+    # Imported after argument parsing so ``--help`` and usage errors stay fast.
+    from .config import load_runbook
+    from .runner import BatchRunner
 
     # Load runbook
     try:
@@ -43,18 +134,89 @@ def main():
         print(f"Error loading runbook: {e}", file=sys.stderr)
         sys.exit(1)
 
+    if args.shard:
+        from .sharding import parse_shard_spec, shard_runbook
+        try:
+            shard_index, shard_count = parse_shard_spec(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+        total = len(runbook.jobs)
+        runbook = shard_runbook(runbook, shard_index, shard_count, repo_affinity=args.shard_by == "repo")
+        print(f"Shard {shard_index}/{shard_count}: {len(runbook.jobs)} of {total} jobs")
+
+    if args.hedge:
+        runbook.hedge = True
+    if args.job_timeout is not None:
+        runbook.job_timeout = args.job_timeout
+        for job in runbook.jobs:
+            job.timeout = args.job_timeout
+    if args.deadline is not None:
+        runbook.deadline = args.deadline
+    if args.max_failures is not None:
+        runbook.max_failures = args.max_failures
+    if args.max_failure_rate is not None:
+        runbook.max_failure_rate = args.max_failure_rate
+    if args.order:
+        runbook.order = args.order
+    if args.history:
+        runbook.history = [*(runbook.history or []), *args.history]
+
+    durations = None
+    if runbook.order != "file":
+        from .ordering import DurationEstimator
+        try:
+            durations = DurationEstimator.from_reports(runbook.history or [])
+        except (OSError, ValueError) as e:
+            print(f"Error loading history: {e}", file=sys.stderr)
+            sys.exit(1)
+        if args.db and Path(args.db).exists():
+            from .store import RunStore
+            with RunStore(args.db) as store:
+                durations.add_store(store)
+
+    sinks = []
+    if args.stream:
+        from .report import default_sinks
+        sinks = default_sinks(runbook.output_dir, runbook_name=runbook.name, total_jobs=len(runbook.jobs))
+        print(f"Streaming results to: {runbook.output_dir}")
+    elif args.shard:
+        # Shards always keep a journal so that 'merge' can combine them.
+        from .report import JsonlSink
+        sinks.append(JsonlSink(Path(runbook.output_dir) / "results.jsonl"))
+    if args.db:
+        from .store import SqliteResultSink
+        sinks.append(SqliteResultSink(args.db, runbook.name, metadata={"runbook": args.runbook_path}))
+
+    metrics = None
+    telemetry = contextlib.ExitStack()
+    if args.progress or args.metrics_file or args.metrics_port is not None:
+        from .metrics import BatchMetrics, MetricsReporter, serve_metrics
+        metrics = BatchMetrics(len(runbook.jobs), args.max_workers)
+        if args.metrics_port is not None:
+            server = serve_metrics(metrics, args.metrics_port)
+            telemetry.callback(server.server_close)
+            telemetry.callback(server.shutdown)
+            print(f"Metrics at: http://127.0.0.1:{server.server_address[1]}/metrics")
+        telemetry.enter_context(MetricsReporter(
+            metrics,
+            path=args.metrics_file,
+            progress=sys.stderr if args.progress else None,
+            interval=args.metrics_interval,
+        ))
+
     # Create runner
-    runner = BatchRunner(runbook, max_workers=args.max_workers)
+    runner = BatchRunner(runbook, max_workers=args.max_workers, sinks=sinks, durations=durations, metrics=metrics)
 
     # Run batch
     try:
-        if args.mode == "sync":
-            report = runner.run_batch_sync()
-        elif args.mode == "async":
-            import asyncio
-            report = asyncio.run(runner.run_batch_async())
-        else:  # parallel
-            report = runner.run_batch_parallel()
+        with telemetry:
+            if args.mode == "sync":
+                report = runner.run_batch_sync()
+            elif args.mode == "async":
+                import asyncio
+                report = asyncio.run(runner.run_batch_async())
+            else:  # parallel
+                report = runner.run_batch_parallel()
     except Exception as e:
         print(f"Error running batch: {e}", file=sys.stderr)
         sys.exit(1)
@@ -64,17 +226,279 @@ def main():
 
     # Save report if requested
     if args.output:
-        import json
-        from dataclasses import asdict
+        report.write_json(args.output)
+        print(f"\nReport saved to: {args.output}")
+
+
+def db_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="batch-workflow db",
+        description="Query a SQLite run database"
+    )
+    parser.add_argument("db_path", help="Path to the run database")
+    queries = parser.add_subparsers(dest="query", required=True)
+    runs = queries.add_parser("runs", help="List recent runs")
+    runs.add_argument("--name", help="Only runs of this runbook")
+    runs.add_argument("--limit", type=int, default=20)
+    regressions = queries.add_parser("regressions", help="Jobs that passed in run A but not in run B")
+    regressions.add_argument("run_a", type=int)
+    regressions.add_argument("run_b", type=int)
+    slowest = queries.add_parser("slowest-repos", help="Repositories ordered by mean phase time")
+    slowest.add_argument("--phase", default="prepare")
+    slowest.add_argument("--run", type=int, help="Restrict to one run")
+    slowest.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
 
-        output_data = asdict(report)
-        # Convert dataclasses to dicts
-        output_data["results"] = [asdict(r) for r in report.results]
+    from .store import RunStore
 
-        with open(args.output, 'w') as f:
-            json.dump(output_data, f, indent=2, default=str)
+    with RunStore(args.db_path) as store:
+        if args.query == "runs":
+            for row in store.runs(name=args.name, limit=args.limit):
+                print(f"{row['run_id']:>6}  {row['name']}  jobs={row['total_jobs']} "
+                      f"ok={row['successful_jobs']} failed={row['failed_jobs']}")
+        elif args.query == "regressions":
+            rows = store.regressions(args.run_a, args.run_b)
+            for row in rows:
+                print(f"{row['job_id']}  {row['repo']}  {row['status']}  {row['error'] or ''}")
+            print(f"{len(rows)} regression(s) between run {args.run_a} and run {args.run_b}")
+        else:
+            for row in store.slowest_repos(phase=args.phase, limit=args.limit, run_id=args.run):
+                print(f"{row['mean_seconds']:9.2f}s mean  {row['max_seconds']:9.2f}s max  "
+                      f"{row['jobs']:>5} jobs  {row['repo']}")
+
+
+def merge_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="batch-workflow merge",
+        description="Merge shard journals (results.jsonl) into one report"
+    )
+    parser.add_argument(
+        "journals",
+        nargs="+",
+        help="Journal files, or directories searched for shard-*/results.jsonl"
+    )
+    parser.add_argument(
+        "--runbook",
+        help="Runbook the shards came from; orders results and reports missing jobs"
+    )
+    parser.add_argument("--name", help="Report name (default: the runbook's name)")
+    parser.add_argument("--output", help="Write the merged report as JSON")
+    parser.add_argument("--quiet", action="store_true", help="Only print the totals")
+    args = parser.parse_args(argv)
+
+    from .report import merge_journals
+
+    paths = []
+    for journal in args.journals:
+        path = Path(journal)
+        if path.is_dir():
+            paths.extend(sorted(path.glob("shard-*/results.jsonl")) or sorted(path.glob("results.jsonl")))
+        else:
+            paths.append(path)
+    if not paths:
+        print("No journals found", file=sys.stderr)
+        sys.exit(1)
+
+    expected_job_ids = None
+    name = args.name or "merged"
+    if args.runbook:
+        from .config import load_runbook
+        runbook = load_runbook(Path(args.runbook))
+        expected_job_ids = [job.id for job in runbook.jobs]
+        name = args.name or runbook.name
+
+    report = merge_journals(paths, runbook_name=name, expected_job_ids=expected_job_ids)
+    if args.quiet:
+        print(f"{report.total_jobs} jobs, {report.successful_jobs} successful, {report.failed_jobs} failed "
+              f"from {len(paths)} journal(s)")
+    else:
+        report.print_summary()
+    if args.output:
+        report.write_json(args.output)
         print(f"\nReport saved to: {args.output}")
 
 
+def queue_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="batch-workflow queue",
+        description="Load and inspect a work queue shared by 'batch-workflow worker' processes"
+    )
+    parser.add_argument("queue", help="Queue location: a SQLite file path or <scheme>://<location>")
+    actions = parser.add_subparsers(dest="action", required=True)
+    load = actions.add_parser("load", help="Add a runbook's jobs to the queue")
+    load.add_argument("runbook_path", help="Path to the runbook YAML file")
+    actions.add_parser("status", help="Show how many jobs are pending, leased and done")
+    report = actions.add_parser("report", help="Summarise the results stored in the queue")
+    report.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    from .queue import open_queue, queue_report
+
+    queue = open_queue(args.queue)
+    try:
+        if args.action == "load":
+            from .config import load_runbook
+            runbook = load_runbook(Path(args.runbook_path))
+            added = queue.load(runbook)
+            print(f"Queued {added} new job(s) of {len(runbook.jobs)} from {runbook.name}")
+        elif args.action == "status":
+            counts = queue.counts()
+            print("  ".join(f"{state}={count}" for state, count in counts.items()))
+        else:
+            report = queue_report(queue)
+            report.print_summary()
+            if args.output:
+                report.write_json(args.output)
+                print(f"\nReport saved to: {args.output}")
+    finally:
+        queue.close()
+
+
+def worker_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="batch-workflow worker",
+        description="Pull jobs from a work queue and run them until it is drained"
+    )
+    parser.add_argument("queue", help="Queue location: a SQLite file path or <scheme>://<location>")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=1,
+        help="Jobs to run at once in this worker (default: 1)"
+    )
+    parser.add_argument(
+        "--lease",
+        type=float,
+        default=120.0,
+        help="Seconds a claimed job stays leased without a heartbeat (default: 120)"
+    )
+    parser.add_argument("--worker-id", help="Name recorded on leases (default: <hostname>-<pid>)")
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="Keep polling for new jobs instead of exiting when the queue is drained"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Also write this worker's results to <output_dir>/worker-<id>"
+    )
+    args = parser.parse_args(argv)
+
+    from .queue import QueueWorker, default_worker_id, open_queue
+
+    queue = open_queue(args.queue)
+    worker_id = args.worker_id or default_worker_id()
+    sinks = []
+    if args.stream:
+        from .report import default_sinks
+        output_dir = Path(queue.runbook().output_dir) / f"worker-{worker_id}"
+        sinks = default_sinks(str(output_dir), runbook_name=queue.runbook().name)
+        print(f"Streaming results to: {output_dir}")
+    worker = QueueWorker(
+        queue,
+        worker_id=worker_id,
+        max_workers=args.max_workers,
+        lease_seconds=args.lease,
+        wait_for_jobs=args.wait,
+        sinks=sinks,
+    )
+    try:
+        processed = worker.run()
+    except KeyboardInterrupt:
+        worker.stop()
+        processed = worker.processed
+    finally:
+        queue.close()
+    print(f"Worker {worker_id} finished {processed} job(s)")
+
+
+def serve_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="batch-workflow serve",
+        description="Run a daemon that keeps preparers and agents warm and runs submitted runbooks"
+    )
+    parser.add_argument("--socket", help="Unix socket to listen on (default: ~/.lingxi/batch-workflow.sock)")
+    parser.add_argument("--port", type=int, help="Listen on localhost HTTP at this port instead of a socket")
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=4,
+        help="Maximum jobs run at once per submission (default: 4)"
+    )
+    parser.add_argument("--db", help="Record every submission in this SQLite run database")
+    args = parser.parse_args(argv)
+
+    from .daemon import BatchDaemon, make_server
+
+    daemon = BatchDaemon(max_workers=args.max_workers, db_path=args.db)
+    try:
+        server = make_server(daemon, socket_path=args.socket, port=args.port)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"Error starting daemon: {e}", file=sys.stderr)
+        sys.exit(1)
+    address = server.server_address
+    where = f"http://{address[0]}:{address[1]}" if isinstance(address, tuple) else address
+    print(f"Listening on {where}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if not isinstance(address, tuple):
+            Path(address).unlink(missing_ok=True)
+
+
+def submit_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="batch-workflow submit",
+        description="Run a runbook on a 'batch-workflow serve' daemon and stream its results"
+    )
+    parser.add_argument("runbook_path", help="Path to the runbook YAML or JSON file")
+    parser.add_argument(
+        "--daemon",
+        help="Daemon socket path or http://host:port (default: ~/.lingxi/batch-workflow.sock)"
+    )
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    args = parser.parse_args(argv)
+
+    from .config import load_runbook
+    from .daemon import submit
+
+    try:
+        runbook = load_runbook(Path(args.runbook_path))
+    except Exception as e:
+        print(f"Error loading runbook: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        for line in submit(runbook.to_dict(), target=args.daemon):
+            if line["type"] == "result" and not args.quiet:
+                duration = f"{line['duration']:.2f}s" if line.get("duration") is not None else "-"
+                print(f"{line['status']:<9} {duration:>9}  {line['job_id']}  {line.get('error') or ''}")
+            elif line["type"] == "summary":
+                print(f"{line['total_jobs']} jobs, {line['successful_jobs']} successful, "
+                      f"{line['failed_jobs']} failed ({line['success_rate']:.1f}%)")
+                if line.get("stopped_reason"):
+                    print(f"Stopped early: {line['stopped_reason']}")
+            elif line["type"] == "error":
+                print(f"Error running batch: {line['error']}", file=sys.stderr)
+                sys.exit(1)
+    except (OSError, RuntimeError) as e:
+        print(f"Error submitting to daemon: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+COMMANDS = {
+    "db": db_main,
+    "merge": merge_main,
+    "queue": queue_main,
+    "serve": serve_main,
+    "submit": submit_main,
+    "worker": worker_main,
+}
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -7,7 +7,10 @@ from dataclasses import dataclass
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
-import yaml
+from .resources import ResourceRequest
+
+WORKSPACE_MODES = ("clone", "archive")
+JOB_ORDERS = ("file", "longest-first", "shortest-first")
 
 
 @dataclass
@@ -29,7 +32,23 @@ class JobConfig:
     extra: Optional[Dict[str, Any]] = None
     agent_kwargs: Optional[Dict[str, Any]] = None
 
+    # Time budgets in seconds (None = unlimited, or inherit from the runbook)
+    timeout: Optional[float] = None
+    prepare_timeout: Optional[float] = None
+    verify_timeout: Optional[float] = None
+
+    # "clone" (full git checkout) or "archive" (source tarball of the
+    # commit, no history); None inherits the runbook's setting
+    workspace: Optional[str] = None
+
+    # Declared needs for resource-aware scheduling: {"cpu": 2, "memory":
+    # "4G", "disk": "10G"}; unset kinds come from history or the runbook
+    resources: Optional[Dict[str, Any]] = None
+
     def __post_init__(self):
+        ResourceRequest.fields_from(self.resources)
+        if self.workspace not in (None, *WORKSPACE_MODES):
+            raise ValueError(f"Job {self.id}: workspace must be one of {', '.join(WORKSPACE_MODES)}")
         if self.type == "github" and not self.issue_url:
             raise ValueError(f"Job {self.id}: issue_url required for github type")
         if self.type == "swerex" and not self.instance_id:
@@ -45,12 +64,72 @@ class Runbook:
     max_parallel: int = 1
     output_dir: str = "./runs/batch_output"
 
+    # Default per-job time budgets in seconds, used when a job sets none
+    job_timeout: Optional[float] = None
+    prepare_timeout: Optional[float] = None
+    verify_timeout: Optional[float] = None
+
+    # Batch-level budgets: stop scheduling new jobs once any is exhausted
+    deadline: Optional[float] = None  # wall-clock seconds for the whole batch
+    max_failures: Optional[int] = None
+    max_failure_rate: Optional[float] = None  # percentage, like success_rate
+    failure_rate_min_jobs: int = 10
+
+    # Speculative re-execution of stragglers in parallel mode
+    hedge: bool = False
+    hedge_after_fraction: float = 0.9  # start once this share of jobs finished
+    hedge_multiplier: float = 2.0  # duplicate phases running this many times p95
+    hedge_min_samples: int = 5
+
+    # Shared dependency environments keyed by the repo's manifests
+    environments: bool = False
+    environment_cache_dir: Optional[str] = None  # default: $LINGXI_ENV_CACHE_DIR
+    environment_cache_size: int = 8
+
+    # Snapshots of prepared workspaces; hedged attempts clone them
+    snapshots: bool = False
+    snapshot_dir: Optional[str] = None  # default: $LINGXI_SNAPSHOT_DIR
+    snapshot_cache_size: int = 16
+
+    # Default workspace mode for jobs that don't set one
+    workspace: str = "clone"
+
+    # Pack parallel jobs by declared resources instead of only max_parallel
+    resource_scheduling: bool = False
+    resources: Optional[Dict[str, Any]] = None  # defaults for jobs
+    capacity: Optional[Dict[str, Any]] = None  # overrides of measured capacity
+    resource_history: Optional[str] = None  # default: $LINGXI_RESOURCE_HISTORY
+
+    # SWE-bench JSONL/Parquet dump that swerex jobs' instance_ids resolve in
+    dataset: Optional[str] = None  # default: $LINGXI_SWEBENCH_DATASET
+
+    # Start order, from past durations (see ordering.DurationEstimator)
+    order: str = "file"
+    history: Optional[List[str]] = None  # past report JSON / results.jsonl files
+
     def __post_init__(self):
         self.output_dir = str(Path(self.output_dir).resolve())
+        if self.workspace not in WORKSPACE_MODES:
+            raise ValueError(f"workspace must be one of {', '.join(WORKSPACE_MODES)}")
+        if self.order not in JOB_ORDERS:
+            raise ValueError(f"order must be one of {', '.join(JOB_ORDERS)}")
+        ResourceRequest.fields_from(self.resources)
+        ResourceRequest.fields_from(self.capacity)
+        for job in self.jobs:
+            if job.workspace is None:
+                job.workspace = self.workspace
+            if job.timeout is None:
+                job.timeout = self.job_timeout
+            if job.prepare_timeout is None:
+                job.prepare_timeout = self.prepare_timeout
+            if job.verify_timeout is None:
+                job.verify_timeout = self.verify_timeout
 
     @classmethod
     def from_yaml(cls, path: str | Path) -> Runbook:
         """Load runbook from YAML file."""
+        import yaml
+
         with open(path, "r", encoding="utf-8") as f:
             data = yaml.safe_load(f)
         return cls.from_dict(data)
@@ -72,6 +151,31 @@ class Runbook:
             jobs=jobs,
             max_parallel=data.get("max_parallel", 1),
             output_dir=data.get("output_dir", "./runs/batch_output"),
+            job_timeout=data.get("job_timeout"),
+            prepare_timeout=data.get("prepare_timeout"),
+            verify_timeout=data.get("verify_timeout"),
+            deadline=data.get("deadline"),
+            max_failures=data.get("max_failures"),
+            max_failure_rate=data.get("max_failure_rate"),
+            failure_rate_min_jobs=data.get("failure_rate_min_jobs", 10),
+            hedge=data.get("hedge", False),
+            hedge_after_fraction=data.get("hedge_after_fraction", 0.9),
+            hedge_multiplier=data.get("hedge_multiplier", 2.0),
+            hedge_min_samples=data.get("hedge_min_samples", 5),
+            environments=data.get("environments", False),
+            environment_cache_dir=data.get("environment_cache_dir"),
+            environment_cache_size=data.get("environment_cache_size", 8),
+            snapshots=data.get("snapshots", False),
+            snapshot_dir=data.get("snapshot_dir"),
+            snapshot_cache_size=data.get("snapshot_cache_size", 16),
+            workspace=data.get("workspace", "clone"),
+            resource_scheduling=data.get("resource_scheduling", False),
+            resources=data.get("resources"),
+            capacity=data.get("capacity"),
+            resource_history=data.get("resource_history"),
+            dataset=data.get("dataset"),
+            order=data.get("order", "file"),
+            history=data.get("history"),
         )
 
     def to_dict(self) -> Dict[str, Any]:
@@ -81,6 +185,31 @@ class Runbook:
             "jobs": [job.__dict__ for job in self.jobs],
             "max_parallel": self.max_parallel,
             "output_dir": self.output_dir,
+            "job_timeout": self.job_timeout,
+            "prepare_timeout": self.prepare_timeout,
+            "verify_timeout": self.verify_timeout,
+            "deadline": self.deadline,
+            "max_failures": self.max_failures,
+            "max_failure_rate": self.max_failure_rate,
+            "failure_rate_min_jobs": self.failure_rate_min_jobs,
+            "hedge": self.hedge,
+            "hedge_after_fraction": self.hedge_after_fraction,
+            "hedge_multiplier": self.hedge_multiplier,
+            "hedge_min_samples": self.hedge_min_samples,
+            "environments": self.environments,
+            "environment_cache_dir": self.environment_cache_dir,
+            "environment_cache_size": self.environment_cache_size,
+            "snapshots": self.snapshots,
+            "snapshot_dir": self.snapshot_dir,
+            "snapshot_cache_size": self.snapshot_cache_size,
+            "workspace": self.workspace,
+            "resource_scheduling": self.resource_scheduling,
+            "resources": self.resources,
+            "capacity": self.capacity,
+            "resource_history": self.resource_history,
+            "dataset": self.dataset,
+            "order": self.order,
+            "history": self.history,
         }
 
 
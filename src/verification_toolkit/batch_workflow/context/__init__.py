@@ -1,5 +1,35 @@
-"""Context providers for different repository sources."""
+"""Context providers for different repository sources.
 
-from .github import GitHubContextProvider
+Providers are resolved lazily (PEP 562), so importing the GitHub provider
+does not load the SWE-bench dataset reader.
+"""
 
-__all__ = ["GitHubContextProvider"]
\ No newline at end of file
+from __future__ import annotations
+
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:  # pragma: no cover - imported for type checkers only
+    from .github import GitHubContextProvider
+    from .swebench import SWEBenchContextProvider, SWEBenchDataset
+
+_LAZY_ATTRS = {
+    "GitHubContextProvider": ".github",
+    "SWEBenchContextProvider": ".swebench",
+    "SWEBenchDataset": ".swebench",
+}
+
+__all__ = ["GitHubContextProvider", "SWEBenchContextProvider", "SWEBenchDataset"]
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -2,9 +2,16 @@
 
 from __future__ import annotations
 
-from typing import Protocol
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Protocol
 
 from verification_toolkit import GitHubIssuePreparer, GitHubIssueContext
+from verification_toolkit.github import DEFAULT_RUNTIME_DIR
+
+if TYPE_CHECKING:  # pragma: no cover
+    from verification_toolkit.snapshots import SnapshotStore
+
+    from ..environments import EnvironmentCache
 
 
 class ContextProvider(Protocol):
@@ -17,11 +24,56 @@ class ContextProvider(Protocol):
 class GitHubContextProvider:
     """Context provider for GitHub issues."""
 
-    def __init__(self, preparer: GitHubIssuePreparer | None = None):
-        self.preparer = preparer or GitHubIssuePreparer()
+    def __init__(
+        self,
+        preparer: GitHubIssuePreparer | None = None,
+        git_timeout: Optional[float] = None,
+        workspace_dir: Optional[str] = None,
+        environments: Optional[EnvironmentCache] = None,
+        snapshots: Optional[SnapshotStore] = None,
+    ):
+        """Wrap ``preparer``, or build one from the remaining options.
+
+        ``workspace_dir`` gives the job a private runtime directory, seeded
+        from the shared clone cache, so it cannot race other jobs on checkout.
+        With ``environments``, each context gets the dependency environment
+        for its commit as ``environment_path``. With ``snapshots``, prepared
+        workspaces are captured, and jobs with a private ``workspace_dir``
+        (retries, hedged attempts) start from a clone of the snapshot
+        instead of checking out again.
+        """
+        if preparer is None:
+            options = {}
+            if git_timeout is not None:
+                options["git_timeout"] = git_timeout
+            if workspace_dir is not None:
+                options["runtime_dir"] = workspace_dir
+                options["reference_dir"] = DEFAULT_RUNTIME_DIR
+            preparer = GitHubIssuePreparer(**options)
+        self.preparer = preparer
+        self.environments = environments
+        self.snapshots = snapshots
+        self.workspace_dir = workspace_dir
 
     def prepare_context(self, job_config) -> GitHubIssueContext:
         """Prepare GitHub issue context."""
         if not job_config.issue_url:
             raise ValueError(f"Job {job_config.id} missing issue_url")
-        return self.preparer.prepare(job_config.issue_url)
\ No newline at end of file
+        # Archive workspaces are immutable and shared already: no snapshots.
+        archive = getattr(job_config, "workspace", None) == "archive"
+        key = None
+        if self.snapshots is not None and not archive:
+            key = self.snapshots.key(job_config.issue_url)
+        if key is not None and self.workspace_dir is not None:
+            context = self.snapshots.clone(key, Path(self.workspace_dir) / "snapshot")
+            if context is not None:
+                return context
+        if archive:
+            context = self.preparer.prepare(job_config.issue_url, archive=True)
+        else:
+            context = self.preparer.prepare(job_config.issue_url)
+        if self.environments is not None:
+            context.environment_path = str(self.environments.get(context.repo_path, context.current_commit))
+        if key is not None:
+            self.snapshots.capture(key, context)
+        return context
\ No newline at end of file
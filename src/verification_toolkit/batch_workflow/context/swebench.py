@@ -0,0 +1,253 @@
+"""SWE-bench context provider for ``swerex`` jobs, backed by a local dataset dump.
+
+:class:`SWEBenchDataset` reads a SWE-bench JSONL dump through ``mmap`` with
+a byte-offset index keyed by ``instance_id``, so a lookup parses one line
+and the dataset is never loaded whole. The index is built with one pass
+over the file and saved next to it as ``<dataset>.index.json``; it is
+rebuilt when the dump changes. Parquet dumps (which need ``pyarrow``) are
+memory-mapped too and indexed by row group instead.
+
+:class:`SWEBenchContextProvider` checks out each instance's
+``base_commit`` in the cached clone under ``$LINGXI_RUNTIME_DIR``, without
+network calls.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from verification_toolkit import GitHubIssueContext, GitHubIssuePreparer
+from verification_toolkit.github import DEFAULT_RUNTIME_DIR
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ..environments import EnvironmentCache
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_SWEBENCH_DATASET = os.environ.get("LINGXI_SWEBENCH_DATASET")
+INDEX_SUFFIX = ".index.json"
+INDEX_VERSION = 1
+# Reads the ID without parsing the whole record; JSON escapes are rare in IDs.
+_ID_PATTERN = re.compile(rb'"instance_id"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def _instance_id(line: bytes) -> Optional[str]:
+    match = _ID_PATTERN.search(line)
+    if match is not None:
+        return json.loads(b'"' + match.group(1) + b'"')
+    try:
+        return json.loads(line).get("instance_id")
+    except (ValueError, AttributeError):
+        return None
+
+
+class SWEBenchDataset:
+    """Random access by ``instance_id`` to a SWE-bench JSONL or Parquet dump."""
+
+    def __init__(self, path: str | os.PathLike[str], index_path: str | os.PathLike[str] | None = None):
+        self.path = Path(path)
+        self.index_path = Path(index_path) if index_path else self.path.with_name(self.path.name + INDEX_SUFFIX)
+        self._lock = threading.Lock()
+        if self.path.suffix == ".parquet":
+            self._open_parquet()
+        else:
+            self._open_jsonl()
+
+    # -- JSONL -----------------------------------------------------------------
+
+    def _open_jsonl(self) -> None:
+        self._parquet = None
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            # mmap cannot map an empty file.
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else None
+        self._index: Dict[str, Tuple[int, int]] = self._load_index(stat) or self._build_index(stat)
+
+    def _load_index(self, stat: os.stat_result) -> Optional[Dict[str, Tuple[int, int]]]:
+        try:
+            data = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if (data.get("version"), data.get("size"), data.get("mtime_ns")) != (
+            INDEX_VERSION, stat.st_size, stat.st_mtime_ns
+        ):
+            return None
+        return {instance_id: (offset, length) for instance_id, (offset, length) in data["entries"].items()}
+
+    def _build_index(self, stat: os.stat_result) -> Dict[str, Tuple[int, int]]:
+        index: Dict[str, Tuple[int, int]] = {}
+        data = self._mmap
+        position, size = 0, stat.st_size
+        while position < size:
+            end = data.find(b"\n", position)
+            if end == -1:
+                end = size
+            line = data[position:end]
+            if line.strip():
+                instance_id = _instance_id(line)
+                if instance_id is not None:
+                    index[instance_id] = (position, end - position)
+            position = end + 1
+        LOGGER.info("Indexed %d instances in %s", len(index), self.path)
+        try:
+            tmp = self.index_path.with_name(f".{self.index_path.name}.{os.getpid()}.tmp")
+            tmp.write_text(json.dumps({
+                "version": INDEX_VERSION,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "entries": index,
+            }), encoding="utf-8")
+            tmp.replace(self.index_path)
+        except OSError as exc:
+            # A read-only dataset directory only costs a rebuild next time.
+            LOGGER.debug("Could not save dataset index %s: %s", self.index_path, exc)
+        return index
+
+    # -- Parquet ---------------------------------------------------------------
+
+    def _open_parquet(self) -> None:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as exc:  # pragma: no cover - depends on the environment
+            raise ImportError("Parquet datasets need pyarrow: pip install 'verification-toolkit[parquet]'") from exc
+
+        self._mmap = None
+        self._parquet = pq.ParquetFile(self.path, memory_map=True)
+        # Row group -> its rows as dicts; the most recently read one is kept.
+        self._row_group: Tuple[int, List[Dict[str, Any]]] = (-1, [])
+        self._index = {}
+        for group in range(self._parquet.num_row_groups):
+            ids = self._parquet.read_row_group(group, columns=["instance_id"]).column(0).to_pylist()
+            for row, instance_id in enumerate(ids):
+                self._index[instance_id] = (group, row)
+
+    def _parquet_record(self, group: int, row: int) -> Dict[str, Any]:
+        with self._lock:
+            if self._row_group[0] != group:
+                self._row_group = (group, self._parquet.read_row_group(group).to_pylist())
+            return dict(self._row_group[1][row])
+
+    # -- access ----------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, instance_id: object) -> bool:
+        return instance_id in self._index
+
+    def ids(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def get(self, instance_id: str) -> Dict[str, Any]:
+        """The dataset record for ``instance_id``; raises :class:`KeyError` if absent."""
+        try:
+            first, second = self._index[instance_id]
+        except KeyError:
+            raise KeyError(f"{instance_id} is not in {self.path}") from None
+        if self._parquet is not None:
+            return self._parquet_record(first, second)
+        return json.loads(self._mmap[first:first + second])
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+_DATASETS: Dict[Tuple[str, int, int], SWEBenchDataset] = {}
+_DATASETS_LOCK = threading.Lock()
+
+
+def open_dataset(path: str | os.PathLike[str]) -> SWEBenchDataset:
+    """Shared :class:`SWEBenchDataset` for ``path``, reopened if the file changed."""
+    path = Path(path).resolve()
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _DATASETS_LOCK:
+        dataset = _DATASETS.get(key)
+        if dataset is None:
+            dataset = _DATASETS[key] = SWEBenchDataset(path)
+        return dataset
+
+
+def _string_list(value: Any) -> List[str]:
+    """``FAIL_TO_PASS``/``PASS_TO_PASS`` are JSON-encoded strings in some dumps."""
+    if isinstance(value, str):
+        value = json.loads(value) if value.strip() else []
+    return list(value or [])
+
+
+@dataclass(slots=True)
+class SWEBenchContext(GitHubIssueContext):
+    """A :class:`GitHubIssueContext` plus the SWE-bench instance's test data."""
+
+    instance_id: str = ""
+    hints_text: Optional[str] = None
+    version: Optional[str] = None
+    environment_setup_commit: Optional[str] = None
+    test_patch: Optional[str] = None
+    fail_to_pass: List[str] = field(default_factory=list)
+    pass_to_pass: List[str] = field(default_factory=list)
+
+
+class SWEBenchContextProvider:
+    """Context provider for ``swerex`` jobs, from a local SWE-bench dump."""
+
+    def __init__(
+        self,
+        dataset: SWEBenchDataset,
+        preparer: GitHubIssuePreparer | None = None,
+        git_timeout: Optional[float] = None,
+        workspace_dir: Optional[str] = None,
+        environments: Optional[EnvironmentCache] = None,
+    ):
+        """Like :class:`~.github.GitHubContextProvider`, a ``workspace_dir``
+        gives the job a private clone, made locally from the shared one."""
+        if preparer is None:
+            options = {}
+            if git_timeout is not None:
+                options["git_timeout"] = git_timeout
+            if workspace_dir is not None:
+                options["runtime_dir"] = workspace_dir
+                options["reference_dir"] = DEFAULT_RUNTIME_DIR
+            preparer = GitHubIssuePreparer(**options)
+        self.dataset = dataset
+        self.preparer = preparer
+        self.environments = environments
+
+    def prepare_context(self, job_config) -> SWEBenchContext:
+        """Check out the instance's ``base_commit`` (or the job's ``checkout_commit``)."""
+        if not job_config.instance_id:
+            raise ValueError(f"Job {job_config.id} missing instance_id")
+        record = self.dataset.get(job_config.instance_id)
+        owner, project = record["repo"].split("/", 1)
+        commit = job_config.checkout_commit or record["base_commit"]
+        repo_path = self.preparer.prepare_commit(owner, project, commit)
+        number = record["instance_id"].rsplit("-", 1)[-1]
+        context = SWEBenchContext(
+            issue_url=job_config.issue_url or f"https://github.com/{owner}/{project}/pull/{number}",
+            owner=owner,
+            project=project,
+            issue_number=number,
+            repo_path=str(repo_path),
+            current_commit=commit,
+            closing_commit=None,
+            issue_description=record.get("problem_statement"),
+            instance_id=record["instance_id"],
+            hints_text=record.get("hints_text"),
+            version=str(record["version"]) if record.get("version") is not None else None,
+            environment_setup_commit=record.get("environment_setup_commit"),
+            test_patch=record.get("test_patch"),
+            fail_to_pass=_string_list(record.get("FAIL_TO_PASS")),
+            pass_to_pass=_string_list(record.get("PASS_TO_PASS")),
+        )
+        if self.environments is not None:
+            context.environment_path = str(self.environments.get(context.repo_path, context.current_commit))
+        return context
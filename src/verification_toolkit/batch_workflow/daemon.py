@@ -0,0 +1,348 @@
+"""Long-running ``batch-workflow serve`` daemon and its client.
+
+The daemon pays the start-up costs once — imports, agent construction,
+GitHub HTTP connections and issue metadata lookups — and keeps them warm in
+a :class:`WarmPool` shared by every submission. Runbooks or single jobs are
+posted to it over a Unix socket (default) or localhost HTTP, and job results
+stream back as newline-delimited JSON while the batch runs:
+
+* ``POST /runbooks`` with a runbook as JSON (the ``Runbook.from_dict`` shape)
+* ``POST /jobs`` with one job as JSON (the ``JobConfig`` fields)
+* ``GET /health``
+
+Each response line is ``{"type": "result", ...}`` for a finished job, and the
+last one is ``{"type": "summary", ...}``.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import http.client
+import ipaddress
+import json
+import logging
+import os
+import socket
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import JobConfig, Runbook
+from .report import BatchReport, JobResult, ResultSink, job_result_to_dict
+
+if TYPE_CHECKING:  # pragma: no cover
+    from verification_toolkit.snapshots import SnapshotStore
+
+    from .environments import EnvironmentCache
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_SOCKET_PATH = Path(
+    os.environ.get("LINGXI_DAEMON_SOCKET", Path.home() / ".lingxi" / "batch-workflow.sock")
+)
+
+
+class WarmPool:
+    """Issue preparers and agents kept alive across jobs and submissions.
+
+    One preparer (with its HTTP session and issue metadata cache) exists per
+    prepare timeout; each job's context provider wraps it together with its
+    runner's environment cache and snapshot store. Agents are pooled per name and keyword
+    arguments; an agent is handed to one job at a time and only returned to
+    the pool when that job finishes cleanly, since a job that timed out may
+    still be running on it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._preparers: Dict[Optional[float], Any] = {}
+        self._idle_agents: Dict[str, List[Any]] = {}
+        self.agents_created = 0
+        self.agents_reused = 0
+
+    def context_provider(
+        self,
+        job_config: JobConfig,
+        workspace_dir: Optional[str] = None,
+        environments: Optional[EnvironmentCache] = None,
+        snapshots: Optional[SnapshotStore] = None,
+    ):
+        from verification_toolkit import GitHubIssuePreparer
+
+        from .context.github import GitHubContextProvider
+
+        if job_config.type != "github":
+            return None  # the executor builds one from the runner's dataset
+        if workspace_dir is not None:
+            # Private workspaces (hedged attempts) are not shared.
+            return GitHubContextProvider(
+                git_timeout=job_config.prepare_timeout,
+                workspace_dir=workspace_dir,
+                environments=environments,
+                snapshots=snapshots,
+            )
+        key = job_config.prepare_timeout
+        with self._lock:
+            preparer = self._preparers.get(key)
+            if preparer is None:
+                options = {"git_timeout": key} if key is not None else {}
+                preparer = GitHubIssuePreparer(cache_metadata=True, **options)
+                self._preparers[key] = preparer
+        return GitHubContextProvider(preparer, environments=environments, snapshots=snapshots)
+
+    def acquire_agent(self, job_config: JobConfig):
+        from .agents.registry import get_agent
+
+        key = self._agent_key(job_config)
+        with self._lock:
+            idle = self._idle_agents.get(key)
+            if idle:
+                self.agents_reused += 1
+                return idle.pop()
+            self.agents_created += 1
+        return get_agent(job_config.agent, **(job_config.agent_kwargs or {}))
+
+    def release_agent(self, job_config: JobConfig, agent) -> None:
+        with self._lock:
+            self._idle_agents.setdefault(self._agent_key(job_config), []).append(agent)
+
+    @contextlib.contextmanager
+    def job_resources(
+        self,
+        job_config: JobConfig,
+        workspace_dir: Optional[str] = None,
+        environments: Optional[EnvironmentCache] = None,
+        snapshots: Optional[SnapshotStore] = None,
+    ) -> Iterator[Tuple[Any, Any]]:
+        """``(context_provider, agent)`` for one job; see :meth:`BatchRunner.run_job`."""
+        provider = self.context_provider(job_config, workspace_dir, environments, snapshots)
+        agent = self.acquire_agent(job_config)
+        yield provider, agent
+        # Not reached when the job raised (failed, timed out or cancelled).
+        self.release_agent(job_config, agent)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "preparers": len(self._preparers),
+                "idle_agents": sum(len(agents) for agents in self._idle_agents.values()),
+                "agents_created": self.agents_created,
+                "agents_reused": self.agents_reused,
+            }
+
+    @staticmethod
+    def _agent_key(job_config: JobConfig) -> str:
+        return json.dumps([job_config.agent, job_config.agent_kwargs or {}], sort_keys=True, default=str)
+
+
+class _StreamSink:
+    """Writes each result to the HTTP response as one JSON line."""
+
+    def __init__(self, wfile) -> None:
+        self.wfile = wfile
+        self.disconnected = False
+
+    def send(self, payload: Dict[str, Any]) -> None:
+        if self.disconnected:
+            return
+        try:
+            self.wfile.write(json.dumps(payload, default=str).encode("utf-8") + b"\n")
+            self.wfile.flush()
+        except OSError:
+            # The client went away; the batch still runs to completion.
+            self.disconnected = True
+
+    def write(self, job_result: JobResult) -> None:
+        self.send({"type": "result", **job_result_to_dict(job_result)})
+
+    def close(self) -> None:
+        pass
+
+
+def summary_payload(report: BatchReport) -> Dict[str, Any]:
+    return {
+        "type": "summary",
+        "runbook": report.runbook_name,
+        "total_jobs": report.total_jobs,
+        "successful_jobs": report.successful_jobs,
+        "failed_jobs": report.failed_jobs,
+        "success_rate": report.success_rate,
+        "stopped_reason": report.stopped_reason,
+    }
+
+
+class BatchDaemon:
+    """Runs submitted runbooks against a shared :class:`WarmPool`."""
+
+    def __init__(self, max_workers: int = 4, db_path: Optional[str] = None) -> None:
+        self.max_workers = max_workers
+        self.db_path = db_path
+        self.pool = WarmPool()
+        self.started = time.time()
+        self.submissions = 0
+        self.jobs_run = 0
+        self._lock = threading.Lock()
+
+    def run(self, runbook: Runbook, sinks: List[ResultSink]) -> BatchReport:
+        from .runner import BatchRunner
+
+        sinks = list(sinks)
+        if self.db_path:
+            from .store import SqliteResultSink
+            sinks.append(SqliteResultSink(self.db_path, runbook.name, metadata={"source": "serve"}))
+        with self._lock:
+            self.submissions += 1
+        runner = BatchRunner(runbook, max_workers=self.max_workers, sinks=sinks, pool=self.pool)
+        report = runner.run_batch_parallel()
+        with self._lock:
+            self.jobs_run += report.total_jobs
+        return report
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started,
+            "submissions": self.submissions,
+            "jobs_run": self.jobs_run,
+            **self.pool.stats(),
+        }
+
+    def handler_class(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):  # noqa: A002 - route through logging
+                LOGGER.debug("serve: " + format, *args)
+
+            def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):  # noqa: N802 - http.server API
+                if self.path == "/health":
+                    self._send_json(200, daemon.health())
+                else:
+                    self._send_json(404, {"error": f"not found: {self.path}"})
+
+            def do_POST(self):  # noqa: N802 - http.server API
+                try:
+                    data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    if self.path == "/runbooks":
+                        runbook = Runbook.from_dict(data)
+                    elif self.path == "/jobs":
+                        job = JobConfig(**data)
+                        runbook = Runbook(name=f"job-{job.id}", jobs=[job])
+                    else:
+                        self._send_json(404, {"error": f"not found: {self.path}"})
+                        return
+                except (ValueError, TypeError) as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                stream = _StreamSink(self.wfile)
+                try:
+                    report = daemon.run(runbook, [stream])
+                except Exception as e:  # noqa: BLE001 - reported to the client
+                    LOGGER.exception("Submission %s failed", runbook.name)
+                    stream.send({"type": "error", "error": str(e)})
+                    return
+                stream.send(summary_payload(report))
+
+        return Handler
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def make_server(daemon: BatchDaemon, socket_path: Optional[str] = None, host: str = "127.0.0.1",
+                port: Optional[int] = None) -> socketserver.BaseServer:
+    """HTTP server for ``daemon`` on ``host:port``, or else on a Unix socket.
+
+    The API is unauthenticated and runs arbitrary agents, so ``host`` must be
+    a loopback address; anything else raises :class:`ValueError`.
+    """
+    if port is not None:
+        if not _is_loopback(host):
+            raise ValueError(f"Refusing to serve on {host!r}: only loopback addresses are allowed")
+        return ThreadingHTTPServer((host, port), daemon.handler_class())
+    path = Path(socket_path or DEFAULT_SOCKET_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        # A socket file is left behind if a previous daemon was killed.
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(str(path))
+        except OSError:
+            path.unlink()
+        else:
+            raise RuntimeError(f"A daemon is already listening on {path}")
+        finally:
+            probe.close()
+    return _UnixHTTPServer(str(path), daemon.handler_class())
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+
+    def __init__(self, path: str, timeout: Optional[float] = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _connection(target: Optional[str], timeout: Optional[float]) -> http.client.HTTPConnection:
+    """``target`` is ``http://host:port`` or a socket path (default socket if None)."""
+    if target and target.startswith("http://"):
+        host, _, port = target[len("http://"):].rstrip("/").partition(":")
+        return http.client.HTTPConnection(host, int(port or 80), timeout=timeout)
+    return _UnixHTTPConnection(str(target or DEFAULT_SOCKET_PATH), timeout=timeout)
+
+
+def submit(payload: Dict[str, Any], target: Optional[str] = None, kind: str = "runbooks",
+           timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Post a runbook (``kind="runbooks"``) or job (``"jobs"``) and yield response lines."""
+    conn = _connection(target, timeout)
+    try:
+        body = json.dumps(payload).encode("utf-8")
+        conn.request("POST", f"/{kind}", body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        if response.status != 200:
+            raise RuntimeError(json.loads(response.read() or b"{}").get("error", f"HTTP {response.status}"))
+        for line in response:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        conn.close()
+
+
+def health(target: Optional[str] = None, timeout: Optional[float] = 5.0) -> Dict[str, Any]:
+    conn = _connection(target, timeout)
+    try:
+        conn.request("GET", "/health")
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
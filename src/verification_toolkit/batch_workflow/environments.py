@@ -0,0 +1,276 @@
+"""Cache of dependency environments keyed by the repo's manifests.
+
+Jobs on commits whose dependency manifests (``requirements*.txt``,
+``pyproject.toml``, ``setup.py``, lockfiles, ...) are identical share one
+virtualenv. The key is a hash of the manifests' git blob IDs at the
+prepared commit plus the interpreter, so only the first job for a
+dependency set pays for the install. Environments are built in place under
+a lock file, so concurrent processes build each key once, and are shared
+read-only afterwards. The least recently used ones are evicted beyond
+``max_entries``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from pathlib import Path, PurePosixPath
+from typing import Callable, Dict, Iterator, List, Optional
+
+from verification_toolkit.github import DEFAULT_RUNTIME_DIR
+
+from .cancellation import run_process
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_ENV_CACHE_DIR = Path(os.environ.get("LINGXI_ENV_CACHE_DIR", DEFAULT_RUNTIME_DIR.parent / "envs"))
+MARKER = ".lingxi-env.json"
+MANIFEST_RE = re.compile(
+    r"^(requirements[^/]*\.(txt|in)|requirements/[^/]+\.(txt|in)|constraints[^/]*\.txt"
+    r"|pyproject\.toml|setup\.py|setup\.cfg|Pipfile(\.lock)?|poetry\.lock|uv\.lock|pdm\.lock"
+    r"|environment\.ya?ml)$"
+)
+
+# (env_dir, repo_path, manifests, python) -> None; must leave a usable env in env_dir.
+Installer = Callable[[Path, Path, List[str], str], None]
+
+
+class EnvironmentBuildError(RuntimeError):
+    """Raised when an environment could not be built."""
+
+
+def env_python(env_dir: str | os.PathLike[str]) -> Path:
+    """The interpreter inside a virtualenv."""
+    return Path(env_dir) / ("Scripts/python.exe" if os.name == "nt" else "bin/python")
+
+
+def activated_env(
+    env_dir: str | os.PathLike[str],
+    base: Optional[Dict[str, str]] = None,
+    repo_path: str | os.PathLike[str] | None = None,
+) -> Dict[str, str]:
+    """Process environment variables that run commands inside ``env_dir``.
+
+    Environments hold dependencies only, so ``repo_path`` (and its ``src``
+    directory, if any) is put on ``PYTHONPATH`` to import the project from
+    the job's own checkout.
+    """
+    env = dict(os.environ if base is None else base)
+    bin_dir = env_python(env_dir).parent
+    env["VIRTUAL_ENV"] = str(env_dir)
+    env["PATH"] = os.pathsep.join([str(bin_dir), env.get("PATH", "")])
+    env.pop("PYTHONHOME", None)
+    if repo_path is not None:
+        paths = [str(repo_path)]
+        if Path(repo_path, "src").is_dir():
+            paths.insert(0, str(Path(repo_path, "src")))
+        if env.get("PYTHONPATH"):
+            paths.append(env["PYTHONPATH"])
+        env["PYTHONPATH"] = os.pathsep.join(paths)
+    return env
+
+
+def pip_installer(env_dir: Path, repo_path: Path, manifests: List[str], python: str) -> None:
+    """Create a venv and install the repo's dependencies into it.
+
+    Requirements files are installed if there are any, else the project
+    manifest is installed to resolve its dependencies. The project itself is
+    then uninstalled (including ``-e .`` lines in requirements files): the
+    environment is shared by every commit with the same manifests, so jobs
+    import the project from their own checkout instead.
+    """
+    def run(args: List[str]) -> None:
+        completed = run_process(args, cwd=str(repo_path), capture_output=True)
+        if completed.returncode != 0:
+            output = (completed.stdout + completed.stderr).decode("utf-8", "replace")
+            raise EnvironmentBuildError(f"{' '.join(args[:4])} ... failed:\n" + "\n".join(output.splitlines()[-20:]))
+
+    run([python, "-m", "venv", str(env_dir)])
+    pip = [str(env_python(env_dir)), "-m", "pip", "--disable-pip-version-check"]
+    report = env_dir / "install-report.json"
+    install = pip + ["install", "-q", "--report", str(report)]
+    requirements = [m for m in manifests if m.endswith(".txt") and "requirements" in m]
+    if requirements:
+        run(install + [arg for m in requirements for arg in ("-r", str(repo_path / m))])
+    elif any(PurePosixPath(m).name in ("pyproject.toml", "setup.py") and "/" not in m for m in manifests):
+        run(install + [str(repo_path)])
+    else:
+        return
+    project = installed_from(report, repo_path)
+    if project:
+        run(pip + ["uninstall", "-y", "-q", *project])
+    report.unlink()
+
+
+def installed_from(report: Path, repo_path: Path) -> List[str]:
+    """Names of the distributions a ``pip install --report`` took from ``repo_path``."""
+    root = Path(repo_path).resolve()
+    names = []
+    for item in json.loads(report.read_text(encoding="utf-8")).get("install", []):
+        url = item.get("download_info", {}).get("url", "")
+        if url.startswith("file:") and Path(urllib.parse.unquote(urllib.parse.urlparse(url).path)).resolve() == root:
+            names.append(item["metadata"]["name"])
+    return names
+
+
+def manifests_at(repo_path: str | os.PathLike[str], commit: str) -> Dict[str, str]:
+    """Dependency manifests in ``commit`` as ``{path: blob id}``.
+
+    Workspaces without git metadata (archive workspaces) are read from disk,
+    hashed the way git hashes blobs, so both kinds share environments.
+    """
+    if not Path(repo_path, ".git").exists():
+        return _manifests_on_disk(Path(repo_path))
+    output = run_process(
+        ["git", "ls-tree", "-z", commit, "--", ".", "requirements/"],
+        cwd=str(repo_path), capture_output=True, check=True,
+    ).stdout
+    manifests = {}
+    for record in output.split(b"\0"):
+        if not record:
+            continue
+        meta, _, path = record.partition(b"\t")
+        _mode, kind, blob = meta.split()
+        name = path.decode("utf-8", "surrogateescape")
+        if kind == b"blob" and MANIFEST_RE.match(name):
+            manifests[name] = blob.decode()
+    return manifests
+
+
+def _manifests_on_disk(root: Path) -> Dict[str, str]:
+    manifests = {}
+    for path in [*root.iterdir(), *(root / "requirements").glob("*")]:
+        name = path.relative_to(root).as_posix()
+        if path.is_file() and MANIFEST_RE.match(name):
+            data = path.read_bytes()
+            manifests[name] = hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+    return manifests
+
+
+def environment_key(manifests: Dict[str, str], python: str, salt: str = "") -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{python}\0{salt}\0".encode())
+    for path in sorted(manifests):
+        digest.update(f"{path}\0{manifests[path]}\n".encode())
+    return digest.hexdigest()
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Exclusive lock across processes (a no-op where ``fcntl`` is missing)."""
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - Windows
+        yield
+        return
+    with open(path, "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+class EnvironmentCache:
+    """Builds, shares and evicts dependency environments.
+
+    Environments are used in place and must be treated as read-only. Ones
+    used within the last ``min_idle`` seconds are never evicted, since a
+    job (possibly in another process) may still be running in them.
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike[str] | None = None,
+        max_entries: int = 8,
+        python: str = sys.executable,
+        installer: Installer = pip_installer,
+        min_idle: float = 3600.0,
+    ):
+        self.root = Path(root) if root else DEFAULT_ENV_CACHE_DIR
+        self.max_entries = max_entries
+        self.python = python
+        self.installer = installer
+        self.min_idle = min_idle
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self.builds = 0
+
+    def get(self, repo_path: str | os.PathLike[str], commit: str) -> Path:
+        """Environment for ``repo_path`` at ``commit``, building it if needed.
+
+        The repository must have ``commit`` checked out, since installers
+        read the manifests from the worktree.
+        """
+        manifests = manifests_at(repo_path, commit)
+        key = environment_key(manifests, self.python, getattr(self.installer, "__name__", ""))
+        env_dir = self.root / key
+        if not (env_dir / MARKER).exists():
+            with self._key_lock(key):
+                self.root.mkdir(parents=True, exist_ok=True)
+                with _file_lock(self.root / f"{key}.lock"):
+                    if not (env_dir / MARKER).exists():
+                        self._build(env_dir, Path(repo_path), manifests)
+            self.evict()
+        os.utime(env_dir / MARKER)
+        return env_dir
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _build(self, env_dir: Path, repo_path: Path, manifests: Dict[str, str]) -> None:
+        # Built in place (virtualenvs hard-code their own path) under the key's
+        # lock; the marker is written last, so readers never see a partial env.
+        if env_dir.exists():
+            shutil.rmtree(env_dir)  # left behind by an interrupted build
+        LOGGER.info("Building environment %s for %s (%s)", env_dir.name, repo_path, ", ".join(sorted(manifests)))
+        start = time.monotonic()
+        try:
+            self.installer(env_dir, repo_path, sorted(manifests), self.python)
+            (env_dir / MARKER).write_text(json.dumps({
+                "manifests": manifests,
+                "python": self.python,
+                "repo": str(repo_path),
+                "build_seconds": time.monotonic() - start,
+            }, indent=2))
+            self.builds += 1
+        except BaseException as exc:
+            shutil.rmtree(env_dir, ignore_errors=True)
+            if isinstance(exc, (OSError, subprocess.SubprocessError)):
+                raise EnvironmentBuildError(f"Unable to build environment for {repo_path}: {exc}") from exc
+            raise
+
+    def entries(self) -> List[Path]:
+        """Complete environments, least recently used first."""
+        if not self.root.exists():
+            return []
+        envs = [path for path in self.root.iterdir() if (path / MARKER).exists()]
+        return sorted(envs, key=lambda path: (path / MARKER).stat().st_mtime)
+
+    def evict(self) -> List[Path]:
+        """Remove least recently used environments beyond ``max_entries``."""
+        envs = self.entries()
+        now = time.time()
+        evicted = []
+        for env_dir in envs[: max(0, len(envs) - self.max_entries)]:
+            if now - (env_dir / MARKER).stat().st_mtime < self.min_idle:
+                continue
+            with _file_lock(self.root / f"{env_dir.name}.lock"):
+                trash = env_dir.with_name(f".{env_dir.name}.evicted-{os.getpid()}")
+                try:
+                    env_dir.rename(trash)
+                except OSError:
+                    continue
+            shutil.rmtree(trash, ignore_errors=True)
+            evicted.append(env_dir)
+        return evicted
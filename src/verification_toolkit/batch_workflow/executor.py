@@ -3,38 +3,247 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List
+import concurrent.futures
+import contextvars
+import inspect
+import os
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
 
-from verification_toolkit import EvaluationResult, VerificationAgent
+from verification_toolkit import EvaluationResult
+from verification_toolkit.interfaces import AnyVerificationAgent
 
 from .agents.registry import get_agent
+from .cancellation import CancellationToken, JobTimeoutError, use_token
 from .config import JobConfig
-from .context.github import GitHubContextProvider
+from .context.github import ContextProvider, GitHubContextProvider
+
+if TYPE_CHECKING:  # pragma: no cover
+    from verification_toolkit.snapshots import SnapshotStore
+
+    from .context.swebench import SWEBenchDataset
+    from .environments import EnvironmentCache
+
+# Phases of a job, in execution order; keys of ``JobExecutor.timings``.
+PHASES = ("prepare", "verify")
+# Synchronous phases running at once in the process (async agents need none).
+DEFAULT_SYNC_THREADS = int(os.environ.get("LINGXI_SYNC_THREADS", "64"))
+
+
+class PhaseThreads:
+    """Bounded set of daemon threads that run synchronous job phases.
+
+    Daemon threads (rather than a ``ThreadPoolExecutor``) are used so that a
+    phase which ignores cancellation can be abandoned without blocking
+    interpreter exit. At most ``max_threads`` phases run at once across the
+    process; further phases queue. Idle threads exit after ``idle_timeout``.
+    Asynchronous agents never take a thread (see :meth:`JobExecutor.execute`).
+    """
+
+    def __init__(self, max_threads: int = DEFAULT_SYNC_THREADS, idle_timeout: float = 60.0):
+        self.max_threads = max(1, max_threads)
+        self.idle_timeout = idle_timeout
+        self._queue: "queue.SimpleQueue[tuple]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._threads = 0
+        self._idle = 0
+        self._pending = 0
+
+    @property
+    def threads(self) -> int:
+        return self._threads
+
+    def submit(self, func: Callable[..., Any], *args: Any) -> concurrent.futures.Future:
+        """Run ``func(*args)`` in the caller's context; return its future."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self._queue.put((future, contextvars.copy_context(), func, args))
+        with self._lock:
+            self._pending += 1
+            if self._pending > self._idle and self._threads < self.max_threads:
+                self._threads += 1
+                threading.Thread(target=self._worker, name="job-phase", daemon=True).start()
+        return future
+
+    def _worker(self) -> None:
+        while True:
+            with self._lock:
+                self._idle += 1
+            try:
+                future, context, func, args = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    self._idle -= 1
+                    if self._pending == 0:
+                        self._threads -= 1
+                        return
+                continue
+            with self._lock:
+                self._idle -= 1
+                self._pending -= 1
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(context.run(func, *args))
+            except BaseException as exc:  # noqa: BLE001 - propagated through the future
+                future.set_exception(exc)
+
+
+_phase_threads: Optional[PhaseThreads] = None
+_phase_threads_lock = threading.Lock()
+
+
+def phase_threads() -> PhaseThreads:
+    """The process-wide :class:`PhaseThreads` (``LINGXI_SYNC_THREADS`` threads)."""
+    global _phase_threads
+    with _phase_threads_lock:
+        if _phase_threads is None:
+            _phase_threads = PhaseThreads()
+        return _phase_threads
 
 
 class JobExecutor:
     """Executes a single verification job."""
 
-    def __init__(self, config: JobConfig):
+    def __init__(
+        self,
+        config: JobConfig,
+        token: Optional[CancellationToken] = None,
+        timings: Optional[Dict[str, float]] = None,
+        workspace_dir: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        context_provider: Optional[ContextProvider] = None,
+        agent: Optional[AnyVerificationAgent] = None,
+        environments: Optional[EnvironmentCache] = None,
+        snapshots: Optional[SnapshotStore] = None,
+        dataset: Optional[SWEBenchDataset] = None,
+    ):
+        """``context_provider`` and ``agent`` may be supplied already built
+        (e.g. from a :class:`~.daemon.WarmPool`); otherwise they are created
+        for this job. ``swerex`` jobs are resolved in ``dataset``."""
         self.config = config
-        self.context_provider = GitHubContextProvider()
-        self.agent: VerificationAgent = get_agent(
+        self.token = token or CancellationToken()
+        # Phase name -> seconds; filled in as phases complete.
+        self.timings: Dict[str, float] = timings if timings is not None else {}
+        # Facts about the prepared repository ("repo", "commit"), for reports.
+        self.metadata: Dict[str, Any] = metadata if metadata is not None else {}
+        if context_provider is None and config.type == "swerex":
+            if dataset is None:
+                raise ValueError(
+                    f"Job {config.id}: swerex jobs need a SWE-bench dataset "
+                    "(runbook 'dataset' or $LINGXI_SWEBENCH_DATASET)"
+                )
+            from .context.swebench import SWEBenchContextProvider
+
+            context_provider = SWEBenchContextProvider(
+                dataset,
+                git_timeout=config.prepare_timeout,
+                workspace_dir=workspace_dir,
+                environments=environments,
+            )
+        self.context_provider = context_provider or GitHubContextProvider(
+            git_timeout=config.prepare_timeout,
+            workspace_dir=workspace_dir,
+            environments=environments,
+            snapshots=snapshots,
+        )
+        self.agent: AnyVerificationAgent = agent or get_agent(
             config.agent,
             **(config.agent_kwargs or {})
         )
+        self._deadline: Optional[float] = None
 
     async def execute(self) -> EvaluationResult:
-        """Execute the job and return results."""
-        # Prepare context (sync call)
-        context = self.context_provider.prepare_context(
-            self.config
+        """Execute the job and return results.
+
+        Raises :class:`JobTimeoutError` when the job or a phase runs over its
+        budget and :class:`JobCancelled` when the token is cancelled.
+        """
+        self.token.raise_if_cancelled()
+        if self.config.timeout:
+            self._deadline = time.monotonic() + self.config.timeout
+
+        # Prepare context
+        context = await self._run_phase(
+            "prepare", self.config.prepare_timeout, self.context_provider.prepare_context, self.config
         )
 
+        if getattr(context, "owner", None) and getattr(context, "project", None):
+            self.metadata["repo"] = f"{context.owner}/{context.project}"
+        if getattr(context, "current_commit", None):
+            self.metadata["commit"] = context.current_commit
+
         # Run verification
-        result = self.agent.run_verification(context)
+        result = await self._run_phase(
+            "verify", self.config.verify_timeout, self.agent.run_verification, context
+        )
 
         return result
 
     def execute_sync(self) -> EvaluationResult:
         """Synchronous wrapper for execute."""
-        return asyncio.run(self.execute())
\ No newline at end of file
+        return asyncio.run(self.execute())
+
+    async def _run_phase(self, phase: str, timeout: Optional[float], func: Callable[..., Any], *args: Any) -> Any:
+        """Run one phase, enforcing its time budget.
+
+        Coroutine functions (e.g. an :class:`AsyncVerificationAgent`'s
+        ``run_verification``) are awaited on the loop; synchronous callables
+        run on :func:`phase_threads`, and awaitables they return are awaited
+        on the loop. Either way this job's token is the current token.
+        """
+        self.token.raise_if_cancelled()
+        limit, limit_phase = timeout, phase
+        if self._deadline is not None:
+            remaining = max(0.0, self._deadline - time.monotonic())
+            if limit is None or remaining < limit:
+                limit, limit_phase = remaining, "job"
+        budget = self.config.timeout if limit_phase == "job" else timeout
+
+        loop = asyncio.get_running_loop()
+        cancelled = loop.create_future()
+
+        def on_cancel(_reason: str) -> None:
+            try:
+                loop.call_soon_threadsafe(lambda: cancelled.done() or cancelled.set_result(None))
+            except RuntimeError:  # the loop already finished this phase and closed
+                pass
+
+        self.token.add_callback(on_cancel)
+        start = time.perf_counter()
+        deadline = None if limit is None else time.monotonic() + limit
+        try:
+            with use_token(self.token):
+                if inspect.iscoroutinefunction(func):
+                    outcome = asyncio.ensure_future(func(*args))
+                else:
+                    outcome = asyncio.wrap_future(phase_threads().submit(func, *args))
+                value = await self._wait(outcome, cancelled, deadline, limit_phase, budget)
+                if inspect.isawaitable(value):
+                    value = await self._wait(
+                        asyncio.ensure_future(value), cancelled, deadline, limit_phase, budget
+                    )
+            return value
+        finally:
+            self.token.remove_callback(on_cancel)
+            self.timings[phase] = time.perf_counter() - start
+
+    async def _wait(
+        self,
+        outcome: asyncio.Future,
+        cancelled: asyncio.Future,
+        deadline: Optional[float],
+        phase: str,
+        budget: Optional[float],
+    ) -> Any:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        waiters: List[asyncio.Future] = [outcome, cancelled]
+        await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if outcome.done():
+            return outcome.result()
+        outcome.cancel()
+        if not self.token.cancelled:
+            # Cancel the token so registered subprocesses are killed too.
+            self.token.cancel(error=JobTimeoutError(phase, budget or 0.0))
+        self.token.raise_if_cancelled()
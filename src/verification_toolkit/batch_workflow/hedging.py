@@ -0,0 +1,138 @@
+"""Speculative re-execution (hedging) of straggler jobs."""
+
+from __future__ import annotations
+
+import shutil
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .cancellation import CancellationToken
+from .config import JobConfig, Runbook
+from .executor import PHASES
+from .report import STATUS_CANCELLED, STATUS_ERROR, JobResult, safe_name
+
+
+@dataclass
+class JobAttempt:
+    """One execution of a job; hedged jobs have two."""
+
+    index: int
+    token: CancellationToken
+    timings: Dict[str, float] = field(default_factory=dict)
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    workspace_dir: Optional[str] = None
+    hedge: bool = False
+    started: Optional[float] = None
+    done: bool = False
+
+    def current_phase(self, now: float) -> Tuple[str, float]:
+        """Return the phase this attempt is in and how long it has been in it."""
+        elapsed = now - (self.started or now)
+        for phase in PHASES:
+            if phase not in self.timings:
+                return phase, elapsed
+            elapsed -= self.timings[phase]
+        return PHASES[-1], max(0.0, elapsed)
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Hedger:
+    """Decides which running jobs to duplicate and which attempt wins.
+
+    Once ``hedge_after_fraction`` of the jobs have finished, a job whose
+    current phase has run ``hedge_multiplier`` times longer than the p95 of
+    that phase (over finished jobs, at least ``hedge_min_samples`` of them)
+    is duplicated on an idle worker in a private workspace. The first
+    attempt to produce a result wins and the other is cancelled. A hedge's
+    workspace is removed once it finishes, unless its result is the one kept.
+    """
+
+    poll_interval = 0.5
+
+    def __init__(self, runbook: Runbook, max_workers: int):
+        self.runbook = runbook
+        self.max_workers = max_workers
+        self.total = len(runbook.jobs)
+        self.finished = 0
+        self.attempts: Dict[int, List[JobAttempt]] = {}
+        self.winners: Dict[int, JobAttempt] = {}
+        self.phase_samples: Dict[str, List[float]] = {phase: [] for phase in PHASES}
+        self.workspace_root = Path(runbook.output_dir) / "hedge_workspaces"
+
+    def track(self, attempt: JobAttempt) -> JobAttempt:
+        self.attempts.setdefault(attempt.index, []).append(attempt)
+        return attempt
+
+    def accept(self, attempt: JobAttempt, job_result: JobResult) -> bool:
+        """Whether ``job_result`` should become the job's result.
+
+        An attempt that errored or was cancelled does not win while its
+        sibling is still running.
+        """
+        if job_result.status in (STATUS_ERROR, STATUS_CANCELLED):
+            return not any(not other.done for other in self.attempts[attempt.index] if other is not attempt)
+        return True
+
+    def finish(self, attempt: JobAttempt, job_result: JobResult) -> None:
+        """Record the winning attempt and cancel any sibling still running."""
+        self.finished += 1
+        self.winners[attempt.index] = attempt
+        for other in self.attempts[attempt.index]:
+            if other is not attempt and not other.done:
+                other.token.cancel("superseded by a faster attempt")
+        if len(self.attempts[attempt.index]) > 1:
+            job_result.hedged = True
+        for phase, seconds in attempt.timings.items():
+            self.phase_samples.setdefault(phase, []).append(seconds)
+
+    def discard(self, attempt: JobAttempt) -> None:
+        """Remove a finished hedge's workspace unless its result was kept."""
+        if attempt.hedge and attempt.workspace_dir and self.winners.get(attempt.index) is not attempt:
+            from verification_toolkit.session import drop_session
+
+            drop_session(attempt.workspace_dir)
+            shutil.rmtree(attempt.workspace_dir, ignore_errors=True)
+
+    def stragglers(self, jobs: List[JobConfig], batch_token: CancellationToken) -> List[JobAttempt]:
+        """Create duplicate attempts for the jobs that currently qualify."""
+        if self.finished < self.total * self.runbook.hedge_after_fraction:
+            return []
+        in_flight = sum(1 for attempts in self.attempts.values() for a in attempts if not a.done)
+        idle = self.max_workers - in_flight
+        if idle <= 0:
+            return []
+
+        now = time.monotonic()
+        candidates = []
+        for index, attempts in self.attempts.items():
+            if len(attempts) != 1 or attempts[0].done or attempts[0].started is None:
+                continue
+            phase, elapsed = attempts[0].current_phase(now)
+            samples = self.phase_samples.get(phase, [])
+            if len(samples) < self.runbook.hedge_min_samples:
+                continue
+            threshold = self.runbook.hedge_multiplier * percentile(samples, 0.95)
+            if elapsed > threshold:
+                candidates.append((elapsed / max(threshold, 1e-9), attempts[0]))
+
+        candidates.sort(key=lambda item: item[0], reverse=True)
+        duplicates = []
+        for _ratio, primary in candidates[:idle]:
+            workspace = self.workspace_root / safe_name(jobs[primary.index].id)
+            duplicates.append(
+                self.track(
+                    JobAttempt(
+                        index=primary.index,
+                        token=batch_token.child(),
+                        workspace_dir=str(workspace),
+                        hedge=True,
+                    )
+                )
+            )
+        return duplicates
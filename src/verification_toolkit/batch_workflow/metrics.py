@@ -0,0 +1,346 @@
+"""Live metrics for running batches.
+
+:class:`BatchMetrics` is a result sink that the runner also tells when jobs
+start and stop, so that it knows what is in flight. It renders the
+Prometheus text format, which :class:`MetricsReporter` rewrites to a file
+(e.g. for node_exporter's textfile collector) and :func:`serve_metrics`
+exposes at ``/metrics``, and a one-line progress summary for terminals.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, TextIO, Tuple
+
+from verification_toolkit.github import GITHUB_STATS
+
+from .report import STATUS_SKIPPED, STATUS_SUCCESS, JobResult
+
+if TYPE_CHECKING:  # pragma: no cover
+    from http.server import ThreadingHTTPServer
+
+LOGGER = logging.getLogger(__name__)
+PREFIX = "batch_workflow"
+# Seconds; phases range from sub-second verifications to hour-long clones.
+BUCKETS = (0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus exposes them."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def copy(self) -> "Histogram":
+        other = Histogram(self.buckets)
+        other.counts, other.count, other.sum = list(self.counts), self.count, self.sum
+        return other
+
+    def lines(self, name: str, labels: str = "") -> List[str]:
+        sep = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+def _duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+class BatchMetrics:
+    """Counters, gauges and histograms for one batch.
+
+    GitHub quota and clone cache figures come from
+    :data:`~verification_toolkit.github.GITHUB_STATS`; cache counts are
+    relative to when the batch began.
+    """
+
+    def __init__(self, total_jobs: int = 0, workers: int = 1):
+        self.total_jobs = total_jobs
+        self.workers = workers
+        self.finished: Dict[str, int] = {}
+        self.in_flight = 0
+        self.phases: Dict[str, Histogram] = {}
+        self.jobs = Histogram()
+        self._lock = threading.Lock()
+        self.begin(total_jobs, workers)
+
+    def begin(self, total_jobs: int, workers: int) -> None:
+        """Start the clock for ``total_jobs`` jobs on ``workers`` worker slots."""
+        with self._lock:
+            self.total_jobs = total_jobs
+            self.workers = max(1, workers)
+            self.started = self._last = time.monotonic()
+            self._busy = 0.0
+            self._cache_base = (GITHUB_STATS.clone_cache_hits, GITHUB_STATS.clone_cache_misses)
+
+    def _advance(self, now: float) -> None:
+        self._busy += self.in_flight * (now - self._last)
+        self._last = now
+
+    @contextlib.contextmanager
+    def running(self):
+        """Count a job (or hedged duplicate) as in flight while it runs."""
+        with self._lock:
+            self._advance(time.monotonic())
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._advance(time.monotonic())
+                self.in_flight -= 1
+
+    # -- ResultSink ----------------------------------------------------------
+
+    def write(self, job_result: JobResult) -> None:
+        with self._lock:
+            self.finished[job_result.status] = self.finished.get(job_result.status, 0) + 1
+            if job_result.status == STATUS_SKIPPED:
+                return
+            for phase, seconds in (job_result.timings or {}).items():
+                self.phases.setdefault(phase, Histogram()).observe(seconds)
+            if job_result.duration is not None:
+                self.jobs.observe(job_result.duration)
+
+    def close(self) -> None:
+        with self._lock:
+            self._advance(time.monotonic())
+
+    # -- derived figures -----------------------------------------------------
+
+    @property
+    def done(self) -> int:
+        return sum(self.finished.values())
+
+    @property
+    def failed(self) -> int:
+        return sum(n for status, n in self.finished.items() if status not in (STATUS_SUCCESS, STATUS_SKIPPED))
+
+    def utilization(self) -> float:
+        """Mean fraction of workers busy since the batch began."""
+        with self._lock:
+            self._advance(time.monotonic())
+            elapsed = self._last - self.started
+            return self._busy / (elapsed * self.workers) if elapsed > 0 else 0.0
+
+    def throughput(self) -> float:
+        """Jobs finished per second so far."""
+        elapsed = time.monotonic() - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        """Seconds until every job is done at the current throughput."""
+        rate = self.throughput()
+        if not rate:
+            return None
+        return max(0, self.total_jobs - self.done) / rate
+
+    def cache_counts(self) -> Tuple[int, int]:
+        """``(hits, misses)`` of the clone cache during this batch."""
+        return (
+            GITHUB_STATS.clone_cache_hits - self._cache_base[0],
+            GITHUB_STATS.clone_cache_misses - self._cache_base[1],
+        )
+
+    # -- rendering -----------------------------------------------------------
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        utilization = self.utilization()
+        hits, misses = self.cache_counts()
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: List[str]) -> None:
+            lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+            lines.extend(samples)
+
+        def sample(name: str, value, labels: str = "") -> str:
+            value = f"{value:.6g}" if isinstance(value, float) else value
+            return f"{PREFIX}_{name}{{{labels}}} {value}" if labels else f"{PREFIX}_{name} {value}"
+
+        with self._lock:
+            finished = dict(self.finished)
+            phases = {phase: histogram.copy() for phase, histogram in self.phases.items()}
+            jobs = self.jobs.copy()
+            in_flight = self.in_flight
+
+        metric("jobs", "gauge", "Jobs in the batch.", [sample("jobs", self.total_jobs)])
+        metric("jobs_finished_total", "counter", "Jobs finished, by status.", [
+            sample("jobs_finished_total", n, f'status="{status}"') for status, n in sorted(finished.items())
+        ])
+        metric("jobs_in_flight", "gauge", "Jobs (and hedged duplicates) running now.",
+               [sample("jobs_in_flight", in_flight)])
+        metric("workers", "gauge", "Worker slots.", [sample("workers", self.workers)])
+        metric("worker_utilization", "gauge", "Mean fraction of workers busy since the batch began.",
+               [sample("worker_utilization", utilization)])
+        metric("throughput_jobs_per_second", "gauge", "Jobs finished per second since the batch began.",
+               [sample("throughput_jobs_per_second", self.throughput())])
+        eta = self.eta()
+        if eta is not None:
+            metric("eta_seconds", "gauge", "Estimated seconds until the batch is done.",
+                   [sample("eta_seconds", eta)])
+
+        metric("phase_seconds", "histogram", "Time spent in each job phase.", [
+            line for phase, histogram in sorted(phases.items())
+            for line in histogram.lines(f"{PREFIX}_phase_seconds", f'phase="{phase}"')
+        ])
+        metric("job_seconds", "histogram", "Job durations.", jobs.lines(f"{PREFIX}_job_seconds"))
+
+        metric("github_api_requests_total", "counter", "GitHub API requests made by this process.",
+               [sample("github_api_requests_total", GITHUB_STATS.api_requests)])
+        if GITHUB_STATS.rate_limit_remaining is not None:
+            metric("github_rate_limit_remaining", "gauge", "GitHub API requests left in the current window.",
+                   [sample("github_rate_limit_remaining", GITHUB_STATS.rate_limit_remaining)])
+        if GITHUB_STATS.rate_limit_reset is not None:
+            metric("github_rate_limit_reset_timestamp_seconds", "gauge", "When the GitHub API quota resets.",
+                   [sample("github_rate_limit_reset_timestamp_seconds", GITHUB_STATS.rate_limit_reset)])
+        metric("clone_cache_hits_total", "counter", "Workspaces served from an existing clone or archive.",
+               [sample("clone_cache_hits_total", hits)])
+        metric("clone_cache_misses_total", "counter", "Workspaces that needed a clone or download.",
+               [sample("clone_cache_misses_total", misses)])
+        if hits + misses:
+            metric("clone_cache_hit_ratio", "gauge", "Share of workspaces served from the clone cache.",
+                   [sample("clone_cache_hit_ratio", hits / (hits + misses))])
+        return "\n".join(lines) + "\n"
+
+    def progress_line(self) -> str:
+        """E.g. ``[ 120/500]  24% ok 100 failed 20 running 8 | 2.31 jobs/s | workers 94% | ETA 2m45s``."""
+        done, total = self.done, self.total_jobs
+        width = len(str(total))
+        percent = 100 * done // total if total else 100
+        hits, misses = self.cache_counts()
+        line = (
+            f"[{done:>{width}}/{total}] {percent:3d}% "
+            f"ok {self.finished.get(STATUS_SUCCESS, 0)} failed {self.failed} running {self.in_flight}"
+            f" | {self.throughput():.2f} jobs/s | workers {self.utilization():.0%}"
+        )
+        if hits + misses:
+            line += f" | cache {hits / (hits + misses):.0%}"
+        if GITHUB_STATS.rate_limit_remaining is not None:
+            line += f" | quota {GITHUB_STATS.rate_limit_remaining}"
+        return line + f" | ETA {_duration(self.eta())}"
+
+
+class MetricsReporter:
+    """Rewrites a metrics file and a terminal progress line every ``interval`` seconds.
+
+    The file is replaced atomically, so readers never see a partial write.
+    On a terminal the progress line is redrawn in place; elsewhere a new
+    line is printed each time.
+    """
+
+    def __init__(
+        self,
+        metrics: BatchMetrics,
+        path: str | os.PathLike[str] | None = None,
+        progress: Optional[TextIO] = None,
+        interval: float = 5.0,
+    ):
+        self.metrics = metrics
+        self.path = Path(path) if path else None
+        self.progress = progress
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "MetricsReporter":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._loop, name="batch-metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop reporting, after writing the final figures."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.report()
+        if self.progress is not None and self._in_place:
+            self.progress.write("\n")
+            self.progress.flush()
+
+    @property
+    def _in_place(self) -> bool:
+        isatty = getattr(self.progress, "isatty", None)
+        return bool(isatty and isatty())
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.report()
+            except Exception:  # noqa: BLE001 - telemetry must not stop the batch
+                LOGGER.exception("Failed to report batch metrics")
+
+    def report(self) -> None:
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            tmp.write_text(self.metrics.render(), encoding="utf-8")
+            tmp.replace(self.path)
+        if self.progress is not None:
+            line = self.metrics.progress_line()
+            self.progress.write(f"\r{line}\x1b[K" if self._in_place else line + "\n")
+            self.progress.flush()
+
+
+def serve_metrics(metrics: BatchMetrics, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` on ``host:port`` from a daemon thread; call ``shutdown()`` when done."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):  # noqa: A002 - route through logging
+            LOGGER.debug("metrics: " + format, *args)
+
+        def do_GET(self):  # noqa: N802 - http.server API
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="batch-metrics-http", daemon=True).start()
+    return server
@@ -0,0 +1,151 @@
+"""Order jobs by their expected duration, learnt from earlier runs.
+
+:class:`DurationEstimator` predicts how long a job will take from its own
+past durations, else from its repository's, else from the size of the
+repository's local clone (scaled by the seconds-per-byte seen for repos
+that have both). Running the longest jobs first shortens the makespan of a
+parallel batch; running the shortest first gives feedback sooner.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import statistics
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from verification_toolkit.github import DEFAULT_RUNTIME_DIR, parse_issue_url
+
+from .config import JOB_ORDERS, JobConfig
+from .report import STATUS_CANCELLED, STATUS_SKIPPED, JobResult, job_result_from_dict, read_journal
+
+# Recent durations kept per job and per repository.
+HISTORY_DEPTH = 5
+
+
+def _repo(job: JobConfig) -> Optional[str]:
+    owner, project, _number = parse_issue_url(job.issue_url or "")
+    return f"{owner}/{project}" if owner else None
+
+
+def clone_size(repo: str, runtime_dir: Path = DEFAULT_RUNTIME_DIR) -> Optional[int]:
+    """Bytes of git objects in the local clone of ``owner/project``, if any."""
+    objects = runtime_dir / repo / ".git" / "objects"
+    if not objects.is_dir():
+        return None
+    total = 0
+    # Packs hold nearly everything in a clone; loose objects are ignored.
+    for pack in (objects / "pack").glob("*.pack"):
+        try:
+            total += pack.stat().st_size
+        except OSError:
+            continue
+    return total or None
+
+
+class DurationEstimator:
+    """Expected job durations from past results."""
+
+    def __init__(self, runtime_dir: Optional[Path] = None):
+        self.runtime_dir = runtime_dir or DEFAULT_RUNTIME_DIR
+        self.jobs: Dict[str, List[float]] = {}
+        self.repos: Dict[str, List[float]] = {}
+        self._sizes: Dict[str, Optional[int]] = {}
+
+    def add(self, job_id: str, repo: Optional[str], duration: Optional[float]) -> None:
+        """Record one past duration; add the most recent results first."""
+        if duration is None:
+            return
+        samples = self.jobs.setdefault(job_id, [])
+        if len(samples) < HISTORY_DEPTH:
+            samples.append(duration)
+        if repo:
+            samples = self.repos.setdefault(repo, [])
+            if len(samples) < HISTORY_DEPTH * 4:
+                samples.append(duration)
+
+    def add_results(self, results: Iterable[JobResult]) -> "DurationEstimator":
+        for result in results:
+            # Skipped or cancelled jobs say nothing about how long a job takes.
+            if result.status not in (STATUS_SKIPPED, STATUS_CANCELLED):
+                self.add(result.job_id, result.repo, result.duration)
+        return self
+
+    def add_store(self, store, limit: int = 20000) -> "DurationEstimator":
+        """Add the durations recorded in a :class:`~.store.RunStore`."""
+        for row in store.durations(limit=limit):
+            self.add(row["job_id"], row["repo"], row["duration"])
+        return self
+
+    @classmethod
+    def from_store(cls, store, limit: int = 20000, **kwargs) -> "DurationEstimator":
+        return cls(**kwargs).add_store(store, limit)
+
+    @classmethod
+    def from_reports(cls, paths: Iterable[str | os.PathLike[str]], **kwargs) -> "DurationEstimator":
+        """Durations from report JSON files or ``results.jsonl`` journals, newest first.
+
+        Raises :class:`OSError` for unreadable files and :class:`ValueError`
+        for files that are not reports or journals.
+        """
+        estimator = cls(**kwargs)
+        for path in paths:
+            try:
+                if str(path).endswith(".jsonl"):
+                    results = list(read_journal(path))[::-1]
+                else:
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    results = [job_result_from_dict(result) for result in data.get("results", [])]
+            except (AttributeError, KeyError, TypeError, ValueError) as exc:
+                raise ValueError(f"{path} is not a batch report or journal: {exc}") from exc
+            estimator.add_results(results)
+        return estimator
+
+    def _size(self, repo: Optional[str]) -> Optional[int]:
+        if not repo:
+            return None
+        if repo not in self._sizes:
+            self._sizes[repo] = clone_size(repo, self.runtime_dir)
+        return self._sizes[repo]
+
+    def _seconds_per_byte(self) -> Optional[float]:
+        rates = [
+            statistics.median(samples) / size
+            for repo, samples in self.repos.items()
+            if (size := self._size(repo))
+        ]
+        return statistics.median(rates) if rates else None
+
+    def estimate(self, job: JobConfig) -> Tuple[Optional[float], str]:
+        """``(expected seconds, source)``; source is "job", "repo", "size" or "none"."""
+        if self.jobs.get(job.id):
+            return statistics.median(self.jobs[job.id]), "job"
+        repo = _repo(job)
+        if repo and self.repos.get(repo):
+            return statistics.median(self.repos[repo]), "repo"
+        size = self._size(repo)
+        rate = self._seconds_per_byte() if size else None
+        if size and rate is not None:
+            return size * rate, "size"
+        return None, "none"
+
+    def order(self, jobs: List[JobConfig], order: str) -> List[int]:
+        """Indices of ``jobs`` in the requested order (stable for ties).
+
+        Jobs with no estimate at all are ranked by clone size among
+        themselves and placed as if they took the median known time.
+        """
+        if order not in JOB_ORDERS:
+            raise ValueError(f"Unknown order {order!r} (expected one of {', '.join(JOB_ORDERS)})")
+        if order == "file":
+            return list(range(len(jobs)))
+        estimates = [self.estimate(job)[0] for job in jobs]
+        known = [e for e in estimates if e is not None]
+        fallback = statistics.median(known) if known else 0.0
+        keys = [
+            (estimate, 0) if estimate is not None else (fallback, self._size(_repo(job)) or 0)
+            for job, estimate in zip(jobs, estimates)
+        ]
+        return sorted(range(len(jobs)), key=lambda i: keys[i], reverse=order == "longest-first")
@@ -0,0 +1,357 @@
+"""Work-queue mode: workers pull jobs from a shared queue.
+
+A runbook is loaded into a queue once; any number of ``batch-workflow
+worker`` processes, on any machine that can reach the queue, then claim jobs
+under a time-limited lease that they renew with heartbeats. A lease that
+expires (the worker died or lost the filesystem) puts the job back in the
+queue for someone else. Results are written back to the queue.
+
+The default backend is a SQLite file (:class:`SqliteJobQueue`); other
+backends implement :class:`JobQueue` and register a URL scheme with
+:func:`register_queue_backend`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import sqlite3
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Protocol, Tuple
+
+from .cancellation import CancellationToken
+from .config import JobConfig, Runbook
+from .report import (
+    STATUS_ERROR,
+    BatchReport,
+    JobResult,
+    ResultSink,
+    job_result_from_dict,
+    job_result_to_dict,
+)
+
+STATE_PENDING = "pending"
+STATE_LEASED = "leased"
+STATE_DONE = "done"
+
+
+@dataclass
+class ClaimedJob:
+    """A job leased to a worker."""
+
+    config: JobConfig
+    attempt: int
+    lease_expires: float
+
+
+class JobQueue(Protocol):
+    """Backend interface for queue mode."""
+
+    def load(self, runbook: Runbook) -> int:
+        """Add the runbook's jobs; return how many were new."""
+
+    def runbook(self) -> Runbook:
+        """The runbook settings the queue was loaded with (jobs omitted)."""
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[ClaimedJob]:
+        """Lease the next pending job to ``worker_id``, or return None."""
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        """Extend a lease; False means the worker no longer holds it."""
+
+    def complete(self, job_id: str, worker_id: str, job_result: JobResult) -> bool:
+        """Store the result of a leased job; False if the lease was lost."""
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per state."""
+
+    def results(self) -> Iterator[JobResult]:
+        """Results of finished jobs, in runbook order."""
+
+    def close(self) -> None:
+        """Release the backend."""
+
+
+class SqliteJobQueue:
+    """Job queue stored in a SQLite file.
+
+    Claims run in ``BEGIN IMMEDIATE`` transactions, so two workers can never
+    lease the same job. The rollback journal is used instead of WAL by
+    default because WAL needs shared memory, which network filesystems do
+    not provide; pass ``wal=True`` when all workers share one host.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], max_attempts: int = 3, wal: bool = False,
+                 timeout: float = 60.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(str(self.path), timeout=timeout, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        if wal:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS jobs (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL UNIQUE,
+                config TEXT NOT NULL,
+                state TEXT NOT NULL,
+                worker_id TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                updated_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, seq);
+            """
+        )
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _transaction(self):
+        return _ImmediateTransaction(self.conn)
+
+    def load(self, runbook: Runbook) -> int:
+        settings = runbook.to_dict()
+        settings.pop("jobs")
+        now = time.time()
+        with self._transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('runbook', ?)", (json.dumps(settings),)
+            )
+            before = self.conn.total_changes
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO jobs (job_id, config, state, updated_at) VALUES (?, ?, ?, ?)",
+                [(job.id, json.dumps(job.__dict__), STATE_PENDING, now) for job in runbook.jobs],
+            )
+            return self.conn.total_changes - before
+
+    def runbook(self) -> Runbook:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'runbook'").fetchone()
+        if row is None:
+            raise ValueError(f"Queue {self.path} has not been loaded with a runbook")
+        return Runbook.from_dict({**json.loads(row["value"]), "jobs": []})
+
+    def claim(self, worker_id: str, lease_seconds: float) -> Optional[ClaimedJob]:
+        now = time.time()
+        with self._transaction():
+            self._expire_leases(now)
+            row = self.conn.execute(
+                "SELECT job_id, config, attempts FROM jobs WHERE state = ? ORDER BY seq LIMIT 1",
+                (STATE_PENDING,),
+            ).fetchone()
+            if row is None:
+                return None
+            expires = now + lease_seconds
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, worker_id = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE job_id = ?",
+                (STATE_LEASED, worker_id, expires, now, row["job_id"]),
+            )
+        return ClaimedJob(JobConfig(**json.loads(row["config"])), row["attempts"] + 1, expires)
+
+    def _expire_leases(self, now: float) -> None:
+        """Re-queue jobs whose worker stopped heartbeating; give up after max_attempts."""
+        expired = self.conn.execute(
+            "SELECT job_id, config, attempts, worker_id FROM jobs WHERE state = ? AND lease_expires < ?",
+            (STATE_LEASED, now),
+        ).fetchall()
+        for row in expired:
+            if row["attempts"] >= self.max_attempts:
+                config = json.loads(row["config"])
+                result = JobResult(
+                    job_id=row["job_id"],
+                    issue_url=config.get("issue_url"),
+                    success=False,
+                    error=f"abandoned: lease expired {row['attempts']} time(s), last held by {row['worker_id']}",
+                    result=None,
+                    status=STATUS_ERROR,
+                    agent=config.get("agent"),
+                )
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, result = ?, updated_at = ? WHERE job_id = ?",
+                    (STATE_DONE, json.dumps(job_result_to_dict(result)), now, row["job_id"]),
+                )
+            else:
+                self.conn.execute(
+                    "UPDATE jobs SET state = ?, worker_id = NULL, lease_expires = NULL, updated_at = ? "
+                    "WHERE job_id = ?",
+                    (STATE_PENDING, now, row["job_id"]),
+                )
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float) -> bool:
+        now = time.time()
+        with self._transaction():
+            cursor = self.conn.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                "WHERE job_id = ? AND worker_id = ? AND state = ?",
+                (now + lease_seconds, now, job_id, worker_id, STATE_LEASED),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, job_result: JobResult) -> bool:
+        with self._transaction():
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, lease_expires = NULL, updated_at = ? "
+                "WHERE job_id = ? AND worker_id = ? AND state = ?",
+                (STATE_DONE, json.dumps(job_result_to_dict(job_result), default=str), time.time(),
+                 job_id, worker_id, STATE_LEASED),
+            )
+        return cursor.rowcount == 1
+
+    def counts(self) -> Dict[str, int]:
+        counts = {STATE_PENDING: 0, STATE_LEASED: 0, STATE_DONE: 0}
+        for row in self.conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state"):
+            counts[row["state"]] = row["n"]
+        return counts
+
+    def results(self) -> Iterator[JobResult]:
+        cursor = self.conn.execute("SELECT result FROM jobs WHERE state = ? ORDER BY seq", (STATE_DONE,))
+        for row in cursor:
+            yield job_result_from_dict(json.loads(row["result"]))
+
+
+class _ImmediateTransaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT`` (``ROLLBACK`` on error)."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+
+
+_BACKENDS: Dict[str, Callable[[str], JobQueue]] = {
+    "sqlite": SqliteJobQueue,
+}
+
+
+def register_queue_backend(scheme: str, factory: Callable[[str], JobQueue]) -> None:
+    """Make ``<scheme>://<location>`` queue URLs open with ``factory(location)``."""
+    _BACKENDS[scheme] = factory
+
+
+def open_queue(url: str) -> JobQueue:
+    """Open a queue from ``scheme://location``; a bare path means SQLite."""
+    scheme, sep, location = url.partition("://")
+    if not sep:
+        scheme, location = "sqlite", url
+    if scheme not in _BACKENDS:
+        raise ValueError(f"Unknown queue backend: {scheme}")
+    return _BACKENDS[scheme](location)
+
+
+def queue_report(queue: JobQueue) -> BatchReport:
+    """Build a report from the results stored in ``queue`` so far."""
+    results = list(queue.results())
+    return BatchReport(
+        runbook_name=queue.runbook().name,
+        total_jobs=len(results),
+        successful_jobs=sum(1 for r in results if r.success),
+        failed_jobs=sum(1 for r in results if not r.success),
+        results=results,
+    )
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class QueueWorker:
+    """Claims jobs from a queue and runs them until the queue is drained.
+
+    All queue access happens on the calling thread; jobs run on a pool of
+    ``max_workers`` threads. Leases are renewed every ``lease_seconds / 3``
+    and a job whose lease is lost is cancelled, since another worker may
+    already be running it.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        worker_id: Optional[str] = None,
+        max_workers: int = 1,
+        lease_seconds: float = 120.0,
+        poll_interval: float = 5.0,
+        wait_for_jobs: bool = False,
+        sinks: Optional[List[ResultSink]] = None,
+    ):
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.max_workers = max_workers
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = lease_seconds / 3
+        self.poll_interval = poll_interval
+        self.wait_for_jobs = wait_for_jobs
+        self.token = CancellationToken()
+        self.processed = 0
+        from .runner import BatchRunner
+
+        self.runner = BatchRunner(queue.runbook(), max_workers=max_workers, sinks=sinks)
+
+    def stop(self) -> None:
+        """Cancel running jobs and stop claiming new ones."""
+        self.token.cancel("worker stopped")
+
+    def run(self) -> int:
+        """Process jobs until the queue is drained (or :meth:`stop`); return the count."""
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                try:
+                    return self._process(pool)
+                except BaseException:
+                    # Cancel running jobs before the pool waits for them.
+                    self.stop()
+                    raise
+        finally:
+            self.runner.close()
+
+    def _process(self, pool: ThreadPoolExecutor) -> int:
+        in_flight: Dict[Future, Tuple[str, CancellationToken]] = {}
+        last_heartbeat = time.monotonic()
+        while True:
+            while not self.token.cancelled and len(in_flight) < self.max_workers:
+                claimed = self.queue.claim(self.worker_id, self.lease_seconds)
+                if claimed is None:
+                    break
+                job_token = self.token.child()
+                future = pool.submit(self.runner.run_job, claimed.config, job_token)
+                in_flight[future] = (claimed.config.id, job_token)
+
+            if not in_flight:
+                if self.token.cancelled or not self._should_wait():
+                    return self.processed
+                self.token.wait(self.poll_interval)
+                continue
+
+            done, _pending = wait(in_flight, timeout=self.heartbeat_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                job_id, _job_token = in_flight.pop(future)
+                job_result = future.result()
+                if self.queue.complete(job_id, self.worker_id, job_result):
+                    self.runner.emit(job_result)
+                    self.processed += 1
+
+            if time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                last_heartbeat = time.monotonic()
+                for job_id, job_token in in_flight.values():
+                    if not self.queue.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                        job_token.cancel("lease lost to another worker")
+
+    def _should_wait(self) -> bool:
+        """Keep polling while other workers hold leases that might expire."""
+        if self.wait_for_jobs:
+            return True
+        counts = self.queue.counts()
+        return counts[STATE_PENDING] + counts[STATE_LEASED] > 0
@@ -2,11 +2,25 @@
 
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import List, Optional
+import csv
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Protocol
 
 from verification_toolkit import EvaluationResult
 
+# Values of JobResult.status
+STATUS_SUCCESS = "success"
+STATUS_FAILED = "failed"  # the agent ran and reported failure
+STATUS_ERROR = "error"  # preparation or the agent raised
+STATUS_TIMEOUT = "timeout"
+STATUS_CANCELLED = "cancelled"
+STATUS_SKIPPED = "skipped"  # never started because the batch stopped early
+
 
 @dataclass
 class JobResult:
@@ -16,6 +30,23 @@ class JobResult:
     success: bool
     error: Optional[str]
     result: Optional[EvaluationResult]
+    status: Optional[str] = None
+    duration: Optional[float] = None
+    timings: Optional[Dict[str, float]] = None
+    hedged: bool = False  # a speculative duplicate was launched
+    agent: Optional[str] = None
+    repo: Optional[str] = None  # "owner/project"
+    commit: Optional[str] = None  # commit the agent verified
+    # Set when details/artifacts were spilled to disk by ArtifactSpillSink
+    details_path: Optional[str] = None
+    artifacts_path: Optional[str] = None
+
+    def __post_init__(self):
+        if self.status is None:
+            if self.success:
+                self.status = STATUS_SUCCESS
+            else:
+                self.status = STATUS_ERROR if self.error else STATUS_FAILED
 
 
 @dataclass
@@ -26,6 +57,7 @@ class BatchReport:
     successful_jobs: int
     failed_jobs: int
     results: List[JobResult]
+    stopped_reason: Optional[str] = None
 
     @property
     def success_rate(self) -> float:
@@ -34,16 +66,335 @@ class BatchReport:
             return 0.0
         return (self.successful_jobs / self.total_jobs) * 100.0
 
+    def count_status(self, status: str) -> int:
+        """Number of results with the given ``JobResult.status``."""
+        return sum(1 for r in self.results if r.status == status)
+
+    @property
+    def timed_out_jobs(self) -> int:
+        return self.count_status(STATUS_TIMEOUT)
+
+    @property
+    def skipped_jobs(self) -> int:
+        return self.count_status(STATUS_SKIPPED)
+
+    def write_json(self, path: str | os.PathLike[str]) -> None:
+        """Write the report as JSON, serialising one result at a time."""
+        header = {
+            "runbook_name": self.runbook_name,
+            "total_jobs": self.total_jobs,
+            "successful_jobs": self.successful_jobs,
+            "failed_jobs": self.failed_jobs,
+            "success_rate": self.success_rate,
+            "stopped_reason": self.stopped_reason,
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{")
+            for key, value in header.items():
+                f.write(f"\n  {json.dumps(key)}: {json.dumps(value)},")
+            f.write('\n  "results": [')
+            for index, result in enumerate(self.results):
+                f.write(("," if index else "") + "\n    " + json.dumps(job_result_to_dict(result), default=str))
+            f.write("\n  ]\n}\n")
+
     def print_summary(self) -> None:
         """Print a summary of the batch execution."""
         print(f"Batch Report: {self.runbook_name}")
         print(f"Total Jobs: {self.total_jobs}")
         print(f"Successful: {self.successful_jobs}")
         print(f"Failed: {self.failed_jobs}")
-        print(".1f")
+        if self.timed_out_jobs:
+            print(f"Timed out: {self.timed_out_jobs}")
+        if self.skipped_jobs:
+            print(f"Skipped: {self.skipped_jobs}")
+        print(f"Success Rate: {self.success_rate:.1f}%")
+        if self.stopped_reason:
+            print(f"Stopped early: {self.stopped_reason}")
         print("\nJob Details:")
         for result in self.results:
             status = "✓" if result.success else "✗"
             print(f"{status} {result.job_id}: {result.issue_url}")
             if result.error:
-                print(f"  Error: {result.error}")
\ No newline at end of file
+                print(f"  Error: {result.error}")
+
+
+def job_result_to_dict(job_result: JobResult) -> Dict[str, Any]:
+    """Flat, JSON-serialisable view of a job result."""
+    data: Dict[str, Any] = {
+        "job_id": job_result.job_id,
+        "issue_url": job_result.issue_url,
+        "success": job_result.success,
+        "status": job_result.status,
+        "error": job_result.error,
+        "duration": job_result.duration,
+        "timings": job_result.timings,
+        "hedged": job_result.hedged,
+        "agent": job_result.agent,
+        "repo": job_result.repo,
+        "commit": job_result.commit,
+        "details_path": job_result.details_path,
+        "artifacts_path": job_result.artifacts_path,
+    }
+    if job_result.result is not None:
+        data["details"] = job_result.result.details
+        data["artifacts"] = job_result.result.artifacts
+    return data
+
+
+def job_result_from_dict(data: Dict[str, Any]) -> JobResult:
+    """Inverse of :func:`job_result_to_dict`."""
+    result = None
+    if "details" in data:
+        result = EvaluationResult(
+            success=bool(data["success"]), details=data["details"], artifacts=data.get("artifacts")
+        )
+    return JobResult(
+        job_id=data["job_id"],
+        issue_url=data.get("issue_url"),
+        success=bool(data["success"]),
+        error=data.get("error"),
+        result=result,
+        status=data.get("status"),
+        duration=data.get("duration"),
+        timings=data.get("timings"),
+        hedged=bool(data.get("hedged", False)),
+        agent=data.get("agent"),
+        repo=data.get("repo"),
+        commit=data.get("commit"),
+        details_path=data.get("details_path"),
+        artifacts_path=data.get("artifacts_path"),
+    )
+
+
+def read_journal(path: str | os.PathLike[str]) -> Iterator[JobResult]:
+    """Yield the job results recorded in a ``results.jsonl`` journal.
+
+    A truncated last line (from a node that died mid-write) is ignored.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            yield job_result_from_dict(data)
+
+
+def merge_journals(
+    paths: Iterable[str | os.PathLike[str]],
+    runbook_name: str = "merged",
+    expected_job_ids: Optional[Iterable[str]] = None,
+) -> BatchReport:
+    """Combine shard journals into a single :class:`BatchReport`.
+
+    When a job appears more than once (e.g. a shard was re-run) a later
+    non-skipped result replaces an earlier one. Jobs listed in
+    ``expected_job_ids`` but missing from every journal are reported as
+    skipped, in that order; other results keep journal order.
+    """
+    merged: Dict[str, JobResult] = {}
+    for path in paths:
+        for job_result in read_journal(path):
+            previous = merged.get(job_result.job_id)
+            if previous is None or job_result.status != STATUS_SKIPPED:
+                merged[job_result.job_id] = job_result
+
+    if expected_job_ids is not None:
+        ordered = []
+        for job_id in expected_job_ids:
+            job_result = merged.pop(job_id, None)
+            if job_result is None:
+                job_result = JobResult(
+                    job_id=job_id, issue_url=None, success=False,
+                    error="missing from shard journals", result=None, status=STATUS_SKIPPED,
+                )
+            ordered.append(job_result)
+        results = ordered + list(merged.values())
+    else:
+        results = list(merged.values())
+
+    return BatchReport(
+        runbook_name=runbook_name,
+        total_jobs=len(results),
+        successful_jobs=sum(1 for r in results if r.success),
+        failed_jobs=sum(1 for r in results if not r.success),
+        results=results,
+    )
+
+
+class ResultSink(Protocol):
+    """Receives each ``JobResult`` as soon as the runner has it."""
+
+    def write(self, job_result: JobResult) -> None:
+        """Record one finished (or skipped) job."""
+
+    def close(self) -> None:
+        """Flush and release resources at the end of the batch."""
+
+
+def safe_name(job_id: str) -> str:
+    """``job_id`` as a single path component, for per-job files and directories."""
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", job_id)
+    return name if name.strip(".") else "_"  # never "", "." or ".."
+
+
+class ArtifactSpillSink:
+    """Moves ``details`` and ``artifacts`` out of memory into per-job files.
+
+    Files are written to ``<output_dir>/jobs/<job id>/`` and the job result
+    keeps only their paths, so later sinks and the final report stay small.
+    Place this sink first.
+    """
+
+    def __init__(self, output_dir: str | os.PathLike[str]):
+        self.jobs_dir = Path(output_dir) / "jobs"
+
+    def write(self, job_result: JobResult) -> None:
+        result = job_result.result
+        if result is None:
+            return
+        job_dir = self.jobs_dir / safe_name(job_result.job_id)
+        job_dir.mkdir(parents=True, exist_ok=True)
+        details_path = job_dir / "details.txt"
+        details_path.write_text(result.details or "", encoding="utf-8")
+        job_result.details_path = str(details_path)
+        if result.artifacts:
+            artifacts_path = job_dir / "artifacts.json"
+            artifacts_path.write_text(json.dumps(result.artifacts, indent=2, default=str), encoding="utf-8")
+            job_result.artifacts_path = str(artifacts_path)
+        job_result.result = None
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlSink:
+    """Appends one JSON object per job to a file, flushed after every line."""
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def write(self, job_result: JobResult) -> None:
+        self._file.write(json.dumps(job_result_to_dict(job_result), default=str) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class CsvSink:
+    """Writes one CSV row per job; phase timings become ``<phase>_s`` columns."""
+
+    columns = ["job_id", "issue_url", "agent", "repo", "commit", "status", "success", "duration",
+               "prepare_s", "verify_s", "hedged", "error", "details_path", "artifacts_path"]
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8", newline="")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.columns, extrasaction="ignore")
+        self._writer.writeheader()
+
+    def write(self, job_result: JobResult) -> None:
+        row = job_result_to_dict(job_result)
+        for phase, seconds in (job_result.timings or {}).items():
+            row[f"{phase}_s"] = f"{seconds:.3f}"
+        if job_result.duration is not None:
+            row["duration"] = f"{job_result.duration:.3f}"
+        self._writer.writerow(row)
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+@dataclass
+class RunningSummary:
+    """Aggregate counters updated per job; never holds the results themselves."""
+
+    total: int = 0
+    successful: int = 0
+    status_counts: Dict[str, int] = field(default_factory=dict)
+    duration_total: float = 0.0
+    duration_max: float = 0.0
+    phase_totals: Dict[str, float] = field(default_factory=dict)
+
+    def add(self, job_result: JobResult) -> None:
+        self.total += 1
+        self.successful += int(job_result.success)
+        self.status_counts[job_result.status] = self.status_counts.get(job_result.status, 0) + 1
+        if job_result.duration is not None:
+            self.duration_total += job_result.duration
+            self.duration_max = max(self.duration_max, job_result.duration)
+        for phase, seconds in (job_result.timings or {}).items():
+            self.phase_totals[phase] = self.phase_totals.get(phase, 0.0) + seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "successful": self.successful,
+            "failed": self.total - self.successful,
+            "success_rate": (self.successful / self.total * 100.0) if self.total else 0.0,
+            "status_counts": dict(self.status_counts),
+            "mean_duration": self.duration_total / self.total if self.total else 0.0,
+            "max_duration": self.duration_max,
+            "phase_totals": dict(self.phase_totals),
+        }
+
+
+class SummarySink:
+    """Keeps a :class:`RunningSummary` and periodically rewrites it as JSON.
+
+    The file is replaced atomically, so readers always see a complete
+    document while the batch is still running.
+    """
+
+    def __init__(self, path: str | os.PathLike[str], runbook_name: str = "", total_jobs: Optional[int] = None,
+                 flush_interval: float = 5.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.runbook_name = runbook_name
+        self.total_jobs = total_jobs
+        self.flush_interval = flush_interval
+        self.summary = RunningSummary()
+        self._started = time.time()
+        self._last_flush = 0.0
+
+    def write(self, job_result: JobResult) -> None:
+        self.summary.add(job_result)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self, finished: bool = False) -> None:
+        data = {
+            "runbook_name": self.runbook_name,
+            "expected_jobs": self.total_jobs,
+            "started_at": self._started,
+            "updated_at": time.time(),
+            "finished": finished,
+            **self.summary.as_dict(),
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush(finished=True)
+
+
+def default_sinks(output_dir: str | os.PathLike[str], runbook_name: str = "",
+                  total_jobs: Optional[int] = None) -> List[ResultSink]:
+    """Spill, JSONL, CSV and summary sinks writing under ``output_dir``."""
+    output_dir = Path(output_dir)
+    return [
+        ArtifactSpillSink(output_dir),
+        JsonlSink(output_dir / "results.jsonl"),
+        CsvSink(output_dir / "results.csv"),
+        SummarySink(output_dir / "summary.json", runbook_name=runbook_name, total_jobs=total_jobs),
+    ]
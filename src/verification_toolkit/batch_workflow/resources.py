@@ -0,0 +1,337 @@
+"""Process-wide CPU budget, and declared per-job resources for scheduling.
+
+:class:`CpuBudget` counts CPU slots shared by the batch runner and execution
+backends. :class:`ResourcePool` packs jobs by their declared (or learnt)
+CPU, memory and disk requests against the machine's measured capacity.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from verification_toolkit.github import DEFAULT_RUNTIME_DIR
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_RESOURCE_HISTORY = Path(
+    os.environ.get("LINGXI_RESOURCE_HISTORY", DEFAULT_RUNTIME_DIR.parent / "resource-history.json")
+)
+
+
+class CpuBudget:
+    """Counts CPU slots in use across every job in the process.
+
+    Each running job holds one slot through :meth:`hold`, which never blocks
+    (a job must always be able to make progress on its own slot). Work that
+    can fan out, such as sharded test runs, asks for extra slots with
+    :meth:`try_acquire` and only gets what is free, so the process as a
+    whole stays within ``capacity`` cores unless more jobs than cores run.
+    """
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = max(1, capacity or os.cpu_count() or 1)
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> int:
+        with self._lock:
+            return max(0, self.capacity - self.in_use)
+
+    def try_acquire(self, count: int) -> int:
+        """Take up to ``count`` free slots without waiting; return how many."""
+        with self._lock:
+            granted = max(0, min(count, self.capacity - self.in_use))
+            self.in_use += granted
+            return granted
+
+    def release(self, count: int) -> None:
+        with self._lock:
+            self.in_use = max(0, self.in_use - count)
+
+    @contextmanager
+    def hold(self, count: int = 1) -> Iterator[None]:
+        """Occupy ``count`` slots for the block, even beyond ``capacity``."""
+        with self._lock:
+            self.in_use += count
+        try:
+            yield
+        finally:
+            self.release(count)
+
+
+_shared_budget: Optional[CpuBudget] = None
+_shared_lock = threading.Lock()
+
+
+def shared_cpu_budget() -> CpuBudget:
+    """The budget used when none is passed explicitly (``os.cpu_count()`` slots)."""
+    global _shared_budget
+    with _shared_lock:
+        if _shared_budget is None:
+            capacity = os.environ.get("LINGXI_CPU_BUDGET")
+            _shared_budget = CpuBudget(int(capacity) if capacity else None)
+        return _shared_budget
+
+
+RESOURCE_KINDS = ("cpu", "memory", "disk")
+_UNITS = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+_QUANTITY_RE = re.compile(r"^\s*([0-9]*\.?[0-9]+)\s*([kmgt]?)i?b?\s*$", re.IGNORECASE)
+
+
+def parse_quantity(value: Any) -> float:
+    """Cores or bytes from a number or a size such as ``"512M"``/``"4GiB"``."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = _QUANTITY_RE.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid resource quantity: {value!r}")
+    return float(match.group(1)) * _UNITS[match.group(2).lower()]
+
+
+@dataclass(frozen=True)
+class ResourceRequest:
+    """CPU cores, memory bytes and disk bytes a job needs (or a machine has)."""
+
+    cpu: float = 1.0
+    memory: float = 0.0
+    disk: float = 0.0
+
+    @classmethod
+    def fields_from(cls, data: Optional[Dict[str, Any]]) -> Dict[str, float]:
+        """Parse the fields set in ``data``; unknown keys raise ValueError."""
+        unknown = set(data or {}) - set(RESOURCE_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown resources: {', '.join(sorted(unknown))} (expected {', '.join(RESOURCE_KINDS)})")
+        return {kind: parse_quantity(value) for kind, value in (data or {}).items() if value is not None}
+
+    def fits(self, available: "ResourceRequest") -> bool:
+        return all(getattr(self, kind) <= getattr(available, kind) + 1e-9 for kind in RESOURCE_KINDS)
+
+    def capped(self, capacity: "ResourceRequest") -> "ResourceRequest":
+        """This request limited to ``capacity``, so an oversized job can still run alone."""
+        return ResourceRequest(**{kind: min(getattr(self, kind), getattr(capacity, kind)) for kind in RESOURCE_KINDS})
+
+    def __add__(self, other: "ResourceRequest") -> "ResourceRequest":
+        return ResourceRequest(**{kind: getattr(self, kind) + getattr(other, kind) for kind in RESOURCE_KINDS})
+
+    def __sub__(self, other: "ResourceRequest") -> "ResourceRequest":
+        return ResourceRequest(**{kind: getattr(self, kind) - getattr(other, kind) for kind in RESOURCE_KINDS})
+
+
+def measure_capacity(path: str | os.PathLike[str] = ".") -> ResourceRequest:
+    """This machine's CPUs, available memory, and free disk under ``path``."""
+    memory = 0.0
+    try:
+        with open("/proc/meminfo", encoding="ascii") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    memory = float(line.split()[1]) * 1024
+                    break
+    except OSError:
+        pass
+    if not memory and hasattr(os, "sysconf"):
+        try:
+            memory = float(os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE"))
+        except (ValueError, OSError):  # pragma: no cover - platform specific
+            pass
+    path = Path(path).resolve()
+    while not path.exists():
+        path = path.parent
+    return ResourceRequest(
+        cpu=float(os.cpu_count() or 1),
+        memory=memory or float("inf"),
+        disk=float(shutil.disk_usage(path).free),
+    )
+
+
+class ResourcePool:
+    """Reservations of declared job resources against a machine's capacity.
+
+    Unlike :class:`CpuBudget` slots, reservations are all-or-nothing: the
+    batch runner only starts a job once its whole request fits. A job is
+    always admitted when nothing else is running, so an oversized request
+    cannot stall the batch.
+    """
+
+    def __init__(self, capacity: ResourceRequest):
+        self.capacity = capacity
+        self.in_use = ResourceRequest(cpu=0.0)
+        self.running = 0
+        self._lock = threading.Lock()
+
+    def try_reserve(self, request: ResourceRequest) -> bool:
+        with self._lock:
+            if self.running and not request.fits(self.capacity - self.in_use):
+                return False
+            self.in_use += request
+            self.running += 1
+            return True
+
+    def release(self, request: ResourceRequest) -> None:
+        with self._lock:
+            self.in_use = ResourceRequest(
+                **{kind: max(0.0, getattr(self.in_use - request, kind)) for kind in RESOURCE_KINDS}
+            )
+            self.running = max(0, self.running - 1)
+
+
+@dataclass
+class JobUsage:
+    """Peak CPU (cores) and memory (bytes) sampled from a job's processes."""
+
+    cpu: float = 0.0
+    memory: float = 0.0
+    samples: int = 0
+
+
+class UsageSampler:
+    """Samples the processes of running jobs from ``/proc``.
+
+    Job subprocesses are started in their own sessions (see
+    :func:`~.cancellation.run_process`), so every process in the session of
+    a process tracked by the job's token belongs to the job. One thread
+    serves all jobs; without ``/proc`` nothing is measured.
+    """
+
+    interval = 0.5
+
+    def __init__(self) -> None:
+        self._jobs: Dict[int, Tuple[Any, JobUsage]] = {}
+        self._ticks: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+        self._last = time.monotonic()
+
+    @contextmanager
+    def track(self, token: Any) -> Iterator[JobUsage]:
+        """Measure the processes registered on ``token`` while the block runs."""
+        usage = JobUsage()
+        with self._lock:
+            self._jobs[id(usage)] = (token, usage)
+            if self._thread is None and os.path.isdir("/proc"):
+                self._thread = threading.Thread(target=self._run, name="usage-sampler", daemon=True)
+                self._thread.start()
+        try:
+            yield usage
+        finally:
+            with self._lock:
+                self._jobs.pop(id(usage), None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.sample()
+            except Exception:  # noqa: BLE001 - sampling is best effort
+                LOGGER.debug("Resource sampling failed", exc_info=True)
+
+    def sample(self) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        sessions = {process.pid: usage for token, usage in jobs for process in token.processes()}
+        now = time.monotonic()
+        elapsed, self._last = max(now - self._last, 1e-3), now
+        totals: Dict[int, List[float]] = {}
+        ticks: Dict[int, int] = {}
+        if sessions:
+            for entry in os.scandir("/proc"):
+                if not entry.name.isdigit():
+                    continue
+                try:
+                    with open(f"/proc/{entry.name}/stat", "rb") as handle:
+                        fields = handle.read().rsplit(b")", 1)[1].split()
+                except OSError:
+                    continue
+                session = int(fields[3])
+                if session not in sessions:
+                    continue
+                pid = int(entry.name)
+                ticks[pid] = int(fields[11]) + int(fields[12])
+                cpu = (ticks[pid] - self._ticks.get(pid, ticks[pid])) / self._clock_ticks / elapsed
+                total = totals.setdefault(session, [0.0, 0.0])
+                total[0] += cpu
+                total[1] += int(fields[21]) * self._page_size
+        self._ticks = ticks
+        for session, (cpu, memory) in totals.items():
+            usage = sessions[session]
+            usage.cpu = max(usage.cpu, cpu)
+            usage.memory = max(usage.memory, memory)
+            usage.samples += 1
+
+
+_usage_sampler: Optional[UsageSampler] = None
+
+
+def usage_sampler() -> UsageSampler:
+    global _usage_sampler
+    with _shared_lock:
+        if _usage_sampler is None:
+            _usage_sampler = UsageSampler()
+        return _usage_sampler
+
+
+class ResourceHistory:
+    """Per-repository resource usage from earlier runs, stored as JSON.
+
+    Used to fill in requests that a job doesn't declare. Memory estimates
+    get ``headroom`` on top of the smoothed peak, since underestimating it
+    is what gets jobs OOM-killed.
+    """
+
+    smoothing = 0.5
+    headroom = 1.25
+
+    def __init__(self, path: Optional[Path]):
+        self.path = path
+        self._lock = threading.Lock()
+        self.usage: Dict[str, Dict[str, float]] = self._load() if path else {}
+
+    def _load(self) -> Dict[str, Dict[str, float]]:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def estimate(self, key: Optional[str]) -> Dict[str, float]:
+        known = self.usage.get(key or "")
+        if not known:
+            return {}
+        estimate = {"cpu": max(1.0, known.get("cpu", 1.0))}
+        if known.get("memory"):
+            estimate["memory"] = known["memory"] * self.headroom
+        return estimate
+
+    def record(self, key: Optional[str], usage: JobUsage) -> None:
+        if not key or not usage.samples:
+            return
+        with self._lock:
+            previous = self.usage.get(key, {})
+            self.usage[key] = {
+                kind: value if kind not in previous else previous[kind] + self.smoothing * (value - previous[kind])
+                for kind, value in (("cpu", usage.cpu), ("memory", usage.memory))
+            }
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            merged = {**self._load(), **self.usage}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(merged, indent=2, sort_keys=True), encoding="utf-8")
+            tmp.replace(self.path)
+        except OSError as exc:
+            LOGGER.warning("Unable to save resource history to %s: %s", self.path, exc)
@@ -3,127 +3,514 @@
 from __future__ import annotations
 
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-from typing import List
+import contextlib
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ContextManager, Dict, List, Optional, Tuple
 
-from .config import Runbook
+from verification_toolkit import EvaluationResult
+from verification_toolkit.github import DEFAULT_RUNTIME_DIR, parse_issue_url
+
+from .cancellation import CancellationToken, JobCancelled, JobTimeoutError
+from .config import JobConfig, Runbook
+from .backends.local import use_log_dir
 from .executor import JobExecutor
-from .report import BatchReport, JobResult
+from .hedging import Hedger, JobAttempt
+from .report import (
+    STATUS_CANCELLED,
+    STATUS_SKIPPED,
+    STATUS_SUCCESS,
+    STATUS_TIMEOUT,
+    BatchReport,
+    JobResult,
+    ResultSink,
+    safe_name,
+)
+from .resources import (
+    DEFAULT_RESOURCE_HISTORY,
+    CpuBudget,
+    ResourceHistory,
+    ResourcePool,
+    ResourceRequest,
+    measure_capacity,
+    shared_cpu_budget,
+    usage_sampler,
+)
+
+if TYPE_CHECKING:  # pragma: no cover
+    from verification_toolkit.snapshots import SnapshotStore
+
+    from .context.swebench import SWEBenchDataset
+    from .daemon import WarmPool
+    from .environments import EnvironmentCache
+    from .metrics import BatchMetrics
+    from .ordering import DurationEstimator
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _repo_slug(issue_url: Optional[str]) -> Optional[str]:
+    owner, project, _number = parse_issue_url(issue_url or "")
+    return f"{owner}/{project}" if owner else None
+
+
+class BatchBudget:
+    """Batch-level budgets: wall-clock deadline and failure limits.
+
+    Once a budget is exhausted the batch token is cancelled, which cancels
+    every running job and stops new ones from being scheduled.
+    """
+
+    def __init__(self, runbook: Runbook):
+        self.runbook = runbook
+        self.token = CancellationToken()
+        self.completed = 0
+        self.failures = 0
+        self.stopped_reason: Optional[str] = None
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def stopped(self) -> bool:
+        return self.token.cancelled
+
+    def start(self) -> None:
+        if self.runbook.deadline is not None:
+            reason = f"deadline of {self.runbook.deadline:g}s exceeded"
+            self._timer = threading.Timer(self.runbook.deadline, self.stop, args=(reason,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def finish(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def stop(self, reason: str) -> None:
+        with self._lock:
+            if self.stopped_reason is None:
+                self.stopped_reason = reason
+        self.token.cancel(f"batch stopped: {reason}")
+
+    def record(self, job_result: JobResult) -> None:
+        """Account for a finished job and stop the batch if a budget is exhausted."""
+        if job_result.status in (STATUS_SKIPPED, STATUS_CANCELLED):
+            return
+        reason = None
+        with self._lock:
+            self.completed += 1
+            if job_result.status != STATUS_SUCCESS:
+                self.failures += 1
+            max_failures = self.runbook.max_failures
+            max_rate = self.runbook.max_failure_rate
+            if max_failures is not None and self.failures >= max_failures:
+                reason = f"{self.failures} failures (limit {max_failures})"
+            elif (
+                max_rate is not None
+                and self.completed >= self.runbook.failure_rate_min_jobs
+                and self.failures * 100.0 / self.completed > max_rate
+            ):
+                rate = self.failures * 100.0 / self.completed
+                reason = f"failure rate {rate:.1f}% over {max_rate:g}%"
+        if reason:
+            self.stop(reason)
 
 
 class BatchRunner:
     """Runs multiple verification jobs in batch."""
 
-    def __init__(self, runbook: Runbook, max_workers: int = 4):
+    def __init__(
+        self,
+        runbook: Runbook,
+        max_workers: int = 4,
+        sinks: Optional[List[ResultSink]] = None,
+        pool: Optional[WarmPool] = None,
+        cpu_budget: Optional[CpuBudget] = None,
+        durations: Optional[DurationEstimator] = None,
+        metrics: Optional[BatchMetrics] = None,
+    ):
         self.runbook = runbook
         self.max_workers = max_workers
+        # Each result is handed to every sink as soon as it is known; sinks
+        # are closed when the run ends.
+        self.sinks: List[ResultSink] = list(sinks or [])
+        # Live metrics: a sink for finished jobs that also sees jobs start.
+        self.metrics = metrics
+        if metrics is not None and metrics not in self.sinks:
+            self.sinks.append(metrics)
+        # Long-lived context providers and agents to reuse instead of
+        # building new ones per job (``batch-workflow serve``).
+        self.pool = pool
+        # Every running job holds one slot; backends that fan out (sharded
+        # test runs) only take the slots left over.
+        self.cpu_budget = cpu_budget or shared_cpu_budget()
+        # Optional features import their modules only when enabled.
+        self.environments: Optional[EnvironmentCache] = None
+        if runbook.environments:
+            from .environments import EnvironmentCache
+
+            self.environments = EnvironmentCache(
+                root=runbook.environment_cache_dir, max_entries=runbook.environment_cache_size
+            )
+        self.snapshots: Optional[SnapshotStore] = None
+        if runbook.snapshots:
+            from verification_toolkit.snapshots import SnapshotStore
+
+            self.snapshots = SnapshotStore(root=runbook.snapshot_dir, max_entries=runbook.snapshot_cache_size)
+        # Opened (and indexed) by the first swerex job, then shared. Queue
+        # workers only learn job types as they claim them.
+        self.dataset: Optional[SWEBenchDataset] = None
+        self.dataset_path = runbook.dataset
+        self._dataset_lock = threading.Lock()
+        # With ``resource_scheduling``, parallel jobs start only while their
+        # declared (or learnt) resources fit the machine's capacity.
+        self.resource_pool: Optional[ResourcePool] = None
+        self.resource_history: Optional[ResourceHistory] = None
+        if runbook.resource_scheduling:
+            measured = measure_capacity(DEFAULT_RUNTIME_DIR)
+            capacity = {**asdict(measured), **ResourceRequest.fields_from(runbook.capacity)}
+            self.resource_pool = ResourcePool(ResourceRequest(**capacity))
+            self.resource_history = ResourceHistory(
+                Path(runbook.resource_history) if runbook.resource_history else DEFAULT_RESOURCE_HISTORY
+            )
+        # Expected durations for ``runbook.order``; reports keep file order.
+        self.durations = durations
+        if self.durations is None and runbook.order != "file":
+            from .ordering import DurationEstimator
+
+            try:
+                self.durations = DurationEstimator.from_reports(runbook.history or [])
+            except (OSError, ValueError) as exc:
+                LOGGER.warning("Running jobs in file order; could not load history: %s", exc)
 
     async def run_batch_async(self) -> BatchReport:
         """Run all jobs in the runbook asynchronously."""
-        jobs = []
-        for job_config in self.runbook.jobs:
-            executor = JobExecutor(job_config)
-            jobs.append(executor.execute())
-
-        # Run all jobs concurrently
-        results = await asyncio.gather(*jobs, return_exceptions=True)
-
-        # Process results
-        job_results = []
-        for i, result in enumerate(results):
-            job_config = self.runbook.jobs[i]
-            if isinstance(result, Exception):
-                job_result = JobResult(
-                    job_id=job_config.id,
-                    issue_url=job_config.issue_url,
-                    success=False,
-                    error=str(result),
-                    result=None
-                )
-            else:
-                job_result = JobResult(
-                    job_id=job_config.id,
-                    issue_url=job_config.issue_url,
-                    success=True,
-                    error=None,
-                    result=result
-                )
-            job_results.append(job_result)
+        budget = BatchBudget(self.runbook)
+        semaphore = asyncio.Semaphore(self.max_workers)
+        self._begin_metrics(self.max_workers)
 
-        return BatchReport(
-            runbook_name=self.runbook.name,
-            total_jobs=len(job_results),
-            successful_jobs=sum(1 for r in job_results if r.success),
-            failed_jobs=sum(1 for r in job_results if not r.success),
-            results=job_results
-        )
+        async def run(job_config: JobConfig) -> JobResult:
+            async with semaphore:
+                if budget.stopped:
+                    return self.emit(self._skipped_result(job_config, budget))
+                job_result = await self._run_job_async(job_config, budget.token.child())
+                budget.record(job_result)
+                return self.emit(job_result)
+
+        jobs = self.runbook.jobs
+        order = self.job_order()
+        job_results: List[Optional[JobResult]] = [None] * len(jobs)
+        budget.start()
+        try:
+            # Tasks queue on the semaphore in creation order.
+            for index, job_result in zip(order, await asyncio.gather(*(run(jobs[index]) for index in order))):
+                job_results[index] = job_result
+        finally:
+            budget.finish()
+            self.close()
+
+        return self._build_report(job_results, budget)
 
     def run_batch_sync(self) -> BatchReport:
         """Run all jobs in the runbook synchronously."""
-        job_results = []
+        budget = BatchBudget(self.runbook)
+        jobs = self.runbook.jobs
+        job_results: List[Optional[JobResult]] = [None] * len(jobs)
+        self._begin_metrics(1)
 
-        for job_config in self.runbook.jobs:
-            try:
-                executor = JobExecutor(job_config)
-                result = executor.execute_sync()
-                job_result = JobResult(
-                    job_id=job_config.id,
-                    issue_url=job_config.issue_url,
-                    success=result.success,
-                    error=None,
-                    result=result
-                )
-            except Exception as e:
-                job_result = JobResult(
-                    job_id=job_config.id,
-                    issue_url=job_config.issue_url,
-                    success=False,
-                    error=str(e),
-                    result=None
-                )
-            job_results.append(job_result)
+        budget.start()
+        try:
+            for index in self.job_order():
+                if budget.stopped:
+                    job_results[index] = self.emit(self._skipped_result(jobs[index], budget))
+                    continue
+                job_result = self.run_job(jobs[index], budget.token.child())
+                budget.record(job_result)
+                job_results[index] = self.emit(job_result)
+        finally:
+            budget.finish()
+            self.close()
 
-        return BatchReport(
-            runbook_name=self.runbook.name,
-            total_jobs=len(job_results),
-            successful_jobs=sum(1 for r in job_results if r.success),
-            failed_jobs=sum(1 for r in job_results if not r.success),
-            results=job_results
-        )
+        return self._build_report(job_results, budget)
 
     def run_batch_parallel(self) -> BatchReport:
-        """Run jobs in parallel using thread pool."""
-        job_results = []
+        """Run jobs in parallel using thread pool.
+
+        With ``runbook.hedge`` set, stragglers near the end of the batch are
+        duplicated on idle workers (see :class:`Hedger`).
+        """
+        budget = BatchBudget(self.runbook)
+        jobs = self.runbook.jobs
+        job_results: List[Optional[JobResult]] = [None] * len(jobs)
+        hedger = Hedger(self.runbook, self.max_workers) if self.runbook.hedge else None
+        self._begin_metrics(self.max_workers)
+
+        # Jobs not yet handed to the pool, and resources held by started ones.
+        waiting = self.job_order()
+        reservations: Dict[int, ResourceRequest] = {}
+
+        budget.start()
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures: Dict[Future, JobAttempt] = {}
+                # The budget's callback runs on the deadline timer's thread.
+                futures_lock = threading.Lock()
+                pending = set()
+
+                def drop_queued(_reason: str) -> None:
+                    with futures_lock:
+                        queued = list(futures)
+                    for future in queued:
+                        future.cancel()
+
+                # Registered before any job token so that queued jobs are
+                # dropped before running ones are cancelled and free a worker.
+                budget.token.add_callback(drop_queued)
+
+                def admit() -> None:
+                    """Start waiting jobs, in order, while their resources fit."""
+                    for index in list(waiting):
+                        if budget.stopped or (self.resource_pool and self.resource_pool.running >= self.max_workers):
+                            break
+                        if self.resource_pool:
+                            request = self.resource_request(jobs[index])
+                            if not self.resource_pool.try_reserve(request):
+                                continue  # smaller jobs further back may still fit
+                            reservations[index] = request
+                        waiting.remove(index)
+                        attempt = JobAttempt(index=index, token=budget.token.child())
+                        if hedger:
+                            hedger.track(attempt)
+                        future = executor.submit(self._run_attempt, jobs[index], attempt)
+                        with futures_lock:
+                            futures[future] = attempt
+                        pending.add(future)
+
+                admit()
+                while pending:
+                    done, pending = wait(
+                        pending,
+                        timeout=hedger.poll_interval if hedger else None,
+                        return_when=FIRST_COMPLETED,
+                    )
+                    for future in done:
+                        attempt = futures[future]
+                        if not attempt.hedge and attempt.index in reservations:
+                            self.resource_pool.release(reservations.pop(attempt.index))
+                        if not future.cancelled():
+                            job_result = future.result()
+                            # A result is dropped if it lost the race against its duplicate.
+                            if job_results[attempt.index] is None and (
+                                not hedger or hedger.accept(attempt, job_result)
+                            ):
+                                if hedger:
+                                    hedger.finish(attempt, job_result)
+                                job_results[attempt.index] = job_result
+                                budget.record(job_result)
+                                self.emit(job_result)
+                        if attempt.hedge:
+                            hedger.discard(attempt)
+                    if hedger and not budget.stopped:
+                        for duplicate in hedger.stragglers(jobs, budget.token):
+                            future = executor.submit(self._run_attempt, jobs[duplicate.index], duplicate)
+                            with futures_lock:
+                                futures[future] = duplicate
+                            pending.add(future)
+                    admit()
+            results = [
+                result if result is not None else self.emit(self._skipped_result(jobs[index], budget))
+                for index, result in enumerate(job_results)
+            ]
+        finally:
+            budget.finish()
+            self.close()
+            if self.resource_history:
+                self.resource_history.save()
+
+        return self._build_report(results, budget)
+
+    def job_order(self) -> List[int]:
+        """Indices of the runbook's jobs in the order they should start."""
+        if self.durations is None:
+            return list(range(len(self.runbook.jobs)))
+        return self.durations.order(self.runbook.jobs, self.runbook.order)
+
+    def resource_request(self, job_config: JobConfig) -> ResourceRequest:
+        """The job's declared resources, completed from history and runbook defaults.
+
+        Capped to the machine's capacity, so that an oversized job runs alone
+        instead of never.
+        """
+        fields = {
+            **ResourceRequest.fields_from(self.runbook.resources),
+            **(self.resource_history.estimate(self._resource_key(job_config)) if self.resource_history else {}),
+            **ResourceRequest.fields_from(job_config.resources),
+        }
+        request = ResourceRequest(**fields)
+        return request.capped(self.resource_pool.capacity) if self.resource_pool else request
+
+    @staticmethod
+    def _resource_key(job_config: JobConfig) -> str:
+        return _repo_slug(job_config.issue_url) or job_config.id
 
-        def run_job(job_config):
+    @contextlib.contextmanager
+    def _measure_usage(self, job_config: JobConfig, token: CancellationToken):
+        """Sample the job's processes and record their peak usage in the history."""
+        if self.resource_history is None:
+            yield
+            return
+        with usage_sampler().track(token) as usage:
             try:
-                executor = JobExecutor(job_config)
-                result = executor.execute_sync()
-                return JobResult(
-                    job_id=job_config.id,
-                    issue_url=job_config.issue_url,
-                    success=result.success,
-                    error=None,
-                    result=result
+                yield
+            finally:
+                self.resource_history.record(self._resource_key(job_config), usage)
+
+    def _begin_metrics(self, workers: int) -> None:
+        if self.metrics is not None:
+            self.metrics.begin(len(self.runbook.jobs), workers)
+
+    def emit(self, job_result: JobResult) -> JobResult:
+        """Hand a finished job's result to every sink; returns it."""
+        for sink in self.sinks:
+            sink.write(job_result)
+        return job_result
+
+    def close(self) -> None:
+        """Close the sinks; the ``run_batch_*`` methods do this when they end."""
+        for sink in self.sinks:
+            sink.close()
+
+    @contextlib.contextmanager
+    def _job_environment(self, job_config: JobConfig, hedge: bool = False):
+        """Hold the job's CPU slot, point backends at its log directory and count it as running."""
+        job_dir = Path(self.runbook.output_dir) / "jobs" / safe_name(job_config.id)
+        log_dir = job_dir / ("logs-hedge" if hedge else "logs")
+        running = self.metrics.running() if self.metrics is not None else contextlib.nullcontext()
+        with self.cpu_budget.hold(1), use_log_dir(log_dir), running:
+            yield
+
+    def _job_resources(self, job_config: JobConfig, workspace_dir: Optional[str] = None) -> ContextManager[Tuple[Any, Any]]:
+        """Pooled ``(context_provider, agent)`` for a job, or ``(None, None)``."""
+        if self.pool is None:
+            return contextlib.nullcontext((None, None))
+        return self.pool.job_resources(
+            job_config, workspace_dir, environments=self.environments, snapshots=self.snapshots
+        )
+
+    def _job_dataset(self, job_config: JobConfig) -> Optional[SWEBenchDataset]:
+        """The shared SWE-bench dataset, opened on the first swerex job."""
+        if self.dataset is None and job_config.type == "swerex":
+            from .context import swebench
+
+            path = self.dataset_path or swebench.DEFAULT_SWEBENCH_DATASET
+            with self._dataset_lock:
+                if self.dataset is None and path:
+                    self.dataset = swebench.open_dataset(path)
+        return self.dataset
+
+    def run_job(self, job_config: JobConfig, token: Optional[CancellationToken] = None) -> JobResult:
+        """Run one job to a :class:`JobResult`; exceptions become failed results."""
+        return self._run_attempt(job_config, JobAttempt(index=-1, token=token or CancellationToken()))
+
+    def _run_attempt(self, job_config: JobConfig, attempt: JobAttempt) -> JobResult:
+        attempt.started = time.monotonic()
+        start = time.perf_counter()
+        try:
+            with self._job_environment(job_config, hedge=attempt.hedge), \
+                    self._measure_usage(job_config, attempt.token), \
+                    self._job_resources(job_config, attempt.workspace_dir) as (context_provider, agent):
+                executor = JobExecutor(
+                    job_config,
+                    token=attempt.token,
+                    timings=attempt.timings,
+                    workspace_dir=attempt.workspace_dir,
+                    metadata=attempt.metadata,
+                    context_provider=context_provider,
+                    agent=agent,
+                    environments=self.environments,
+                    snapshots=self.snapshots,
+                    dataset=self._job_dataset(job_config),
                 )
-            except Exception as e:
-                return JobResult(
-                    job_id=job_config.id,
-                    issue_url=job_config.issue_url,
-                    success=False,
-                    error=str(e),
-                    result=None
+                result = executor.execute_sync()
+        except Exception as e:
+            return self._job_result(job_config, None, e, attempt.timings, start, attempt.metadata)
+        finally:
+            attempt.done = True
+        return self._job_result(job_config, result, None, attempt.timings, start, attempt.metadata)
+
+    async def _run_job_async(self, job_config: JobConfig, token: CancellationToken) -> JobResult:
+        timings: Dict[str, float] = {}
+        metadata: Dict[str, Any] = {}
+        start = time.perf_counter()
+        try:
+            with self._job_environment(job_config), self._job_resources(job_config) as (context_provider, agent):
+                executor = JobExecutor(
+                    job_config,
+                    token=token,
+                    timings=timings,
+                    metadata=metadata,
+                    context_provider=context_provider,
+                    agent=agent,
+                    environments=self.environments,
+                    snapshots=self.snapshots,
+                    dataset=self._job_dataset(job_config),
                 )
+                result = await executor.execute()
+        except Exception as e:
+            return self._job_result(job_config, None, e, timings, start, metadata)
+        return self._job_result(job_config, result, None, timings, start, metadata)
 
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            futures = [executor.submit(run_job, job) for job in self.runbook.jobs]
-            for future in futures:
-                job_results.append(future.result())
+    @staticmethod
+    def _job_result(
+        job_config: JobConfig,
+        result: Optional[EvaluationResult],
+        error: Optional[Exception],
+        timings: Dict[str, float],
+        start: float,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> JobResult:
+        status = None
+        if isinstance(error, JobTimeoutError):
+            status = STATUS_TIMEOUT
+        elif isinstance(error, JobCancelled):
+            status = STATUS_CANCELLED
+        return JobResult(
+            job_id=job_config.id,
+            issue_url=job_config.issue_url,
+            success=result.success if result is not None else False,
+            error=str(error) if error is not None else None,
+            result=result,
+            status=status,
+            duration=time.perf_counter() - start,
+            timings=dict(timings) or None,
+            agent=job_config.agent,
+            repo=(metadata or {}).get("repo") or _repo_slug(job_config.issue_url),
+            commit=(metadata or {}).get("commit"),
+        )
+
+    @staticmethod
+    def _skipped_result(job_config: JobConfig, budget: BatchBudget) -> JobResult:
+        return JobResult(
+            job_id=job_config.id,
+            issue_url=job_config.issue_url,
+            success=False,
+            error=f"not started: batch stopped ({budget.stopped_reason or budget.token.reason})",
+            result=None,
+            status=STATUS_SKIPPED,
+            agent=job_config.agent,
+            repo=_repo_slug(job_config.issue_url),
+        )
 
+    def _build_report(self, job_results: List[JobResult], budget: BatchBudget) -> BatchReport:
         return BatchReport(
             runbook_name=self.runbook.name,
             total_jobs=len(job_results),
             successful_jobs=sum(1 for r in job_results if r.success),
             failed_jobs=sum(1 for r in job_results if not r.success),
-            results=job_results
-        )
\ No newline at end of file
+            results=job_results,
+            stopped_reason=budget.stopped_reason,
+        )
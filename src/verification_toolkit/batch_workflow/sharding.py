@@ -0,0 +1,62 @@
+"""Deterministic sharding of a runbook across independent nodes.
+
+Every node loads the same runbook and keeps only the jobs whose stable hash
+lands on its shard, so no coordinator is needed. With repo affinity the hash
+is taken over the repository instead of the job ID, keeping all jobs for a
+repository (and its clone cache) on one node.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import re
+from dataclasses import replace
+from pathlib import Path
+from typing import Tuple
+
+from verification_toolkit.github import parse_issue_url
+
+from .config import JobConfig, Runbook
+
+
+def parse_shard_spec(spec: str) -> Tuple[int, int]:
+    """Parse ``"i/N"`` (0-based ``i``) into ``(i, N)``."""
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", spec)
+    if not match:
+        raise ValueError(f"Invalid shard spec {spec!r}: expected 'i/N'")
+    index, count = int(match.group(1)), int(match.group(2))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard spec {spec!r}: need 0 <= i < N")
+    return index, count
+
+
+def shard_key(job: JobConfig, repo_affinity: bool = False) -> str:
+    """The string hashed to place ``job``; falls back to the job ID."""
+    if repo_affinity:
+        owner, project, _number = parse_issue_url(job.issue_url or "")
+        if owner:
+            return f"repo:{owner}/{project}"
+        if job.instance_id and "__" in job.instance_id:
+            # SWE-bench style "owner__project-1234"
+            return "repo:" + job.instance_id.rsplit("-", 1)[0]
+    return f"job:{job.id}"
+
+
+def shard_of(key: str, count: int) -> int:
+    """Stable shard number for ``key``, identical across processes and hosts."""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def shard_runbook(runbook: Runbook, index: int, count: int, repo_affinity: bool = False) -> Runbook:
+    """Return the part of ``runbook`` that shard ``index`` of ``count`` runs.
+
+    The shard writes to ``<output_dir>/shard-<index>-of-<count>`` so that
+    nodes sharing a filesystem never write to the same files.
+    """
+    jobs = [job for job in runbook.jobs if shard_of(shard_key(job, repo_affinity), count) == index]
+    return replace(
+        runbook,
+        jobs=jobs,
+        output_dir=str(Path(runbook.output_dir) / f"shard-{index}-of-{count}"),
+    )
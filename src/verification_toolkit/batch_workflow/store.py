@@ -0,0 +1,222 @@
+"""SQLite run database for comparing batch runs over time.
+
+A :class:`RunStore` keeps one row per run, one per job and one per job
+phase, indexed by job ID, repository, commit and agent. Results reach it
+through :class:`SqliteResultSink`, which buffers rows and writes them in
+batches. The database runs in WAL mode, so shards or workers writing to a
+shared file do not block each other's readers.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .report import JobResult
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    total_jobs INTEGER,
+    successful_jobs INTEGER,
+    failed_jobs INTEGER,
+    metadata TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    job_id TEXT NOT NULL,
+    issue_url TEXT,
+    repo TEXT,
+    commit_sha TEXT,
+    agent TEXT,
+    status TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    error TEXT,
+    duration REAL,
+    hedged INTEGER NOT NULL DEFAULT 0,
+    details_path TEXT,
+    artifacts_path TEXT,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (run_id, job_id)
+);
+CREATE INDEX IF NOT EXISTS jobs_job_id ON jobs (job_id);
+CREATE INDEX IF NOT EXISTS jobs_repo ON jobs (repo);
+CREATE INDEX IF NOT EXISTS jobs_commit ON jobs (commit_sha);
+CREATE INDEX IF NOT EXISTS jobs_agent ON jobs (agent);
+CREATE TABLE IF NOT EXISTS phase_timings (
+    run_id INTEGER NOT NULL,
+    job_id TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (run_id, job_id, phase)
+);
+CREATE INDEX IF NOT EXISTS phase_timings_phase ON phase_timings (phase, seconds);
+"""
+
+
+class RunStore:
+    """Connection to a run database file, created on first use."""
+
+    def __init__(self, path: str | os.PathLike[str], timeout: float = 30.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=timeout, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "RunStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # -- writes ---------------------------------------------------------
+
+    def start_run(self, name: str, metadata: Optional[Dict[str, Any]] = None) -> int:
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO runs (name, started_at, metadata) VALUES (?, ?, ?)",
+                (name, time.time(), json.dumps(metadata or {}, default=str)),
+            )
+        return int(cursor.lastrowid)
+
+    def finish_run(self, run_id: int) -> None:
+        """Stamp the run as finished and store its job counts."""
+        with self.conn:
+            self.conn.execute(
+                """
+                UPDATE runs SET finished_at = ?,
+                    total_jobs = (SELECT COUNT(*) FROM jobs WHERE run_id = ?),
+                    successful_jobs = (SELECT COUNT(*) FROM jobs WHERE run_id = ? AND success),
+                    failed_jobs = (SELECT COUNT(*) FROM jobs WHERE run_id = ? AND NOT success)
+                WHERE run_id = ?
+                """,
+                (time.time(), run_id, run_id, run_id, run_id),
+            )
+
+    def insert_results(self, run_id: int, job_results: List[JobResult]) -> None:
+        """Insert (or replace) a batch of job results in one transaction."""
+        now = time.time()
+        job_rows = [
+            (
+                run_id, r.job_id, r.issue_url, r.repo, r.commit, r.agent, r.status, int(r.success),
+                r.error, r.duration, int(r.hedged), r.details_path, r.artifacts_path, now,
+            )
+            for r in job_results
+        ]
+        phase_rows = [
+            (run_id, r.job_id, phase, seconds)
+            for r in job_results
+            for phase, seconds in (r.timings or {}).items()
+        ]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", job_rows
+            )
+            self.conn.executemany("INSERT OR REPLACE INTO phase_timings VALUES (?, ?, ?, ?)", phase_rows)
+
+    # -- queries --------------------------------------------------------
+
+    def runs(self, name: Optional[str] = None, limit: int = 20) -> List[sqlite3.Row]:
+        """Most recent runs first, optionally filtered by runbook name."""
+        query = "SELECT * FROM runs"
+        params: Tuple[Any, ...] = ()
+        if name is not None:
+            query += " WHERE name = ?"
+            params = (name,)
+        return self.conn.execute(query + " ORDER BY run_id DESC LIMIT ?", params + (limit,)).fetchall()
+
+    def regressions(self, run_a: int, run_b: int) -> List[sqlite3.Row]:
+        """Jobs that succeeded in ``run_a`` but not in ``run_b``."""
+        return self.conn.execute(
+            """
+            SELECT b.job_id, b.repo, b.agent, a.commit_sha AS commit_a, b.commit_sha AS commit_b,
+                   b.status, b.error
+            FROM jobs AS a JOIN jobs AS b ON a.job_id = b.job_id
+            WHERE a.run_id = ? AND b.run_id = ? AND a.success AND NOT b.success
+            ORDER BY b.job_id
+            """,
+            (run_a, run_b),
+        ).fetchall()
+
+    def slowest_repos(self, phase: str = "prepare", limit: int = 10, run_id: Optional[int] = None) -> List[sqlite3.Row]:
+        """Repositories ordered by mean time spent in ``phase``."""
+        query = """
+            SELECT j.repo, COUNT(*) AS jobs, AVG(p.seconds) AS mean_seconds, MAX(p.seconds) AS max_seconds
+            FROM phase_timings AS p JOIN jobs AS j ON j.run_id = p.run_id AND j.job_id = p.job_id
+            WHERE p.phase = ?
+        """
+        params: Tuple[Any, ...] = (phase,)
+        if run_id is not None:
+            query += " AND p.run_id = ?"
+            params += (run_id,)
+        query += " GROUP BY j.repo ORDER BY mean_seconds DESC LIMIT ?"
+        return self.conn.execute(query, params + (limit,)).fetchall()
+
+    def job_history(self, job_id: str, limit: int = 20) -> List[sqlite3.Row]:
+        """Past results of one job, most recent first."""
+        return self.conn.execute(
+            "SELECT * FROM jobs WHERE job_id = ? ORDER BY run_id DESC LIMIT ?", (job_id, limit)
+        ).fetchall()
+
+    def durations(self, limit: int = 20000) -> List[sqlite3.Row]:
+        """``job_id``, ``repo`` and ``duration`` of jobs that ran, most recent first."""
+        return self.conn.execute(
+            """
+            SELECT job_id, repo, duration FROM jobs
+            WHERE duration IS NOT NULL AND status NOT IN ('skipped', 'cancelled')
+            ORDER BY run_id DESC, finished_at DESC LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+
+
+class SqliteResultSink:
+    """Result sink that records a run in a :class:`RunStore`.
+
+    Rows are buffered and written every ``batch_size`` results or
+    ``flush_interval`` seconds, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        run_name: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        batch_size: int = 100,
+        flush_interval: float = 5.0,
+    ):
+        self.store = RunStore(path)
+        self.run_id = self.store.start_run(run_name, metadata)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: List[JobResult] = []
+        self._last_flush = time.monotonic()
+
+    def write(self, job_result: JobResult) -> None:
+        self._buffer.append(job_result)
+        if len(self._buffer) >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            self.store.insert_results(self.run_id, self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        self.flush()
+        self.store.finish_run(self.run_id)
+        self.store.close()
@@ -0,0 +1,91 @@
+"""Tests for asynchronous agents and the bounded phase threads."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ..agents.registry import AgentRegistry
+from ..cancellation import JobTimeoutError, current_token
+from ..config import JobConfig, Runbook
+from ..executor import JobExecutor, PhaseThreads
+from ..runner import BatchRunner
+from verification_toolkit import EvaluationResult, is_async_agent
+
+
+class AsyncAgent:
+    """Waits on the event loop, like an agent calling a model API."""
+
+    active = 0
+    peak = 0
+    cancelled = 0
+
+    async def run_verification(self, context):
+        cls = type(self)
+        cls.active += 1
+        cls.peak = max(cls.peak, cls.active)
+        try:
+            assert current_token() is not None
+            await asyncio.sleep(context.sleep)
+        except asyncio.CancelledError:
+            cls.cancelled += 1
+            raise
+        finally:
+            cls.active -= 1
+        return EvaluationResult(success=True, details="async")
+
+
+def _job(job_id, sleep=0.0, **kwargs):
+    return JobConfig(
+        id=job_id, type="github", agent="async", issue_url=f"https://github.com/t/r/issues/{job_id}",
+        extra={"sleep": sleep}, **kwargs,
+    )
+
+
+@pytest.fixture(autouse=True)
+def fake_environment():
+    provider = Mock()
+    provider.prepare_context = lambda job_config: Mock(sleep=job_config.extra["sleep"])
+    AsyncAgent.active = AsyncAgent.peak = AsyncAgent.cancelled = 0
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider", return_value=provider), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=AsyncAgent()):
+        yield
+
+
+def test_registry_detects_async_agents():
+    registry = AgentRegistry()
+    registry.register("async", AsyncAgent)
+    assert registry.is_async("async") and not registry.is_async("demo")
+    assert is_async_agent(AsyncAgent())
+
+
+def test_hundreds_of_async_verifications_share_one_loop():
+    jobs = [_job(f"j{i}", sleep=0.5) for i in range(200)]
+    runner = BatchRunner(Runbook(name="async", jobs=jobs), max_workers=200)
+    threads_before = threading.active_count()
+    start = time.monotonic()
+    report = asyncio.run(runner.run_batch_async())
+    assert report.successful_jobs == 200
+    assert AsyncAgent.peak > 100
+    assert time.monotonic() - start < 10
+    # Only the (quick) prepare phases used threads.
+    assert threading.active_count() - threads_before <= 64
+
+
+def test_async_verify_timeout_cancels_the_coroutine():
+    with pytest.raises(JobTimeoutError):
+        JobExecutor(_job("slow", sleep=30, verify_timeout=0.2)).execute_sync()
+    assert AsyncAgent.cancelled == 1
+
+
+def test_phase_threads_are_bounded():
+    pool = PhaseThreads(max_threads=2)
+    release = threading.Event()
+    futures = [pool.submit(release.wait, 5) for _ in range(5)]
+    time.sleep(0.1)
+    assert pool.threads == 2
+    assert sum(f.running() for f in futures) == 2
+    release.set()
+    assert all(f.result(timeout=5) for f in futures)
@@ -0,0 +1,149 @@
+"""Tests for the serve daemon, its warm pool and the submit client."""
+
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ..config import JobConfig, Runbook
+from ..daemon import BatchDaemon, WarmPool, health, make_server, submit
+from ..runner import BatchRunner
+from verification_toolkit import EvaluationResult
+
+
+class CountingAgent:
+    instances = 0
+
+    def __init__(self):
+        CountingAgent.instances += 1
+
+    def run_verification(self, context):
+        return EvaluationResult(success=context.ok, details="done")
+
+
+def _provider_class(*args, **kwargs):
+    provider = Mock()
+    provider.prepare_context = lambda job_config: Mock(ok=job_config.id != "bad")
+    return provider
+
+
+@pytest.fixture()
+def daemon_server(tmp_path):
+    CountingAgent.instances = 0
+    daemon = BatchDaemon(max_workers=2)
+    server = make_server(daemon, socket_path=str(tmp_path / "d.sock"))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    with patch("verification_toolkit.batch_workflow.context.github.GitHubContextProvider", _provider_class), \
+            patch("verification_toolkit.batch_workflow.agents.registry.get_agent",
+                  side_effect=lambda name, **kwargs: CountingAgent()):
+        thread.start()
+        yield daemon, str(tmp_path / "d.sock")
+        server.shutdown()
+        server.server_close()
+
+
+def _runbook(ids):
+    return {
+        "name": "warm",
+        "jobs": [
+            {"id": job_id, "type": "github", "agent": "demo", "issue_url": f"https://github.com/o/p/issues/{n}"}
+            for n, job_id in enumerate(ids)
+        ],
+    }
+
+
+def test_submissions_stream_results_and_reuse_agents(daemon_server):
+    daemon, socket_path = daemon_server
+    lines = list(submit(_runbook(["a", "b", "bad"]), target=socket_path))
+    assert sorted(line["job_id"] for line in lines[:-1]) == ["a", "b", "bad"]
+    assert lines[-1] == {
+        "type": "summary", "runbook": "warm", "total_jobs": 3, "successful_jobs": 2,
+        "failed_jobs": 1, "success_rate": pytest.approx(66.67, abs=0.01), "stopped_reason": None,
+    }
+    assert CountingAgent.instances <= 2
+
+    list(submit(_runbook(["c", "d"]), target=socket_path))
+    list(submit({"id": "e", "type": "github", "agent": "demo", "issue_url": "https://github.com/o/p/issues/9"},
+                target=socket_path, kind="jobs"))
+    # Never more agents than jobs running at once, across all submissions.
+    assert CountingAgent.instances <= 2
+    stats = health(socket_path)
+    assert stats["agents_reused"] >= 4
+    assert stats["submissions"] == 3 and stats["jobs_run"] == 6
+    assert stats["preparers"] == 1
+
+
+def test_bad_submission_is_rejected(daemon_server):
+    _daemon, socket_path = daemon_server
+    with pytest.raises(RuntimeError, match="issue_url required"):
+        list(submit({"id": "x", "type": "github", "agent": "demo"}, target=socket_path, kind="jobs"))
+
+
+def test_stale_socket_is_replaced_but_live_one_is_not(tmp_path, daemon_server):
+    _daemon, socket_path = daemon_server
+    with pytest.raises(RuntimeError, match="already listening"):
+        make_server(BatchDaemon(), socket_path=socket_path)
+    stale = tmp_path / "stale.sock"
+    make_server(BatchDaemon(), socket_path=str(stale)).server_close()
+    make_server(BatchDaemon(), socket_path=str(stale)).server_close()
+
+
+def test_warm_pool_drops_agents_of_failed_jobs():
+    pool = WarmPool()
+    job = JobConfig(id="j", type="github", agent="demo", issue_url="https://github.com/o/p/issues/1")
+    with patch("verification_toolkit.batch_workflow.agents.registry.get_agent", side_effect=lambda name: object()):
+        with pytest.raises(ValueError):
+            with pool.job_resources(job) as (_provider, agent):
+                raise ValueError("boom")
+        with pool.job_resources(job) as (_provider, second):
+            pass
+        with pool.job_resources(job) as (_provider, third):
+            pass
+    assert second is not agent and third is second
+    assert pool.stats()["agents_created"] == 2
+
+
+def test_pooled_jobs_get_the_runner_environment(tmp_path):
+    seen = []
+
+    class Agent:
+        def run_verification(self, context):
+            seen.append(context.environment_path)
+            return EvaluationResult(success=True, details="")
+
+    preparer = Mock()
+    preparer.prepare = lambda issue_url: Mock(repo_path=str(tmp_path / "repo"), current_commit="abc")
+    job = JobConfig(id="a", type="github", agent="demo", issue_url="https://github.com/o/p/issues/1")
+    runbook = Runbook(name="env", jobs=[job], output_dir=str(tmp_path / "out"), environments=True,
+                      environment_cache_dir=str(tmp_path / "envs"))
+    runner = BatchRunner(runbook, pool=WarmPool())
+    runner.environments = Mock()
+    runner.environments.get.return_value = tmp_path / "envs" / "abc"
+    with patch("verification_toolkit.GitHubIssuePreparer", return_value=preparer), \
+            patch("verification_toolkit.batch_workflow.agents.registry.get_agent", return_value=Agent()):
+        report = runner.run_batch_sync()
+    assert report.successful_jobs == 1, report.results[0].error
+    assert seen == [str(tmp_path / "envs" / "abc")]
+    runner.environments.get.assert_called_once_with(str(tmp_path / "repo"), "abc")
+
+
+def test_pooled_providers_share_preparers_and_keep_runner_stores(tmp_path):
+    pool = WarmPool()
+    job = JobConfig(id="a", type="github", agent="demo", issue_url="https://github.com/o/p/issues/1")
+    environments, snapshots = Mock(), Mock()
+    shared = pool.context_provider(job, environments=environments, snapshots=snapshots)
+    again = pool.context_provider(job)
+    assert shared.preparer is again.preparer
+    assert (shared.environments, shared.snapshots) == (environments, snapshots)
+    private = pool.context_provider(job, str(tmp_path / "ws"), environments, snapshots)
+    assert private.preparer is not shared.preparer
+    assert (private.snapshots, private.workspace_dir) == (snapshots, str(tmp_path / "ws"))
+
+
+def test_http_server_only_listens_on_loopback():
+    daemon = BatchDaemon()
+    for host in ("0.0.0.0", "::", "192.168.1.10", "example.com"):
+        with pytest.raises(ValueError, match="loopback"):
+            make_server(daemon, host=host, port=0)
+    server = make_server(daemon, host="127.0.0.1", port=0)
+    server.server_close()
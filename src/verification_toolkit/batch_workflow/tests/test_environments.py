@@ -0,0 +1,152 @@
+"""Tests for the dependency environment cache."""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from ..context.github import GitHubContextProvider
+from ..environments import (
+    MARKER,
+    EnvironmentBuildError,
+    EnvironmentCache,
+    activated_env,
+    installed_from,
+    manifests_at,
+)
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=repo, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+def _commit(repo, files):
+    for path, content in files.items():
+        (repo / path).parent.mkdir(parents=True, exist_ok=True)
+        (repo / path).write_text(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "change")
+    return _git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git(path, "init", "-q")
+    return path
+
+
+class FakeInstaller:
+    __name__ = "fake"
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def __call__(self, env_dir, repo_path, manifests, python):
+        self.calls.append(manifests)
+        time.sleep(self.delay)
+        (env_dir / "bin").mkdir(parents=True)
+        (env_dir / "installed.txt").write_text("\n".join(manifests))
+
+
+def test_manifests_include_requirements_dir_and_lockfiles(repo):
+    commit = _commit(repo, {
+        "requirements.txt": "a\n", "requirements/dev.txt": "b\n", "poetry.lock": "", "setup.py": "",
+        "src/app.py": "", "docs/requirements.txt": "sphinx\n",
+    })
+    assert set(manifests_at(repo, commit)) == {"requirements.txt", "requirements/dev.txt", "poetry.lock", "setup.py"}
+
+
+def test_same_manifests_share_one_environment(repo, tmp_path):
+    installer = FakeInstaller()
+    cache = EnvironmentCache(tmp_path / "envs", installer=installer)
+    first = _commit(repo, {"requirements.txt": "a\n", "app.py": "x = 1\n"})
+    second = _commit(repo, {"app.py": "x = 2\n"})
+    third = _commit(repo, {"requirements.txt": "a\nb\n"})
+
+    assert cache.get(repo, first) == cache.get(repo, second)
+    assert cache.get(repo, third) != cache.get(repo, first)
+    assert cache.builds == 2
+    assert installer.calls == [["requirements.txt"], ["requirements.txt"]]
+    assert (cache.get(repo, first) / MARKER).exists()
+
+
+def test_concurrent_requests_build_once(repo, tmp_path):
+    installer = FakeInstaller(delay=0.2)
+    cache = EnvironmentCache(tmp_path / "envs", installer=installer)
+    commit = _commit(repo, {"pyproject.toml": "[project]\nname = 'x'\n"})
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(repo, commit))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1
+    assert len(installer.calls) == 1
+
+
+def test_lru_eviction_spares_recently_used(repo, tmp_path):
+    cache = EnvironmentCache(tmp_path / "envs", installer=FakeInstaller(), max_entries=1, min_idle=3600)
+    a = cache.get(repo, _commit(repo, {"requirements.txt": "a\n"}))
+    b = cache.get(repo, _commit(repo, {"requirements.txt": "b\n"}))
+    assert a.exists() and b.exists()  # both used within min_idle
+
+    cache.min_idle = 0
+    assert cache.evict() == [a]
+    assert not a.exists() and b.exists()
+
+
+def test_failed_build_leaves_nothing_behind(repo, tmp_path):
+    def broken(env_dir, repo_path, manifests, python):
+        env_dir.mkdir(parents=True)
+        raise OSError("disk full")
+
+    cache = EnvironmentCache(tmp_path / "envs", installer=broken)
+    with pytest.raises(EnvironmentBuildError, match="disk full"):
+        cache.get(repo, _commit(repo, {"requirements.txt": "a\n"}))
+    assert cache.entries() == []
+
+
+def test_context_provider_exposes_environment(repo, tmp_path):
+    commit = _commit(repo, {"requirements.txt": "a\n"})
+    cache = EnvironmentCache(tmp_path / "envs", installer=FakeInstaller())
+    preparer = Mock()
+    preparer.prepare.return_value = Mock(repo_path=str(repo), current_commit=commit, environment_path=None)
+    provider = GitHubContextProvider(preparer, environments=cache)
+    context = provider.prepare_context(Mock(issue_url="https://github.com/o/p/issues/1"))
+    assert context.environment_path == str(cache.get(repo, commit))
+    env = activated_env(context.environment_path, base={"PATH": "/usr/bin"})
+    assert env["PATH"].startswith(context.environment_path) and env["VIRTUAL_ENV"] == context.environment_path
+    assert "PYTHONPATH" not in env
+
+
+def test_project_is_imported_from_the_job_checkout(repo, tmp_path):
+    (repo / "src").mkdir()
+    env = activated_env(tmp_path / "env", base={"PYTHONPATH": "/extra"}, repo_path=repo)
+    assert env["PYTHONPATH"].split(os.pathsep) == [str(repo / "src"), str(repo), "/extra"]
+
+    report = tmp_path / "report.json"
+    report.write_text(json.dumps({"install": [
+        {"download_info": {"url": repo.as_uri(), "dir_info": {"editable": True}}, "metadata": {"name": "proj"}},
+        {"download_info": {"url": "https://files.example/six-1.0-py3-none-any.whl"}, "metadata": {"name": "six"}},
+        {"download_info": {"url": (tmp_path / "other").as_uri(), "dir_info": {}}, "metadata": {"name": "other"}},
+    ]}))
+    assert installed_from(report, repo) == ["proj"]
+
+
+def test_manifests_of_archive_workspace_match_git(repo, tmp_path):
+    commit = _commit(repo, {"requirements.txt": "a\n", "requirements/dev.txt": "b\n", "app.py": ""})
+    archive = tmp_path / "archive"
+    (archive / "requirements").mkdir(parents=True)
+    (archive / "requirements.txt").write_text("a\n")
+    (archive / "requirements" / "dev.txt").write_text("b\n")
+    assert manifests_at(archive, "ignored") == manifests_at(repo, commit)
@@ -0,0 +1,97 @@
+"""Tests for speculative re-execution of stragglers."""
+
+import time
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from ..cancellation import CancellationToken
+from ..config import JobConfig, Runbook
+from ..hedging import Hedger, JobAttempt
+from ..runner import BatchRunner
+from verification_toolkit import EvaluationResult
+
+
+class EchoAgent:
+
+    def run_verification(self, context):
+        time.sleep(context.sleep)
+        return EvaluationResult(success=True, details=context.workspace or "primary")
+
+
+def _provider_factory(slow_job_ids):
+    def factory(git_timeout=None, workspace_dir=None, **_options):
+        def prepare_context(job_config):
+            slow = job_config.id in slow_job_ids and workspace_dir is None
+            return Mock(sleep=30 if slow else 0.05, workspace=workspace_dir)
+
+        provider = Mock()
+        provider.prepare_context = prepare_context
+        return provider
+
+    return factory
+
+
+def _runbook(tmp_path, count, **kwargs):
+    jobs = [
+        JobConfig(id=f"job{i}", type="github", agent="echo", issue_url=f"https://github.com/o/p/issues/{i}")
+        for i in range(count)
+    ]
+    return Runbook(name="hedge", jobs=jobs, output_dir=str(tmp_path), **kwargs)
+
+
+def test_straggler_is_hedged_and_duplicate_wins(tmp_path):
+    runbook = _runbook(
+        tmp_path, 6, hedge=True, hedge_after_fraction=0.5, hedge_min_samples=3, hedge_multiplier=1.5
+    )
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider",
+               side_effect=_provider_factory({"job0"})), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=EchoAgent()), \
+            patch.object(Hedger, "poll_interval", 0.05):
+        start = time.monotonic()
+        report = BatchRunner(runbook, max_workers=3).run_batch_parallel()
+
+    assert time.monotonic() - start < 10
+    assert report.successful_jobs == 6
+    straggler = report.results[0]
+    assert straggler.hedged is True
+    assert straggler.result.details == str(tmp_path / "hedge_workspaces" / "job0")
+    assert not any(r.hedged for r in report.results[1:])
+
+
+def test_no_hedging_without_enough_samples(tmp_path):
+    runbook = _runbook(tmp_path, 4, hedge=True, hedge_after_fraction=0.0, hedge_min_samples=10)
+    hedger = Hedger(runbook, max_workers=4)
+    attempt = hedger.track(JobAttempt(index=0, token=CancellationToken(), started=time.monotonic() - 100))
+    hedger.phase_samples["prepare"] = [0.1] * 9
+    assert hedger.stragglers(runbook.jobs, CancellationToken()) == []
+    hedger.phase_samples["prepare"].append(0.1)
+    duplicates = hedger.stragglers(runbook.jobs, CancellationToken())
+    assert [d.index for d in duplicates] == [attempt.index]
+    assert duplicates[0].hedge and duplicates[0].workspace_dir.endswith("job0")
+
+
+def test_hedge_workspace_is_safe_and_removed_unless_kept(tmp_path):
+    runbook = _runbook(tmp_path, 2, hedge=True, hedge_after_fraction=0.0, hedge_min_samples=1)
+    runbook.jobs[0].id, runbook.jobs[1].id = "../o/p#1", "o/p#2"
+    hedger = Hedger(runbook, max_workers=4)
+    hedger.phase_samples["prepare"] = [0.1]
+    primaries = [hedger.track(JobAttempt(index=i, token=CancellationToken(), started=time.monotonic() - 100))
+                 for i in range(2)]
+    duplicates = hedger.stragglers(runbook.jobs, CancellationToken())
+    workspaces = [Path(d.workspace_dir) for d in duplicates]
+    assert [w.parent for w in workspaces] == [hedger.workspace_root] * 2
+    for workspace in workspaces:
+        (workspace / "repo").mkdir(parents=True)
+
+    result = Mock(status="success")
+    # Job 0: the primary wins, so the cancelled duplicate's workspace goes.
+    primaries[0].done = True
+    hedger.finish(primaries[0], result)
+    duplicates[0].done = True
+    hedger.discard(duplicates[0])
+    assert not workspaces[0].exists()
+    # Job 1: the duplicate wins and its result may point into its workspace.
+    duplicates[1].done = True
+    hedger.finish(duplicates[1], result)
+    hedger.discard(duplicates[1])
+    assert workspaces[1].exists()
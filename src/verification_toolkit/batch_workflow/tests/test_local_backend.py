@@ -0,0 +1,101 @@
+"""Tests for the sharded local execution backend and the CPU budget."""
+
+import json
+import sys
+from unittest.mock import patch
+
+from ..backends.local import DurationHistory, LocalExecutionBackend, combine_returncodes, current_log_dir, plan_shards
+from ..config import JobConfig, Runbook
+from ..resources import CpuBudget
+from ..runner import BatchRunner
+from verification_toolkit import EvaluationResult
+
+# Prints the files it was given; sleeps on "slow*" files and fails on "fail*" ones.
+SCRIPT = """
+import sys, time
+files = sys.argv[1:]
+print("ran", *files)
+if any(f.startswith("slow") for f in files):
+    time.sleep(5)
+sys.exit(1 if any(f.startswith("fail") for f in files) else 0)
+"""
+
+
+def _backend(tmp_path, capacity):
+    (tmp_path / "runner.py").write_text(SCRIPT)
+    return LocalExecutionBackend(cpu_budget=CpuBudget(capacity), log_dir=tmp_path / "logs")
+
+
+def test_plan_shards_balances_by_duration():
+    estimates = {"a": 10.0, "b": 1.0, "c": 1.0, "d": 8.0}
+    assert plan_shards(list(estimates), estimates, 2) == [["a"], ["b", "c", "d"]]
+    assert plan_shards(["a"], {"a": 1.0}, 4) == [["a"]]
+
+
+def test_cpu_budget_only_grants_free_slots():
+    budget = CpuBudget(2)
+    with budget.hold(1):
+        assert budget.try_acquire(3) == 1
+        assert budget.try_acquire(1) == 0
+        budget.release(1)
+    assert budget.in_use == 0
+
+
+def test_run_streams_shards_to_logs_and_records_durations(tmp_path):
+    backend = _backend(tmp_path, capacity=3)
+    history = tmp_path / "durations.json"
+    tests = [f"t{i}.py" for i in range(6)]
+    result = backend.run([sys.executable, "runner.py"], tests, cwd=tmp_path, history_path=history)
+
+    assert result.returncode == 0
+    assert len(result.shards) == 3
+    assert sorted(t for shard in result.shards for t in shard.tests) == tests
+    for shard in result.shards:
+        assert "ran " + " ".join(shard.tests) in shard.log_path.read_text()
+    assert backend.cpu_budget.in_use == 0
+    assert set(json.loads(history.read_text())) == set(tests)
+
+
+def test_shards_limited_by_budget_and_failures_propagate(tmp_path):
+    backend = _backend(tmp_path, capacity=2)
+    with backend.cpu_budget.hold(2):
+        result = backend.run([sys.executable, "runner.py"], ["a.py", "fail.py"], cwd=tmp_path,
+                             history_path=tmp_path / "d.json")
+    assert len(result.shards) == 1
+    assert result.returncode == 1
+    assert any("ran a.py fail.py" in line for line in result.output_tail(5))
+
+
+def test_timeout_kills_shards(tmp_path):
+    backend = _backend(tmp_path, capacity=2)
+    result = backend.run([sys.executable, "runner.py"], ["slow.py", "quick.py"], cwd=tmp_path, timeout=0.5,
+                         history_path=tmp_path / "d.json")
+    assert result.timed_out
+    assert result.returncode != 0
+
+
+def test_history_estimates_unknown_files_from_known_ones(tmp_path):
+    history = DurationHistory(tmp_path / "d.json")
+    history.record(["a", "b"], {"a": 1.0, "b": 3.0}, 8.0)
+    assert history.durations == {"a": 2.0, "b": 6.0}
+    assert history.estimates(["a", "c"]) == {"a": 2.0, "c": 2.0}
+    assert combine_returncodes([0, 5]) == 0 and combine_returncodes([5, 5]) == 5 and combine_returncodes([5, 2]) == 2
+
+
+def test_runner_holds_a_slot_and_sets_the_log_dir(tmp_path):
+    seen = {}
+    budget = CpuBudget(4)
+
+    class Agent:
+        def run_verification(self, context):
+            seen["log_dir"] = current_log_dir()
+            seen["in_use"] = budget.in_use
+            return EvaluationResult(success=True, details="")
+
+    job = JobConfig(id="job/1", type="github", agent="demo", issue_url="https://github.com/o/p/issues/1")
+    runbook = Runbook(name="logs", jobs=[job], output_dir=str(tmp_path))
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider"), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=Agent()):
+        BatchRunner(runbook, cpu_budget=budget).run_batch_sync()
+    assert seen == {"log_dir": tmp_path / "jobs" / "job_1" / "logs", "in_use": 1}
+    assert budget.in_use == 0
@@ -0,0 +1,110 @@
+"""Tests for live batch metrics."""
+
+import io
+import urllib.request
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ..config import JobConfig, Runbook
+from ..metrics import BatchMetrics, Histogram, MetricsReporter, serve_metrics
+from ..report import JobResult
+from ..runner import BatchRunner
+from verification_toolkit import EvaluationResult
+from verification_toolkit.github import GITHUB_STATS, GitHubStats
+
+
+def _result(job_id, success=True, status=None, timings=None):
+    return JobResult(
+        job_id=job_id, issue_url=None, success=success, error=None if success else "boom", result=None,
+        status=status, duration=1.5, timings=timings,
+    )
+
+
+def test_histogram_lines_are_cumulative():
+    histogram = Histogram(buckets=(1.0, 5.0))
+    for value in (0.5, 2.0, 3.0, 9.0):
+        histogram.observe(value)
+    assert histogram.lines("h", 'phase="x"') == [
+        'h_bucket{phase="x",le="1"} 1',
+        'h_bucket{phase="x",le="5"} 3',
+        'h_bucket{phase="x",le="+Inf"} 4',
+        'h_sum{phase="x"} 14.500000',
+        'h_count{phase="x"} 4',
+    ]
+
+
+def test_render_and_progress_line():
+    metrics = BatchMetrics(total_jobs=4, workers=2)
+    metrics.write(_result("a", timings={"prepare": 0.2, "verify": 1.0}))
+    metrics.write(_result("b", success=False, timings={"prepare": 40.0}))
+    metrics.write(_result("c", success=False, status="skipped"))
+    GITHUB_STATS.record_clone(hit=True)
+    with metrics.running():
+        text = metrics.render()
+        line = metrics.progress_line()
+
+    assert "batch_workflow_jobs 4" in text
+    assert 'batch_workflow_jobs_finished_total{status="success"} 1' in text
+    assert 'batch_workflow_jobs_finished_total{status="error"} 1' in text
+    assert "batch_workflow_jobs_in_flight 1" in text
+    assert 'batch_workflow_phase_seconds_bucket{phase="prepare",le="60"} 2' in text
+    assert 'batch_workflow_phase_seconds_count{phase="verify"} 1' in text
+    assert "batch_workflow_job_seconds_count 2" in text
+    assert "batch_workflow_clone_cache_hits_total 1" in text
+    assert "batch_workflow_clone_cache_hit_ratio 1" in text
+    assert "# TYPE batch_workflow_phase_seconds histogram" in text
+    assert line.startswith("[3/4]  75% ok 1 failed 1 running 1 |")
+    assert "ETA" in line and "cache 100%" in line
+
+
+def test_github_stats_reads_rate_limit_headers():
+    stats = GitHubStats()
+    response = Mock(headers={"X-RateLimit-Remaining": "4321", "X-RateLimit-Limit": "5000",
+                             "X-RateLimit-Reset": "1700000000"})
+    assert stats.record_response(response) is response
+    assert (stats.api_requests, stats.rate_limit_remaining, stats.rate_limit) == (1, 4321, 5000)
+    stats.record_response(Mock(headers={}))
+    assert (stats.api_requests, stats.rate_limit_remaining) == (2, 4321)
+
+
+def test_reporter_rewrites_file_and_endpoint_serves(tmp_path):
+    metrics = BatchMetrics(total_jobs=1)
+    progress = io.StringIO()
+    path = tmp_path / "metrics" / "batch.prom"
+    server = serve_metrics(metrics, port=0)
+    try:
+        with MetricsReporter(metrics, path=path, progress=progress, interval=0.05):
+            metrics.write(_result("a"))
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                assert b'jobs_finished_total{status="success"} 1' in response.read()
+        assert "batch_workflow_jobs 1" in path.read_text()
+        assert progress.getvalue().splitlines()[-1].startswith("[1/1] 100% ok 1")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize("mode", ["sync", "parallel"])
+def test_runner_reports_in_flight_jobs(tmp_path, mode):
+    metrics = BatchMetrics()
+    seen = []
+
+    class Agent:
+        def run_verification(self, context):
+            seen.append(metrics.in_flight)
+            return EvaluationResult(success=True, details="")
+
+    provider = Mock()
+    provider.prepare_context = lambda job_config: Mock()
+    jobs = [JobConfig(id=f"j{i}", type="github", agent="demo", issue_url="https://github.com/t/r/issues/1")
+            for i in range(3)]
+    runner = BatchRunner(Runbook(name="m", jobs=jobs, output_dir=str(tmp_path)), max_workers=1, metrics=metrics)
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider", return_value=provider), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=Agent()):
+        getattr(runner, f"run_batch_{mode}")()
+    assert seen == [1, 1, 1]
+    assert (metrics.total_jobs, metrics.done, metrics.in_flight) == (3, 3, 0)
+    assert 0 < metrics.utilization() <= 1
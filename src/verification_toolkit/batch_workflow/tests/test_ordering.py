@@ -0,0 +1,143 @@
+"""Tests for history-driven job ordering."""
+
+import json
+import threading
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ..cli import main
+from ..config import JobConfig, Runbook
+from ..ordering import DurationEstimator
+from ..report import BatchReport, JobResult, JsonlSink
+from ..runner import BatchRunner
+from ..store import RunStore, SqliteResultSink
+from verification_toolkit import EvaluationResult
+
+
+def _job(job_id, repo="r"):
+    return JobConfig(id=job_id, type="github", agent="demo", issue_url=f"https://github.com/t/{repo}/issues/1")
+
+
+def _result(job_id, duration, repo="t/r", status=None):
+    return JobResult(
+        job_id=job_id, issue_url=None, success=True, error=None, result=None,
+        duration=duration, repo=repo, status=status,
+    )
+
+
+def _clone(runtime_dir, repo, size):
+    pack = runtime_dir / repo / ".git" / "objects" / "pack"
+    pack.mkdir(parents=True)
+    (pack / "pack-1.pack").write_bytes(b"\0" * size)
+
+
+def test_estimates_fall_back_from_job_to_repo_to_clone_size(tmp_path):
+    _clone(tmp_path, "t/known", 1000)
+    _clone(tmp_path, "t/big", 4000)
+    estimator = DurationEstimator(runtime_dir=tmp_path).add_results([
+        _result("a", 10.0, repo="t/known"),
+        _result("a", 30.0, repo="t/known"),
+        _result("a", 20.0, repo="t/known"),
+        _result("b", 99.0, repo="t/known", status="skipped"),
+    ])
+    assert estimator.estimate(_job("a", repo="known")) == (20.0, "job")
+    assert estimator.estimate(_job("new", repo="known")) == (20.0, "repo")
+    assert estimator.estimate(_job("new", repo="big")) == (80.0, "size")
+    assert estimator.estimate(_job("new", repo="nowhere")) == (None, "none")
+
+
+def test_order_sorts_by_estimate_and_keeps_ties_stable(tmp_path):
+    estimator = DurationEstimator(runtime_dir=tmp_path).add_results([
+        _result("slow", 50.0, repo="t/a"), _result("fast", 1.0, repo="t/b"), _result("mid", 10.0, repo="t/c"),
+    ])
+    jobs = [_job("fast", "b"), _job("x", "z"), _job("slow", "a"), _job("mid", "c"), _job("y", "z")]
+    # Jobs without history count as the median known duration (10s).
+    assert estimator.order(jobs, "longest-first") == [2, 1, 3, 4, 0]
+    assert estimator.order(jobs, "shortest-first") == [0, 1, 3, 4, 2]
+    assert estimator.order(jobs, "file") == [0, 1, 2, 3, 4]
+    with pytest.raises(ValueError):
+        estimator.order(jobs, "random")
+
+
+def test_history_from_reports_journals_and_store(tmp_path):
+    report = tmp_path / "report.json"
+    BatchReport(runbook_name="old", total_jobs=1, successful_jobs=1, failed_jobs=0,
+                results=[_result("a", 5.0)]).write_json(report)
+    journal = tmp_path / "results.jsonl"
+    sink = JsonlSink(journal)
+    sink.write(_result("b", 1.0))
+    sink.write(_result("b", 3.0))
+    sink.close()
+    estimator = DurationEstimator.from_reports([report, journal])
+    assert estimator.estimate(_job("a"))[0] == 5.0
+    assert estimator.estimate(_job("b"))[0] == 2.0  # median of recent runs
+
+    db = tmp_path / "runs.sqlite"
+    for duration in (100.0, 7.0):
+        store_sink = SqliteResultSink(db, "nightly")
+        store_sink.write(_result("c", duration))
+        store_sink.close()
+    with RunStore(db) as store:
+        assert [row["duration"] for row in store.durations()] == [7.0, 100.0]
+        estimator = DurationEstimator.from_store(store)
+    assert estimator.jobs["c"] == [7.0, 100.0]
+
+
+@pytest.mark.parametrize("mode", ["sync", "async", "parallel"])
+def test_runner_starts_jobs_in_order_but_reports_in_file_order(tmp_path, mode):
+    started = []
+    lock = threading.Lock()
+
+    class Agent:
+        def run_verification(self, context):
+            with lock:
+                started.append(context.job_id)
+            return EvaluationResult(success=True, details="")
+
+    provider = Mock()
+    provider.prepare_context = lambda job_config: Mock(job_id=job_config.id)
+    estimator = DurationEstimator(runtime_dir=tmp_path).add_results(
+        [_result("j0", 1.0), _result("j1", 3.0), _result("j2", 2.0)]
+    )
+    runbook = Runbook(name="ordered", jobs=[_job("j0"), _job("j1"), _job("j2")], order="longest-first",
+                      output_dir=str(tmp_path / "out"))
+    runner = BatchRunner(runbook, max_workers=1, durations=estimator)
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider", return_value=provider), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=Agent()):
+        if mode == "async":
+            import asyncio
+            report = asyncio.run(runner.run_batch_async())
+        else:
+            report = getattr(runner, f"run_batch_{mode}")()
+    assert started == ["j1", "j2", "j0"]
+    assert [result.job_id for result in report.results] == ["j0", "j1", "j2"]
+
+
+def test_runbook_order_is_validated_and_round_trips(tmp_path):
+    with pytest.raises(ValueError):
+        Runbook(name="bad", jobs=[], order="random")
+    runbook = Runbook.from_dict({"name": "r", "order": "shortest-first", "history": ["old.json"]})
+    assert json.loads(json.dumps(runbook.to_dict()))["order"] == "shortest-first"
+    assert runbook.history == ["old.json"]
+
+
+def test_bad_history_is_reported_not_raised(tmp_path, capsys, caplog):
+    corrupt = tmp_path / "report.json"
+    corrupt.write_text("[1, 2")
+    missing = tmp_path / "missing.json"
+    with pytest.raises(ValueError, match="not a batch report"):
+        DurationEstimator.from_reports([corrupt])
+    with pytest.raises(OSError):
+        DurationEstimator.from_reports([missing])
+
+    runbook = Runbook(name="o", jobs=[], order="longest-first", history=[str(corrupt)])
+    assert BatchRunner(runbook).durations is None  # falls back to file order
+    assert "could not load history" in caplog.text
+
+    runbook_path = tmp_path / "runbook.json"
+    runbook_path.write_text(json.dumps({"name": "o", "output_dir": str(tmp_path / "out"), "jobs": []}))
+    with pytest.raises(SystemExit) as excinfo:
+        main([str(runbook_path), "--order", "shortest-first", "--history", str(missing)])
+    assert excinfo.value.code == 1
+    assert "Error loading history" in capsys.readouterr().err
@@ -0,0 +1,145 @@
+"""Tests for queue mode: leases, heartbeats and workers draining a queue."""
+
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ..cli import main
+from ..config import JobConfig, Runbook
+from ..queue import QueueWorker, SqliteJobQueue, open_queue, register_queue_backend
+from ..report import JobResult
+from verification_toolkit import EvaluationResult
+
+
+def _runbook(tmp_path, count=6):
+    jobs = [
+        JobConfig(id=f"job{i}", type="github", agent="demo", issue_url=f"https://github.com/o/p/issues/{i}")
+        for i in range(count)
+    ]
+    return Runbook(name="queued", jobs=jobs, output_dir=str(tmp_path / "out"), job_timeout=30)
+
+
+def test_claim_order_and_load_is_idempotent(tmp_path):
+    queue = SqliteJobQueue(tmp_path / "q.db")
+    assert queue.load(_runbook(tmp_path, 3)) == 3
+    assert queue.load(_runbook(tmp_path, 4)) == 1
+    assert queue.runbook().name == "queued"
+    assert queue.runbook().job_timeout == 30
+
+    claimed = [queue.claim("w1", 60).config.id for _ in range(4)]
+    assert claimed == ["job0", "job1", "job2", "job3"]
+    assert queue.claim("w1", 60) is None
+    assert queue.counts() == {"pending": 0, "leased": 4, "done": 0}
+
+
+def test_expired_lease_is_requeued_then_abandoned(tmp_path):
+    queue = SqliteJobQueue(tmp_path / "q.db", max_attempts=2)
+    queue.load(_runbook(tmp_path, 1))
+
+    assert queue.claim("dead", 0.01).attempt == 1
+    time.sleep(0.05)
+    reclaimed = queue.claim("alive", 0.01)
+    assert reclaimed.config.id == "job0" and reclaimed.attempt == 2
+    # The first worker lost its lease and can neither renew nor complete it.
+    assert not queue.heartbeat("job0", "dead", 60)
+    assert not queue.complete("job0", "dead", JobResult("job0", None, True, None, None))
+
+    time.sleep(0.05)
+    assert queue.claim("alive", 60) is None
+    [result] = list(queue.results())
+    assert result.status == "error"
+    assert "abandoned" in result.error
+
+
+def test_open_queue_backends(tmp_path):
+    assert isinstance(open_queue(str(tmp_path / "a.db")), SqliteJobQueue)
+    assert isinstance(open_queue(f"sqlite://{tmp_path / 'b.db'}"), SqliteJobQueue)
+    backend = Mock()
+    register_queue_backend("memory", backend)
+    assert open_queue("memory://jobs") is backend.return_value
+    backend.assert_called_once_with("jobs")
+    with pytest.raises(ValueError):
+        open_queue("nope://x")
+
+
+class SlowAgent:
+
+    def run_verification(self, context):
+        time.sleep(0.05)
+        return EvaluationResult(success=True, details=threading.current_thread().name)
+
+
+def test_two_workers_drain_the_queue(tmp_path):
+    path = tmp_path / "q.db"
+    seed = SqliteJobQueue(path)
+    seed.load(_runbook(tmp_path, 10))
+    seed.close()
+
+    processed = {}
+
+    def work(worker_id):
+        queue = SqliteJobQueue(path)
+        processed[worker_id] = QueueWorker(queue, worker_id=worker_id, max_workers=2).run()
+        queue.close()
+
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider"), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=SlowAgent()):
+        threads = [threading.Thread(target=work, args=(f"w{i}",)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+
+    assert sum(processed.values()) == 10
+    assert all(count > 0 for count in processed.values())
+    queue = SqliteJobQueue(path)
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 10}
+    assert [r.job_id for r in queue.results()] == [f"job{i}" for i in range(10)]
+    assert all(r.success for r in queue.results())
+
+
+def test_lost_lease_cancels_running_job(tmp_path):
+    queue = SqliteJobQueue(tmp_path / "q.db")
+    queue.load(_runbook(tmp_path, 1))
+    cancelled = threading.Event()
+
+    class BlockingAgent:
+
+        def run_verification(self, context):
+            # Simulate another worker taking the job over.
+            thief = SqliteJobQueue(tmp_path / "q.db")
+            thief.conn.execute("UPDATE jobs SET worker_id = 'thief'")
+            thief.close()
+            from ..cancellation import current_token
+            current_token().wait(10)
+            cancelled.set()
+            current_token().raise_if_cancelled()
+
+    worker = QueueWorker(queue, worker_id="w1", lease_seconds=0.3)
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider"), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=BlockingAgent()), \
+            patch.object(QueueWorker, "_should_wait", return_value=False):
+        assert worker.run() == 0
+    assert cancelled.is_set()
+
+
+def test_queue_cli(tmp_path, capsys):
+    runbook_path = tmp_path / "runbook.json"
+    runbook_path.write_text(
+        '{"name": "cli", "output_dir": "%s", "jobs": [{"id": "a", "type": "github", "agent": "demo", '
+        '"issue_url": "https://github.com/o/p/issues/1"}]}' % (tmp_path / "out")
+    )
+    db = str(tmp_path / "q.db")
+    main(["queue", db, "load", str(runbook_path)])
+    main(["queue", db, "status"])
+    assert "pending=1" in capsys.readouterr().out
+
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider"), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=SlowAgent()):
+        main(["worker", db, "--worker-id", "solo"])
+    main(["queue", db, "report", "--output", str(tmp_path / "report.json")])
+    out = capsys.readouterr().out
+    assert "Worker solo finished 1 job(s)" in out
+    assert (tmp_path / "report.json").exists()
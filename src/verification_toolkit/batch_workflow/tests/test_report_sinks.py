@@ -0,0 +1,102 @@
+"""Tests for streaming result sinks."""
+
+import csv
+import json
+from unittest.mock import Mock, patch
+
+from ..config import JobConfig, Runbook
+from ..report import BatchReport, JobResult, JsonlSink, RunningSummary, default_sinks, safe_name
+from ..runner import BatchRunner
+from verification_toolkit import EvaluationResult
+
+
+def _runbook(tmp_path, count):
+    jobs = [
+        JobConfig(id=f"job/{i}", type="github", agent="demo", issue_url=f"https://github.com/o/p/issues/{i}")
+        for i in range(count)
+    ]
+    return Runbook(name="stream", jobs=jobs, output_dir=str(tmp_path))
+
+
+def _executors(count):
+    executors = []
+    for i in range(count):
+        executor = Mock()
+        executor.execute_sync.return_value = EvaluationResult(
+            success=i % 2 == 0, details=f"details {i}" * 100, artifacts={"index": i}
+        )
+        executors.append(executor)
+    return executors
+
+
+def test_default_sinks_stream_and_spill(tmp_path):
+    runbook = _runbook(tmp_path, 3)
+    sinks = default_sinks(tmp_path, runbook_name=runbook.name, total_jobs=3)
+    with patch("verification_toolkit.batch_workflow.runner.JobExecutor", side_effect=_executors(3)):
+        report = BatchRunner(runbook, sinks=sinks).run_batch_sync()
+
+    # Nothing heavy is retained in memory once spilled.
+    assert all(r.result is None for r in report.results)
+    assert report.successful_jobs == 2
+
+    lines = [json.loads(line) for line in (tmp_path / "results.jsonl").read_text().splitlines()]
+    assert [line["job_id"] for line in lines] == ["job/0", "job/1", "job/2"]
+    assert "details" not in lines[0]
+    assert open(lines[1]["details_path"]).read().startswith("details 1")
+    assert json.loads(open(lines[2]["artifacts_path"]).read()) == {"index": 2}
+    assert lines[0]["details_path"].startswith(str(tmp_path / "jobs" / "job_0"))
+
+    with open(tmp_path / "results.csv", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["status"] for row in rows] == ["success", "failed", "success"]
+
+    summary = json.loads((tmp_path / "summary.json").read_text())
+    assert summary["finished"] is True
+    assert summary["total"] == 3 and summary["successful"] == 2
+    assert summary["status_counts"] == {"success": 2, "failed": 1}
+
+
+def test_results_visible_while_running(tmp_path):
+    runbook = _runbook(tmp_path, 3)
+    jsonl = JsonlSink(tmp_path / "results.jsonl")
+    seen = []
+
+    class Probe:
+        def write(self, job_result):
+            seen.append(len((tmp_path / "results.jsonl").read_text().splitlines()))
+
+        def close(self):
+            pass
+
+    with patch("verification_toolkit.batch_workflow.runner.JobExecutor", side_effect=_executors(3)):
+        BatchRunner(runbook, max_workers=1, sinks=[jsonl, Probe()]).run_batch_parallel()
+
+    assert seen == [1, 2, 3]
+
+
+def test_running_summary_counts():
+    summary = RunningSummary()
+    summary.add(JobResult("a", "u", True, None, None, duration=2.0, timings={"prepare": 1.5}))
+    summary.add(JobResult("b", "u", False, "boom", None, duration=4.0, timings={"prepare": 0.5}))
+    data = summary.as_dict()
+    assert data["status_counts"] == {"success": 1, "error": 1}
+    assert data["mean_duration"] == 3.0
+    assert data["max_duration"] == 4.0
+    assert data["phase_totals"] == {"prepare": 2.0}
+
+
+def test_write_json_round_trips(tmp_path):
+    results = [JobResult("a", None, True, None, None), JobResult("b", "u", False, 'bad "quote"', None)]
+    report = BatchReport(runbook_name='odd "name"', total_jobs=2, successful_jobs=1, failed_jobs=1,
+                         results=results, stopped_reason="deadline")
+    report.write_json(tmp_path / "report.json")
+    data = json.loads((tmp_path / "report.json").read_text())
+    assert data["runbook_name"] == 'odd "name"' and data["success_rate"] == 50.0
+    assert data["stopped_reason"] == "deadline"
+    assert [r["job_id"] for r in data["results"]] == ["a", "b"]
+    assert data["results"][1]["error"] == 'bad "quote"'
+
+
+def test_safe_name_is_one_path_component():
+    assert safe_name("o/p#1") == "o_p_1"
+    assert [safe_name(job_id) for job_id in ("", ".", "..", "/")] == ["_", "_", "_", "_"]
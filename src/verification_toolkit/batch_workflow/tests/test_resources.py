@@ -0,0 +1,108 @@
+"""Tests for declared job resources and resource-aware scheduling."""
+
+import sys
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ..cancellation import run_process
+from ..config import JobConfig, Runbook
+from ..resources import ResourceHistory, ResourcePool, ResourceRequest, parse_quantity
+from ..runner import BatchRunner
+from verification_toolkit import EvaluationResult
+
+GIB = 1 << 30
+
+
+class RecordingAgent:
+    """Sleeps and tracks the memory declared by the jobs running at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.memory = 0.0
+        self.peak_memory = 0.0
+        self.peak_jobs = 0
+        self.jobs = 0
+
+    def run_verification(self, context):
+        with self.lock:
+            self.jobs += 1
+            self.memory += context.memory
+            self.peak_jobs = max(self.peak_jobs, self.jobs)
+            self.peak_memory = max(self.peak_memory, self.memory)
+        if context.command:
+            run_process(context.command)
+        else:
+            time.sleep(0.2)
+        with self.lock:
+            self.jobs -= 1
+            self.memory -= context.memory
+        return EvaluationResult(success=True, details="")
+
+
+def _job(job_id, memory=None, command=None, repo="r"):
+    return JobConfig(
+        id=job_id, type="github", agent="recording", issue_url=f"https://github.com/t/{repo}/issues/{job_id}",
+        resources={"memory": memory} if memory else None, extra={"command": command},
+    )
+
+
+@pytest.fixture()
+def agent():
+    agent = RecordingAgent()
+
+    def prepare_context(job_config):
+        memory = parse_quantity((job_config.resources or {}).get("memory", 0))
+        return Mock(memory=memory, command=job_config.extra["command"])
+
+    provider = Mock()
+    provider.prepare_context = prepare_context
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider", return_value=provider), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=agent):
+        yield agent
+
+
+def test_quantities_and_requests():
+    assert parse_quantity("512M") == 512 << 20 and parse_quantity("1.5GiB") == 1.5 * GIB and parse_quantity(2) == 2
+    with pytest.raises(ValueError):
+        JobConfig(id="x", type="github", agent="a", issue_url="u", resources={"gpu": 1})
+    assert ResourceRequest(cpu=64, memory=GIB).capped(ResourceRequest(cpu=4, memory=8 * GIB)) == ResourceRequest(4, GIB)
+
+
+def test_pool_always_admits_a_job_when_idle():
+    pool = ResourcePool(ResourceRequest(cpu=2, memory=GIB))
+    huge = ResourceRequest(cpu=8, memory=4 * GIB)
+    assert pool.try_reserve(huge)
+    assert not pool.try_reserve(ResourceRequest(cpu=1))
+    pool.release(huge)
+    assert pool.try_reserve(ResourceRequest(cpu=1)) and pool.try_reserve(ResourceRequest(cpu=1))
+
+
+def test_jobs_are_packed_by_declared_memory(agent, tmp_path):
+    jobs = [_job("heavy1", "3G"), _job("heavy2", "3G")] + [_job(f"light{i}", "512M") for i in range(4)]
+    runbook = Runbook(
+        name="packing", jobs=jobs, max_parallel=6, resource_scheduling=True,
+        capacity={"cpu": 8, "memory": "4G"}, resource_history=str(tmp_path / "history.json"),
+    )
+    report = BatchRunner(runbook, max_workers=6).run_batch_parallel()
+    assert report.successful_jobs == 6
+    assert agent.peak_memory <= 4 * GIB
+    assert agent.peak_jobs >= 3  # light jobs run alongside a heavy one
+
+
+def test_history_fills_in_undeclared_memory(agent, tmp_path):
+    command = [sys.executable, "-c", "import time; x = bytearray(80 << 20); time.sleep(2)"]
+    history_path = tmp_path / "history.json"
+    runbook = Runbook(
+        name="learn", jobs=[_job("1", command=command, repo="big")], max_parallel=2, resource_scheduling=True,
+        resource_history=str(history_path),
+    )
+    BatchRunner(runbook, max_workers=2).run_batch_parallel()
+
+    history = ResourceHistory(history_path)
+    assert history.usage["t/big"]["memory"] >= 80 << 20
+    runner = BatchRunner(Runbook(name="next", jobs=[_job("2", repo="big")], resource_scheduling=True,
+                                 resource_history=str(history_path)))
+    assert runner.resource_request(runner.runbook.jobs[0]).memory >= 80 << 20
@@ -0,0 +1,75 @@
+"""Tests for the SQLite run database."""
+
+from ..cli import main
+from ..report import JobResult
+from ..store import RunStore, SqliteResultSink
+
+
+def _result(job_id, success, repo="o/p", prepare=1.0):
+    return JobResult(
+        job_id=job_id,
+        issue_url=f"https://github.com/{repo}/issues/1",
+        success=success,
+        error=None if success else "boom",
+        result=None,
+        duration=prepare + 1,
+        timings={"prepare": prepare, "verify": 1.0},
+        agent="demo",
+        repo=repo,
+        commit="abc",
+    )
+
+
+def _record_run(path, results, batch_size=2):
+    sink = SqliteResultSink(path, "nightly", batch_size=batch_size)
+    for result in results:
+        sink.write(result)
+    sink.close()
+    return sink.run_id
+
+
+def test_runs_regressions_and_slowest_repos(tmp_path):
+    db = tmp_path / "runs.sqlite"
+    run_a = _record_run(db, [_result("j1", True), _result("j2", True), _result("j3", False)])
+    run_b = _record_run(db, [
+        _result("j1", True),
+        _result("j2", False),
+        _result("j3", False, repo="o/slow", prepare=9.0),
+    ])
+
+    with RunStore(db) as store:
+        assert store.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        runs = store.runs()
+        assert [row["run_id"] for row in runs] == [run_b, run_a]
+        assert (runs[0]["total_jobs"], runs[0]["successful_jobs"], runs[0]["failed_jobs"]) == (3, 1, 2)
+
+        assert [row["job_id"] for row in store.regressions(run_a, run_b)] == ["j2"]
+        assert store.regressions(run_b, run_a) == []
+
+        slowest = store.slowest_repos(phase="prepare")
+        assert slowest[0]["repo"] == "o/slow"
+        assert slowest[0]["mean_seconds"] == 9.0
+        assert [row["repo"] for row in store.slowest_repos(run_id=run_a)] == ["o/p"]
+
+        assert [row["run_id"] for row in store.job_history("j3")] == [run_b, run_a]
+
+
+def test_sink_buffers_until_batch_size(tmp_path):
+    db = tmp_path / "runs.sqlite"
+    sink = SqliteResultSink(db, "nightly", batch_size=3, flush_interval=3600)
+    sink.write(_result("j1", True))
+    sink.write(_result("j2", True))
+    with RunStore(db) as reader:
+        assert reader.conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 0
+        sink.write(_result("j3", True))
+        assert reader.conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 3
+    sink.close()
+
+
+def test_db_command(tmp_path, capsys):
+    db = tmp_path / "runs.sqlite"
+    run_a = _record_run(db, [_result("j1", True)])
+    run_b = _record_run(db, [_result("j1", False)])
+    main(["db", str(db), "regressions", str(run_a), str(run_b)])
+    out = capsys.readouterr().out
+    assert "j1" in out and "1 regression(s)" in out
@@ -0,0 +1,137 @@
+"""Tests for the local SWE-bench dataset and its context provider."""
+
+import json
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+from ..config import JobConfig, Runbook
+from ..context.swebench import INDEX_SUFFIX, SWEBenchContextProvider, SWEBenchDataset, open_dataset
+from ..queue import QueueWorker, SqliteJobQueue
+from ..runner import BatchRunner
+from verification_toolkit import EvaluationResult, GitHubIssuePreparer
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=repo, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+def _record(instance_id, base_commit="abc", **fields):
+    return {
+        "instance_id": instance_id, "repo": "o/p", "base_commit": base_commit,
+        "problem_statement": f"problem {instance_id}", "FAIL_TO_PASS": '["test_a"]', "PASS_TO_PASS": [],
+        "version": 1.2, **fields,
+    }
+
+
+def _write(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    return path
+
+
+@pytest.fixture()
+def mirror(tmp_path):
+    """A cached clone of o/p under a runtime dir, with two commits."""
+    repo = tmp_path / "runtime" / "o" / "p"
+    repo.mkdir(parents=True)
+    _git(repo, "init", "-q")
+    (repo / "mod.py").write_text("VALUE = 1\n")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "one")
+    first = _git(repo, "rev-parse", "HEAD")
+    (repo / "mod.py").write_text("VALUE = 2\n")
+    _git(repo, "commit", "-q", "-am", "two")
+    return repo, first
+
+
+def test_index_reads_single_records_and_is_reused(tmp_path):
+    path = _write(tmp_path / "swe.jsonl", [_record("o__p-1"), _record("o__p-2", note="é \"quoted\"")])
+    with path.open("a") as f:
+        f.write("\n")  # blank lines are skipped
+    dataset = SWEBenchDataset(path)
+    assert len(dataset) == 2 and "o__p-2" in dataset
+    assert dataset.get("o__p-2")["note"] == "é \"quoted\""
+    with pytest.raises(KeyError):
+        dataset.get("missing")
+    assert (tmp_path / ("swe.jsonl" + INDEX_SUFFIX)).exists()
+
+    with patch.object(SWEBenchDataset, "_build_index", side_effect=AssertionError("rebuilt")):
+        assert SWEBenchDataset(path).get("o__p-1")["problem_statement"] == "problem o__p-1"
+
+    _write(path, [_record("o__p-3")])  # a changed dump invalidates the index
+    assert list(SWEBenchDataset(path).ids()) == ["o__p-3"]
+    assert open_dataset(path) is open_dataset(path)
+
+
+def test_provider_checks_out_base_commit_offline(tmp_path, mirror):
+    repo, first = mirror
+    dataset = SWEBenchDataset(_write(tmp_path / "swe.jsonl", [_record("o__p-7", base_commit=first)]))
+    provider = SWEBenchContextProvider(dataset, preparer=GitHubIssuePreparer(runtime_dir=tmp_path / "runtime"))
+    job = JobConfig(id="j", type="swerex", agent="demo", instance_id="o__p-7")
+    with patch("requests.Session", side_effect=AssertionError("network")):
+        context = provider.prepare_context(job)
+    assert (repo / "mod.py").read_text() == "VALUE = 1\n"
+    assert (context.owner, context.project, context.current_commit) == ("o", "p", first)
+    assert context.issue_description == "problem o__p-7"
+    assert (context.fail_to_pass, context.pass_to_pass, context.version) == (["test_a"], [], "1.2")
+    assert context.issue_url == "https://github.com/o/p/pull/7"
+
+    # A private workspace is cloned locally from the shared mirror.
+    private = SWEBenchContextProvider(dataset, preparer=GitHubIssuePreparer(
+        runtime_dir=tmp_path / "private", reference_dir=tmp_path / "runtime"))
+    assert private.prepare_context(job).repo_path == str(tmp_path / "private" / "o" / "p")
+
+    missing = SWEBenchContextProvider(dataset, preparer=GitHubIssuePreparer(runtime_dir=tmp_path / "empty"))
+    with pytest.raises(FileNotFoundError):
+        missing.prepare_context(job)
+
+
+def test_runner_resolves_swerex_jobs_from_the_runbook_dataset(tmp_path, mirror):
+    _repo, first = mirror
+    path = _write(tmp_path / "swe.jsonl", [_record(f"o__p-{i}", base_commit=first) for i in range(3)])
+    seen = []
+
+    class Agent:
+        def run_verification(self, context):
+            seen.append(context.instance_id)
+            return EvaluationResult(success=True, details="")
+
+    jobs = [JobConfig(id=f"j{i}", type="swerex", agent="demo", instance_id=f"o__p-{i}") for i in range(3)]
+    runbook = Runbook(name="swe", jobs=jobs, dataset=str(path), output_dir=str(tmp_path / "out"))
+    with patch("verification_toolkit.github.DEFAULT_RUNTIME_DIR", tmp_path / "runtime"), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=Agent()):
+        runner = BatchRunner(runbook)
+        report = runner.run_batch_sync()
+    assert report.successful_jobs == 3, [r.error for r in report.results]
+    assert seen == ["o__p-0", "o__p-1", "o__p-2"]
+    assert report.results[0].repo == "o/p"
+
+    no_dataset = Runbook(name="swe", jobs=jobs[:1], output_dir=str(tmp_path / "out"))
+    with patch("verification_toolkit.batch_workflow.context.swebench.DEFAULT_SWEBENCH_DATASET", None):
+        result = BatchRunner(no_dataset).run_batch_sync().results[0]
+    assert "need a SWE-bench dataset" in result.error
+
+
+def test_queue_worker_opens_the_dataset_for_claimed_swerex_jobs(tmp_path, mirror):
+    _repo, first = mirror
+    path = _write(tmp_path / "swe.jsonl", [_record(f"o__p-{i}", base_commit=first) for i in range(2)])
+    jobs = [JobConfig(id=f"j{i}", type="swerex", agent="demo", instance_id=f"o__p-{i}") for i in range(2)]
+    queue = SqliteJobQueue(tmp_path / "q.db")
+    queue.load(Runbook(name="swe", jobs=jobs, dataset=str(path), output_dir=str(tmp_path / "out")))
+
+    class Agent:
+        def run_verification(self, context):
+            return EvaluationResult(success=True, details=context.instance_id)
+
+    with patch("verification_toolkit.github.DEFAULT_RUNTIME_DIR", tmp_path / "runtime"), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=Agent()):
+        worker = QueueWorker(queue, poll_interval=0.01)
+        assert worker.runner.dataset is None  # the worker's runbook has no jobs
+        assert worker.run() == 2
+    results = list(queue.results())
+    assert [r.success for r in results] == [True, True], [r.error for r in results]
+    assert worker.runner.dataset is open_dataset(path)
@@ -0,0 +1,137 @@
+"""Tests for job timeouts, cancellation and batch budgets."""
+
+import asyncio
+import sys
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from ..cancellation import CancellationToken, JobCancelled, JobTimeoutError, run_process
+from ..config import JobConfig, Runbook
+from ..executor import JobExecutor
+from ..report import STATUS_SKIPPED, STATUS_SUCCESS, STATUS_TIMEOUT
+from ..runner import BatchRunner
+from verification_toolkit import EvaluationResult
+
+
+class SleepyAgent:
+    """Agent that sleeps for ``context.sleep`` seconds before reporting."""
+
+    def run_verification(self, context):
+        time.sleep(context.sleep)
+        return EvaluationResult(success=not context.fail, details="done")
+
+
+def _job(job_id, sleep=0.0, fail=False, **kwargs):
+    return JobConfig(
+        id=job_id,
+        type="github",
+        agent="sleepy",
+        issue_url=f"https://github.com/test/repo/issues/{job_id}",
+        extra={"sleep": sleep, "fail": fail},
+        **kwargs,
+    )
+
+
+@pytest.fixture(autouse=True)
+def fake_environment():
+    def prepare_context(job_config):
+        return Mock(sleep=job_config.extra["sleep"], fail=job_config.extra["fail"])
+
+    provider = Mock()
+    provider.prepare_context = prepare_context
+    with patch("verification_toolkit.batch_workflow.executor.GitHubContextProvider", return_value=provider), \
+            patch("verification_toolkit.batch_workflow.executor.get_agent", return_value=SleepyAgent()):
+        yield
+
+
+class TestJobExecutorTimeouts:
+
+    def test_verify_timeout(self):
+        executor = JobExecutor(_job("slow", sleep=5, verify_timeout=0.1))
+        start = time.monotonic()
+        with pytest.raises(JobTimeoutError) as excinfo:
+            executor.execute_sync()
+        assert time.monotonic() - start < 2
+        assert excinfo.value.phase == "verify"
+        assert "prepare" in executor.timings
+
+    def test_job_timeout(self):
+        executor = JobExecutor(_job("slow", sleep=5, timeout=0.1))
+        with pytest.raises(JobTimeoutError) as excinfo:
+            executor.execute_sync()
+        assert excinfo.value.phase == "job"
+
+    def test_cancellation(self):
+        token = CancellationToken()
+        executor = JobExecutor(_job("slow", sleep=5), token=token)
+        threading.Timer(0.1, token.cancel, args=("stop",)).start()
+        with pytest.raises(JobCancelled, match="stop"):
+            executor.execute_sync()
+
+
+class TestRunProcess:
+
+    def test_cancel_kills_process(self):
+        token = CancellationToken()
+        threading.Timer(0.1, token.cancel).start()
+        start = time.monotonic()
+        with pytest.raises(JobCancelled):
+            run_process([sys.executable, "-c", "import time; time.sleep(30)"], token=token)
+        assert time.monotonic() - start < 5
+
+    def test_completed_process(self):
+        completed = run_process([sys.executable, "-c", "print('hi')"], capture_output=True, text=True)
+        assert completed.returncode == 0
+        assert completed.stdout.strip() == "hi"
+
+
+class TestBatchBudgets:
+
+    def test_straggler_times_out_while_pool_keeps_moving(self):
+        jobs = [_job("hung", sleep=30)] + [_job(f"ok{i}") for i in range(4)]
+        runbook = Runbook(name="t", jobs=jobs, job_timeout=0.3)
+        start = time.monotonic()
+        report = BatchRunner(runbook, max_workers=2).run_batch_parallel()
+        assert time.monotonic() - start < 5
+        assert report.results[0].status == STATUS_TIMEOUT
+        assert [r.status for r in report.results[1:]] == [STATUS_SUCCESS] * 4
+        assert report.timed_out_jobs == 1
+
+    def test_max_failures_stops_sync_batch(self):
+        jobs = [_job(f"bad{i}", fail=True) for i in range(3)] + [_job("ok")]
+        runbook = Runbook(name="t", jobs=jobs, max_failures=2)
+        report = BatchRunner(runbook).run_batch_sync()
+        assert [r.status for r in report.results] == ["failed", "failed", STATUS_SKIPPED, STATUS_SKIPPED]
+        assert "2 failures" in report.stopped_reason
+
+    def test_failure_rate_stops_async_batch(self):
+        jobs = [_job(f"bad{i}", fail=True) for i in range(3)] + [_job(f"ok{i}") for i in range(3)]
+        runbook = Runbook(name="t", jobs=jobs, max_failure_rate=50, failure_rate_min_jobs=2)
+        report = asyncio.run(BatchRunner(runbook, max_workers=1).run_batch_async())
+        assert report.skipped_jobs == 4
+        assert "failure rate" in report.stopped_reason
+
+    def test_deadline_cancels_running_and_skips_pending(self):
+        jobs = [_job(f"slow{i}", sleep=30) for i in range(4)]
+        runbook = Runbook(name="t", jobs=jobs, deadline=0.3)
+        start = time.monotonic()
+        report = BatchRunner(runbook, max_workers=2).run_batch_parallel()
+        assert time.monotonic() - start < 5
+        assert [r.status for r in report.results] == ["cancelled", "cancelled", STATUS_SKIPPED, STATUS_SKIPPED]
+        assert report.successful_jobs == 0
+        assert "deadline" in report.stopped_reason
+
+    def test_runbook_defaults_apply_to_jobs(self):
+        runbook = Runbook.from_dict({
+            "name": "t",
+            "prepare_timeout": 60,
+            "jobs": [
+                {"id": "a", "type": "github", "agent": "demo", "issue_url": "https://github.com/o/p/issues/1"},
+                {"id": "b", "type": "github", "agent": "demo", "issue_url": "https://github.com/o/p/issues/2",
+                 "prepare_timeout": 5},
+            ],
+        })
+        assert [job.prepare_timeout for job in runbook.jobs] == [60, 5]
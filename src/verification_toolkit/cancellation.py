@@ -0,0 +1,186 @@
+"""Cooperative cancellation and hard-kill support for jobs and their processes."""
+
+from __future__ import annotations
+
+import contextvars
+import os
+import signal
+import subprocess
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Iterator, List, Optional, Sequence
+
+_CURRENT_TOKEN: contextvars.ContextVar[Optional["CancellationToken"]] = contextvars.ContextVar(
+    "verification_toolkit_cancellation_token", default=None
+)
+
+
+class JobCancelled(Exception):
+    """Raised when a job is cancelled before it could finish."""
+
+    def __init__(self, reason: str = "cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class JobTimeoutError(JobCancelled):
+    """Raised when a job or one of its phases exceeds its time budget."""
+
+    def __init__(self, phase: str, timeout: float):
+        super().__init__(f"timed out after {timeout:.1f}s in phase '{phase}'")
+        self.phase = phase
+        self.timeout = timeout
+
+
+class CancellationToken:
+    """Thread-safe cancellation flag shared between a job and its supervisor.
+
+    Cancelling a token cancels its children, runs registered callbacks and
+    kills every subprocess registered through :meth:`track_process`.
+    """
+
+    def __init__(self, parent: Optional["CancellationToken"] = None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[str], None]] = []
+        self._processes: List[subprocess.Popen] = []
+        self._error: Optional[JobCancelled] = None
+        if parent is not None:
+            parent.add_callback(lambda _reason: self.cancel(error=parent._error))
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    @property
+    def reason(self) -> Optional[str]:
+        return self._error.reason if self._error else None
+
+    def child(self) -> "CancellationToken":
+        """Return a token that is cancelled whenever this one is."""
+        return CancellationToken(parent=self)
+
+    def cancel(self, reason: str = "cancelled", error: Optional[JobCancelled] = None) -> None:
+        """Cancel the token; only the first call has any effect."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._error = error or JobCancelled(reason)
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+            processes = list(self._processes)
+        for process in processes:
+            kill_process(process)
+        for callback in callbacks:
+            callback(self._error.reason)
+
+    def raise_if_cancelled(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until cancelled or ``timeout`` elapses; return ``cancelled``."""
+        return self._event.wait(timeout)
+
+    def add_callback(self, callback: Callable[[str], None]) -> None:
+        """Run ``callback(reason)`` on cancellation (immediately if already cancelled)."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self._error.reason)
+
+    def remove_callback(self, callback: Callable[[str], None]) -> None:
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def processes(self) -> List[subprocess.Popen]:
+        """Subprocesses currently registered through :meth:`track_process`."""
+        with self._lock:
+            return list(self._processes)
+
+    @contextmanager
+    def track_process(self, process: subprocess.Popen) -> Iterator[subprocess.Popen]:
+        """Kill ``process`` if the token is cancelled while the block runs."""
+        with self._lock:
+            already_cancelled = self._event.is_set()
+            if not already_cancelled:
+                self._processes.append(process)
+        if already_cancelled:
+            kill_process(process)
+        try:
+            yield process
+        finally:
+            with self._lock:
+                if process in self._processes:
+                    self._processes.remove(process)
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Return the token of the job running in the current context, if any."""
+    return _CURRENT_TOKEN.get()
+
+
+@contextmanager
+def use_token(token: Optional[CancellationToken]) -> Iterator[None]:
+    """Make ``token`` the :func:`current_token` for the enclosed block."""
+    reset = _CURRENT_TOKEN.set(token)
+    try:
+        yield
+    finally:
+        _CURRENT_TOKEN.reset(reset)
+
+
+def kill_process(process: subprocess.Popen) -> None:
+    """Hard-kill ``process`` and, on POSIX, the process group it leads."""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, signal.SIGKILL)
+        else:  # pragma: no cover - exercised on Windows only
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        process.kill()
+
+
+def run_process(
+    args: Sequence[str] | str,
+    *,
+    timeout: Optional[float] = None,
+    token: Optional[CancellationToken] = None,
+    capture_output: bool = False,
+    check: bool = False,
+    input: Optional[bytes] = None,  # noqa: A002 - mirrors subprocess.run
+    **kwargs,
+) -> subprocess.CompletedProcess:
+    """``subprocess.run`` that is killed when the job is cancelled or times out.
+
+    The child is started in its own session so that the whole process tree
+    can be killed. ``token`` defaults to :func:`current_token`.
+    """
+    token = token or current_token()
+    if token is not None:
+        token.raise_if_cancelled()
+    if capture_output:
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    if input is not None:
+        kwargs["stdin"] = subprocess.PIPE
+    if os.name == "posix":
+        kwargs.setdefault("start_new_session", True)
+    process = subprocess.Popen(args, **kwargs)
+    tracked = token.track_process(process) if token is not None else nullcontext(process)
+    with tracked:
+        try:
+            stdout, stderr = process.communicate(input=input, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            kill_process(process)
+            process.communicate()
+            raise
+    if token is not None:
+        token.raise_if_cancelled()
+    completed = subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+    if check:
+        completed.check_returncode()
+    return completed
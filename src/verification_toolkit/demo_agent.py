@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import shlex
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
@@ -13,13 +14,26 @@ from verification_toolkit import EvaluationResult, GitHubEvaluationRunner, Verif
 class DemoAgentConfig:
     command: str = "pytest"
     extra_args: Optional[list[str]] = None
+    # Actually run ``command`` in the prepared repository.
+    run_tests: bool = False
+    # Only run the tests affected by the closing commit (see ``impact.py``).
+    select_tests: bool = True
+    timeout: Optional[float] = None
+    # Test processes to split the run into (None = as many as free CPUs).
+    shards: Optional[int] = None
+    output_lines: int = 40
 
 
 class DemoVerificationAgent(VerificationAgent):
-    """A toy agent that simply prints repo info and pretends tests passed."""
+    """A toy agent that prints repo info and pretends tests passed.
 
-    def __init__(self, config: DemoAgentConfig | None = None) -> None:
-        self.config = config or DemoAgentConfig()
+    With ``run_tests`` it runs the test command for real, limited to the
+    tests that import files changed by the issue's closing commit.
+    """
+
+    def __init__(self, config: DemoAgentConfig | None = None, **options) -> None:
+        # ``options`` lets runbooks configure the agent through agent_kwargs.
+        self.config = config or DemoAgentConfig(**options)
 
     def run_verification(self, context) -> EvaluationResult:
         repo_path = Path(context.repo_path)
@@ -34,9 +48,87 @@ class DemoVerificationAgent(VerificationAgent):
             summary.append("Description:\n" + context.issue_description[:200] + "...")
 
         summary.append(f"Repo location: {repo_path}")
-        summary.append("Pretending to run tests... (skipped in demo)")
-
-        return EvaluationResult(success=True, details="\n".join(summary), artifacts={"repo_path": str(repo_path)})
+        if not self.config.run_tests:
+            summary.append("Pretending to run tests... (skipped in demo)")
+            return EvaluationResult(success=True, details="\n".join(summary), artifacts={"repo_path": str(repo_path)})
+        return self._run_tests(context, repo_path, summary)
+
+    def _run_tests(self, context, repo_path: Path, summary: list[str]) -> EvaluationResult:
+        from .batch_workflow.backends import LocalExecutionBackend
+        from .impact import SelectedTests, select_tests
+
+        if self.config.select_tests:
+            selection = select_tests(repo_path, context.current_commit, context.closing_commit)
+        else:
+            selection = SelectedTests.full("test selection disabled")
+        command = shlex.split(self.config.command) + list(self.config.extra_args or [])
+        summary.append(f"Tests: {selection.mode} ({selection.reason})")
+        summary.append("Running: " + " ".join(shlex.quote(arg) for arg in command))
+
+        artifacts = {
+            "repo_path": str(repo_path),
+            "test_selection": selection.mode,
+            "selected_tests": selection.tests,
+            "changed_files": selection.changed_files,
+        }
+        env = None
+        if getattr(context, "environment_path", None):
+            from .batch_workflow.environments import activated_env
+
+            env = activated_env(context.environment_path, repo_path=repo_path)
+            summary.append(f"Environment: {context.environment_path}")
+        tests = selection.tests
+        if not tests and self.config.shards != 1:
+            # Shard the full suite by the files pytest itself collects.
+            tests = collected_test_files(command, repo_path, env=env, timeout=self.config.timeout)
+        try:
+            execution = LocalExecutionBackend().run(
+                command, tests, cwd=repo_path, timeout=self.config.timeout, shards=self.config.shards, env=env
+            )
+        except OSError as exc:
+            summary.append(f"Unable to run tests: {exc}")
+            return EvaluationResult(success=False, details="\n".join(summary), artifacts=artifacts)
+
+        summary.append(f"Exit code: {execution.returncode} ({len(execution.shards)} shard(s))")
+        if execution.timed_out:
+            summary.append(f"Tests timed out after {self.config.timeout}s")
+        summary.extend(execution.output_tail(self.config.output_lines))
+        artifacts["returncode"] = execution.returncode
+        artifacts["logs"] = execution.log_paths
+        success = execution.returncode == 0 and not execution.timed_out
+        return EvaluationResult(success=success, details="\n".join(summary), artifacts=artifacts)
+
+
+def collected_test_files(
+    command: list[str], repo_path: Path, env: Optional[dict[str, str]] = None, timeout: Optional[float] = None
+) -> list[str]:
+    """Test files a pytest ``command`` collects in ``repo_path``, in order.
+
+    Collection honours ``testpaths``, ``norecursedirs`` and ``collect_ignore``,
+    which a plain walk for ``test_*.py`` does not. Returns ``[]`` (run the
+    full command unsharded) for other runners or if collection fails.
+    """
+    import subprocess
+
+    from .cancellation import run_process
+
+    if not any(Path(arg).name in ("pytest", "py.test") for arg in command):
+        return []
+    try:
+        completed = run_process(
+            command + ["--collect-only", "-q"], cwd=str(repo_path), env=env, timeout=timeout, capture_output=True
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    if completed.returncode != 0:
+        return []
+    files: dict[str, None] = {}
+    for line in completed.stdout.decode("utf-8", "replace").splitlines():
+        # ``path::test`` node IDs, or ``path: count`` when run with -qq.
+        path = line.split("::", 1)[0] if "::" in line else line.rpartition(": ")[0]
+        if path and (repo_path / path).is_file():
+            files.setdefault(path, None)
+    return list(files)
 
 
 def main(issue_url: str) -> EvaluationResult:
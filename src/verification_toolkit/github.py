@@ -2,21 +2,81 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import re
+import shutil
+import tarfile
+import threading
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Callable, Optional
 
-import requests
-from git import Repo
-
-from .interfaces import EvaluationResult, VerificationAgent
+from .interfaces import AnyVerificationAgent, EvaluationResult, is_async_agent
 
 LOGGER = logging.getLogger(__name__)
 DEFAULT_RUNTIME_DIR = Path(os.environ.get("LINGXI_RUNTIME_DIR", Path.home() / ".lingxi" / "runtime"))
 DEFAULT_REQUEST_TIMEOUT = float(os.environ.get("LINGXI_GITHUB_TIMEOUT", "30"))
+DEFAULT_GIT_BASE_URL = os.environ.get("LINGXI_GITHUB_GIT_URL", "https://github.com")
+DEFAULT_API_BASE_URL = os.environ.get("LINGXI_GITHUB_API_URL", "https://api.github.com")
+DEFAULT_GIT_TIMEOUT = float(os.environ["LINGXI_GIT_TIMEOUT"]) if os.environ.get("LINGXI_GIT_TIMEOUT") else None
+
+
+class GitHubStats:
+    """Process-wide API quota and clone cache counters.
+
+    Every :class:`GitHubIssuePreparer` updates :data:`GITHUB_STATS`; batch
+    metrics read it.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.api_requests = 0
+        # From the X-RateLimit-* headers of the latest API response.
+        self.rate_limit: Optional[int] = None
+        self.rate_limit_remaining: Optional[int] = None
+        self.rate_limit_reset: Optional[float] = None
+        # Workspaces served from an existing clone or archive vs downloaded.
+        self.clone_cache_hits = 0
+        self.clone_cache_misses = 0
+
+    def record_response(self, response, *args, **kwargs):
+        """``requests`` response hook: count the call and note the quota left."""
+        headers = getattr(response, "headers", None) or {}
+        with self._lock:
+            self.api_requests += 1
+            try:
+                if "X-RateLimit-Remaining" in headers:
+                    self.rate_limit_remaining = int(headers["X-RateLimit-Remaining"])
+                if "X-RateLimit-Limit" in headers:
+                    self.rate_limit = int(headers["X-RateLimit-Limit"])
+                if "X-RateLimit-Reset" in headers:
+                    self.rate_limit_reset = float(headers["X-RateLimit-Reset"])
+            except ValueError:
+                pass
+        return response
+
+    def record_clone(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.clone_cache_hits += 1
+            else:
+                self.clone_cache_misses += 1
+
+
+GITHUB_STATS = GitHubStats()
+
+
+def parse_issue_url(issue_url: str) -> tuple[str, str, str]:
+    """Split a GitHub issue URL into ``(owner, project, issue_number)``.
+
+    Returns empty strings when the URL is not a GitHub issue URL.
+    """
+    match = re.match(r"https://github\.com/([^/]+)/([^/]+)/issues/(\d+)", issue_url or "")
+    if not match:
+        return "", "", ""
+    return match.group(1), match.group(2), match.group(3)
 
 
 @dataclass(slots=True)
@@ -31,6 +91,8 @@ class GitHubIssueContext:
     current_commit: str
     closing_commit: Optional[str]
     issue_description: Optional[str]
+    # Interpreter environment for the prepared commit, when one was provisioned.
+    environment_path: Optional[str] = None
 
     def as_dict(self) -> dict[str, Optional[str]]:
         """Return a JSON-serialisable representation of the context."""
@@ -44,9 +106,54 @@ class GitHubIssueContext:
             "current_commit": self.current_commit,
             "closing_commit": self.closing_commit,
             "issue_description": self.issue_description,
+            "environment_path": self.environment_path,
         }
 
 
+def extract_tarball(fileobj: BinaryIO, dest: Path, strip_components: int = 1) -> None:
+    """Extract a (compressed) tar stream into ``dest`` as read-only files.
+
+    The stream is read sequentially, so ``fileobj`` may be a network
+    response. Leading path components (GitHub's ``<owner>-<project>-<sha>/``)
+    are stripped, and members that would escape ``dest`` are skipped.
+    """
+    dest.mkdir(parents=True, exist_ok=True)
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for member in archive:
+            parts = member.name.split("/")[strip_components:]
+            if not parts or not parts[0]:
+                continue
+            member.name = "/".join(parts)
+            if member.islnk():
+                member.linkname = "/".join(member.linkname.split("/")[strip_components:])
+            try:
+                if hasattr(tarfile, "data_filter"):
+                    archive.extract(member, dest, filter="data")
+                elif _is_within(dest, member):  # pragma: no cover - Python without extraction filters
+                    archive.extract(member, dest)
+                else:  # pragma: no cover
+                    raise tarfile.TarError(f"{member.name} points outside the archive")
+            except tarfile.TarError as exc:
+                LOGGER.warning("Skipping %s from archive: %s", member.name, exc)
+                continue
+            if member.isreg():
+                target = dest / member.name
+                target.chmod(target.stat().st_mode & ~0o222)
+
+
+def _is_within(dest: Path, member: tarfile.TarInfo) -> bool:
+    root = os.path.realpath(dest)
+    targets = [member.name]
+    if member.issym():
+        targets.append(os.path.join(os.path.dirname(member.name), member.linkname))
+    elif member.islnk():
+        targets.append(member.linkname)
+    return all(
+        not os.path.isabs(target) and os.path.realpath(os.path.join(root, target)).startswith(root + os.sep)
+        for target in targets
+    )
+
+
 class GitHubIssuePreparer:
     """Prepare GitHub repositories for verification workflows."""
 
@@ -55,34 +162,71 @@ class GitHubIssuePreparer:
         runtime_dir: str | os.PathLike[str] | None = None,
         github_token: Optional[str] = None,
         request_timeout: float = DEFAULT_REQUEST_TIMEOUT,
+        git_base_url: str = DEFAULT_GIT_BASE_URL,
+        api_base_url: str = DEFAULT_API_BASE_URL,
+        git_timeout: Optional[float] = DEFAULT_GIT_TIMEOUT,
+        reference_dir: str | os.PathLike[str] | None = None,
+        cache_metadata: bool = False,
+        persistent_sessions: bool = os.name == "posix",
+        archive: bool = False,
     ) -> None:
+        # The runtime directory is created on first clone, not here, so that
+        # building a preparer (e.g. per batch job) stays free of filesystem work.
         self.runtime_dir = Path(runtime_dir) if runtime_dir else DEFAULT_RUNTIME_DIR
-        self.runtime_dir.mkdir(parents=True, exist_ok=True)
         self.github_token = github_token or os.environ.get("GITHUB_TOKEN")
         self.request_timeout = request_timeout
-
-    def prepare(self, issue_url: str, checkout_parent: bool = True) -> GitHubIssueContext:
-        """Produce a :class:`GitHubIssueContext` for the given issue URL."""
+        self.git_base_url = git_base_url.rstrip("/")
+        self.api_base_url = api_base_url.rstrip("/")
+        # Git subprocesses running longer than this are killed (None = no limit).
+        self.git_timeout = git_timeout
+        # Another runtime directory whose clones may donate objects to ours
+        # (``git clone --reference-if-able ... --dissociate``).
+        self.reference_dir = Path(reference_dir) if reference_dir else None
+        # HTTP session reused across API calls (keep-alive), created on first use.
+        self._session = None
+        self._session_lock = threading.Lock()
+        # With ``cache_metadata``, issue descriptions and closing commits are
+        # fetched once per issue for the lifetime of the preparer.
+        self.cache_metadata = cache_metadata
+        self._metadata_cache: dict[tuple[str, str, str], tuple[Optional[str], Optional[str]]] = {}
+        # Run checkout/reset/clean through the workspace's long-lived shell
+        # (see :mod:`verification_toolkit.session`) instead of a new git
+        # subprocess from this process per command.
+        self.persistent_sessions = persistent_sessions
+        # Serve workspaces from commit tarballs (no git history) by default;
+        # see :meth:`prepare`.
+        self.archive = archive
+
+    def prepare(
+        self, issue_url: str, checkout_parent: bool = True, archive: Optional[bool] = None
+    ) -> GitHubIssueContext:
+        """Produce a :class:`GitHubIssueContext` for the given issue URL.
+
+        With ``archive`` (default: the preparer's ``archive`` setting) the
+        workspace is the source tree of the resolved commit, downloaded once
+        as a tarball into a cache shared by all jobs on that commit. It has
+        no ``.git`` and its files are read-only.
+        """
 
         owner, project, issue_number = self._parse_issue_url(issue_url)
         if not owner:
             raise ValueError(f"Invalid GitHub issue URL: {issue_url}")
+        if self.archive if archive is None else archive:
+            return self._prepare_archive(issue_url, owner, project, issue_number, checkout_parent)
 
         repo_path = self._materialise_repository(owner, project)
-        repo = Repo(repo_path)
-        self._reset_repository(repo)
+        git = self._git_runner(repo_path)
+        self._reset_repository(git)
 
-        issue_description = self._fetch_issue_description(owner, project, issue_number)
-        closing_commit = self._fetch_closing_commit(owner, project, issue_number)
-        current_commit = repo.commit().hexsha
+        issue_description, closing_commit = self._issue_metadata(owner, project, issue_number)
 
         if closing_commit:
             try:
-                repo.git.checkout(closing_commit)
-                current_commit = repo.commit().hexsha
-                if checkout_parent and repo.commit().parents:
-                    repo.git.checkout(repo.commit().parents[0].hexsha)
-                    current_commit = repo.commit().hexsha
+                git("checkout", closing_commit)
+                # "<commit> <parent>..." -- just the commit for a root commit.
+                parents = git("rev-list", "--parents", "-n", "1", "HEAD").split()[1:]
+                if checkout_parent and parents:
+                    git("checkout", parents[0])
             except Exception as exc:  # pragma: no cover - defensive logging
                 LOGGER.warning(
                     "Unable to checkout closing commit %s for %s/%s: %s",
@@ -92,7 +236,7 @@ class GitHubIssuePreparer:
                     exc,
                 )
 
-        self._reset_repository(repo)
+        self._reset_repository(git)
 
         return GitHubIssueContext(
             issue_url=issue_url,
@@ -100,7 +244,7 @@ class GitHubIssuePreparer:
             project=project,
             issue_number=issue_number,
             repo_path=str(repo_path),
-            current_commit=repo.commit().hexsha,
+            current_commit=git("rev-parse", "HEAD"),
             closing_commit=closing_commit,
             issue_description=issue_description,
         )
@@ -108,33 +252,214 @@ class GitHubIssuePreparer:
     def run_with_agent(
         self,
         issue_url: str,
-        agent: VerificationAgent,
+        agent: AnyVerificationAgent,
         checkout_parent: bool = True,
     ) -> EvaluationResult:
-        """Shortcut to prepare the repo then invoke the supplied agent."""
+        """Shortcut to prepare the repo then invoke the supplied agent.
+
+        An :class:`AsyncVerificationAgent` is run to completion with
+        :func:`asyncio.run`.
+        """
 
         context = self.prepare(issue_url, checkout_parent=checkout_parent)
+        if is_async_agent(agent):
+            return asyncio.run(agent.run_verification(context))
         return agent.run_verification(context)
 
+    def _prepare_archive(
+        self, issue_url: str, owner: str, project: str, issue_number: str, checkout_parent: bool
+    ) -> GitHubIssueContext:
+        issue_description, closing_commit = self._issue_metadata(owner, project, issue_number)
+        sha, parents = self._resolve_commit(owner, project, closing_commit or "HEAD")
+        if closing_commit and checkout_parent and parents:
+            sha = parents[0]
+        return GitHubIssueContext(
+            issue_url=issue_url,
+            owner=owner,
+            project=project,
+            issue_number=issue_number,
+            repo_path=str(self._materialise_archive(owner, project, sha)),
+            current_commit=sha,
+            closing_commit=closing_commit,
+            issue_description=issue_description,
+        )
+
+    def _resolve_commit(self, owner: str, project: str, ref: str) -> tuple[str, list[str]]:
+        """``(sha, parent shas)`` of ``ref``, from the commits API."""
+        response = self._http_session().get(
+            f"{self.api_base_url}/repos/{owner}/{project}/commits/{ref}",
+            headers=self._request_headers(),
+            timeout=self.request_timeout,
+        )
+        response.raise_for_status()
+        data = response.json()
+        return data["sha"], [parent["sha"] for parent in data.get("parents", [])]
+
+    def _materialise_archive(self, owner: str, project: str, sha: str) -> Path:
+        """Unpack ``tarball/<sha>`` into ``<runtime_dir>/archives/<sha>``.
+
+        The response is extracted as it streams in, without a temporary
+        file, and the tree is only renamed into place once complete.
+        """
+        from .cancellation import current_token
+
+        archive_path = self.runtime_dir / "archives" / sha
+        if archive_path.exists():
+            GITHUB_STATS.record_clone(hit=True)
+            return archive_path
+        if self.reference_dir is not None and (self.reference_dir / "archives" / sha).exists():
+            # Read-only, so a private workspace can use the shared copy as is.
+            GITHUB_STATS.record_clone(hit=True)
+            return self.reference_dir / "archives" / sha
+        GITHUB_STATS.record_clone(hit=False)
+        LOGGER.info("Downloading %s/%s@%s into %s", owner, project, sha, archive_path)
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        partial_path = archive_path.with_name(f".{sha}.partial-{os.getpid()}-{threading.get_ident()}")
+        token = current_token()
+        try:
+            with self._http_session().get(
+                f"{self.api_base_url}/repos/{owner}/{project}/tarball/{sha}",
+                headers=self._request_headers(),
+                timeout=self.request_timeout,
+                stream=True,
+            ) as response:
+                response.raise_for_status()
+
+                def on_cancel(_reason: str) -> None:
+                    # Closing the response aborts a download the job no longer needs.
+                    response.close()
+
+                if token is not None:
+                    token.add_callback(on_cancel)
+                try:
+                    extract_tarball(response.raw, partial_path)
+                except Exception:
+                    if token is not None:
+                        token.raise_if_cancelled()
+                    raise
+                finally:
+                    if token is not None:
+                        token.remove_callback(on_cancel)
+            try:
+                partial_path.rename(archive_path)
+            except OSError:
+                # Another worker unpacked the same commit first.
+                if not archive_path.exists():
+                    raise
+        finally:
+            if partial_path.exists():
+                shutil.rmtree(partial_path, ignore_errors=True)
+        return archive_path
+
     def _parse_issue_url(self, issue_url: str) -> tuple[str, str, str]:
-        pattern = r"https://github\.com/([^/]+)/([^/]+)/issues/(\d+)"
-        match = re.match(pattern, issue_url)
-        if not match:
-            return "", "", ""
-        return match.group(1), match.group(2), match.group(3)
+        return parse_issue_url(issue_url)
+
+    def prepare_commit(self, owner: str, project: str, commit: str) -> Path:
+        """Check out ``commit`` in the cached clone of ``owner/project``, offline.
+
+        Unlike :meth:`prepare` this never contacts GitHub: the clone must
+        already exist under ``runtime_dir``, or under ``reference_dir`` (from
+        which it is cloned locally). Raises :class:`FileNotFoundError` when
+        neither has it.
+        """
+        repo_path = self._materialise_repository(owner, project, offline=True)
+        git = self._git_runner(repo_path)
+        self._reset_repository(git)
+        git("checkout", "--detach", commit)
+        self._reset_repository(git)
+        return repo_path
 
-    def _materialise_repository(self, owner: str, project: str) -> Path:
+    def _materialise_repository(self, owner: str, project: str, offline: bool = False) -> Path:
         repo_path = self.runtime_dir / owner / project
+        GITHUB_STATS.record_clone(hit=repo_path.exists())
         if not repo_path.exists():
-            git_url = f"https://github.com/{owner}/{project}"
+            git_url = f"{self.git_base_url}/{owner}/{project}"
+            if offline:
+                git_url = str(self.reference_dir / owner / project) if self.reference_dir is not None else ""
+                if not git_url or not Path(git_url).exists():
+                    raise FileNotFoundError(f"No cached clone of {owner}/{project} under {self.runtime_dir}")
             LOGGER.info("Cloning %s into %s", git_url, repo_path)
             repo_path.parent.mkdir(parents=True, exist_ok=True)
-            Repo.clone_from(git_url, repo_path)
+            # Clone next to the final location and rename, so a clone that is
+            # killed half-way never leaves a directory that looks usable.
+            partial_path = repo_path.with_name(f".{project}.partial-{os.getpid()}-{threading.get_ident()}")
+            try:
+                clone_options = []
+                if self.reference_dir is not None and not offline:
+                    clone_options = ["--reference-if-able", str(self.reference_dir / owner / project), "--dissociate"]
+                self._run_git("clone", *clone_options, git_url, str(partial_path))
+                try:
+                    partial_path.rename(repo_path)
+                    if self.persistent_sessions:
+                        from .session import drop_session
+
+                        drop_session(repo_path)  # a session for a workspace deleted earlier
+                except OSError:
+                    # Another worker finished cloning the same repository first.
+                    if not repo_path.exists():
+                        raise
+            finally:
+                if partial_path.exists():
+                    shutil.rmtree(partial_path, ignore_errors=True)
         return repo_path
 
-    def _reset_repository(self, repo: Repo) -> None:
-        repo.git.reset("--hard")
-        repo.git.clean("-xdf")
+    def _git_runner(self, repo_path: Path) -> Callable[..., str]:
+        """``git(*args) -> stripped stdout`` for ``repo_path``; raises on failure."""
+        if self.persistent_sessions:
+            from .session import workspace_session
+
+            session = workspace_session(repo_path)
+
+            def git(*args: str) -> str:
+                return session.git(*args, timeout=self.git_timeout).stdout.decode("utf-8", "replace").strip()
+        else:
+            def git(*args: str) -> str:
+                return self._run_git(*args, cwd=repo_path)
+
+        return git
+
+    def _run_git(self, *args: str, cwd: Optional[Path] = None) -> str:
+        """Run git to completion and return its stripped stdout.
+
+        The process group is killed after ``git_timeout`` seconds, or as soon
+        as the job running this (see
+        :func:`~verification_toolkit.cancellation.current_token`)
+        is cancelled or runs out of time. Raises
+        :class:`subprocess.CalledProcessError` on failure.
+        """
+        from .cancellation import run_process
+
+        completed = run_process(
+            ["git", *args], cwd=cwd, timeout=self.git_timeout, capture_output=True, check=True
+        )
+        return completed.stdout.decode("utf-8", "replace").strip()
+
+    def _reset_repository(self, git: Callable[..., str]) -> None:
+        git("reset", "--hard")
+        git("clean", "-xdf")
+
+    def _issue_metadata(self, owner: str, project: str, issue_number: str) -> tuple[Optional[str], Optional[str]]:
+        """Return ``(issue_description, closing_commit)``, cached if enabled."""
+        key = (owner, project, issue_number)
+        if key in self._metadata_cache:
+            return self._metadata_cache[key]
+        issue_description = self._fetch_issue_description(owner, project, issue_number)
+        closing_commit = self._fetch_closing_commit(owner, project, issue_number)
+        # A missing description means the API call failed; retry it next time.
+        if self.cache_metadata and issue_description is not None:
+            self._metadata_cache[key] = (issue_description, closing_commit)
+        return issue_description, closing_commit
+
+    def _http_session(self):
+        if self._session is None:
+            import requests
+
+            with self._session_lock:
+                if self._session is None:
+                    session = requests.Session()
+                    session.hooks["response"].append(GITHUB_STATS.record_response)
+                    self._session = session
+        return self._session
 
     def _request_headers(self) -> dict[str, str]:
         headers = {"Accept": "application/vnd.github+json"}
@@ -144,8 +469,8 @@ class GitHubIssuePreparer:
         return headers
 
     def _fetch_issue_description(self, owner: str, project: str, issue_number: str) -> Optional[str]:
-        issue_api_url = f"https://api.github.com/repos/{owner}/{project}/issues/{issue_number}"
-        response = requests.get(
+        issue_api_url = f"{self.api_base_url}/repos/{owner}/{project}/issues/{issue_number}"
+        response = self._http_session().get(
             issue_api_url,
             headers=self._request_headers(),
             timeout=self.request_timeout,
@@ -162,8 +487,8 @@ class GitHubIssuePreparer:
         return None
 
     def _fetch_issue_events(self, owner: str, project: str, issue_number: str) -> list[dict[str, object]]:
-        event_url = f"https://api.github.com/repos/{owner}/{project}/issues/{issue_number}/events"
-        response = requests.get(
+        event_url = f"{self.api_base_url}/repos/{owner}/{project}/issues/{issue_number}/events"
+        response = self._http_session().get(
             event_url,
             headers=self._request_headers(),
             timeout=self.request_timeout,
@@ -172,6 +497,8 @@ class GitHubIssuePreparer:
         return response.json()
 
     def _fetch_closing_commit(self, owner: str, project: str, issue_number: str) -> Optional[str]:
+        import requests
+
         try:
             events = self._fetch_issue_events(owner, project, issue_number)
         except requests.HTTPError as exc:
@@ -209,7 +536,7 @@ class GitHubEvaluationRunner:
     def run(
         self,
         issue_url: str,
-        agent: VerificationAgent,
+        agent: AnyVerificationAgent,
         checkout_parent: bool = True,
     ) -> EvaluationResult:
         """Prepare the repository then hand off to the provided agent."""
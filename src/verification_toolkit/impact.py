@@ -0,0 +1,276 @@
+"""Test-impact selection: run only the tests a change can affect.
+
+A :class:`DependencyIndex` records, for one commit of a Python repository,
+which files each file imports (read straight from git objects with
+:mod:`ast`, so the worktree state does not matter). Test files also depend
+on the ``conftest.py`` files above them. Given the files changed between two
+commits, :func:`select_tests` walks the reverse import graph to the test
+files that can observe the change, and falls back to the full suite whenever
+the change reaches something the index cannot see (configuration, data
+files, or code no test imports).
+
+Indexes are cached in memory and under the repository's git directory,
+keyed by commit, so each commit is only parsed once.
+"""
+
+from __future__ import annotations
+
+import ast
+import json
+import logging
+import os
+import subprocess
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+LOGGER = logging.getLogger(__name__)
+INDEX_VERSION = 1
+DOC_SUFFIXES = {".md", ".rst", ".adoc"}
+DOC_DIRS = {"doc", "docs"}
+
+_CACHE_SIZE = 32
+_cache: "OrderedDict[Tuple[str, str], DependencyIndex]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def is_test_file(path: str) -> bool:
+    """pytest's default ``test_*.py`` / ``*_test.py`` naming."""
+    name = PurePosixPath(path).name
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def _is_documentation(path: str) -> bool:
+    posix = PurePosixPath(path)
+    return posix.suffix.lower() in DOC_SUFFIXES or (len(posix.parts) > 1 and posix.parts[0] in DOC_DIRS)
+
+
+def _module_names(path: str) -> List[str]:
+    """Dotted names ``path`` may be imported as: every suffix of its module path.
+
+    ``src/pkg/mod.py`` is ``src.pkg.mod``, ``pkg.mod`` or ``mod`` depending on
+    ``sys.path``; registering all of them can only over-select tests.
+    """
+    parts = list(PurePosixPath(path).with_suffix("").parts)
+    if parts[-1] == "__init__":
+        parts.pop()
+    return [".".join(parts[i:]) for i in range(len(parts))]
+
+
+def _imported_modules(source: bytes, path: str) -> Set[str]:
+    """Absolute dotted names imported by ``source``, with their parent packages."""
+    tree = ast.parse(source, filename=path)
+    package = list(PurePosixPath(path).parent.parts)
+    names: Set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.level:
+                base = package[: len(package) - (node.level - 1)] if node.level > 1 else package
+                prefix = ".".join(base + ([node.module] if node.module else []))
+            else:
+                prefix = node.module or ""
+            if prefix:
+                names.add(prefix)
+            # ``from pkg import name`` may import the submodule ``pkg.name``.
+            names.update(f"{prefix}.{alias.name}" if prefix else alias.name for alias in node.names)
+    expanded = set()
+    for name in names:
+        parts = name.split(".")
+        expanded.update(".".join(parts[:i]) for i in range(1, len(parts) + 1))
+    return expanded
+
+
+@dataclass
+class DependencyIndex:
+    """Import graph of the Python files in one commit."""
+
+    commit: str
+    files: List[str]
+    deps: Dict[str, List[str]]
+    # Files that could not be parsed; tests among them are always selected.
+    opaque: List[str] = field(default_factory=list)
+
+    @property
+    def tests(self) -> List[str]:
+        return [path for path in self.files if is_test_file(path)]
+
+    def affected_tests(self, changed: Iterable[str]) -> List[str]:
+        """Test files that import (directly or not) any of ``changed``."""
+        dependents: Dict[str, List[str]] = {}
+        for path, deps in self.deps.items():
+            for dep in deps:
+                dependents.setdefault(dep, []).append(path)
+        seen = set(changed)
+        queue = deque(seen)
+        while queue:
+            for dependent in dependents.get(queue.popleft(), ()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    queue.append(dependent)
+        opaque = set(self.opaque)
+        return [path for path in self.tests if path in seen or path in opaque]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"version": INDEX_VERSION, "commit": self.commit, "files": self.files,
+                "deps": self.deps, "opaque": self.opaque}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> "DependencyIndex":
+        return cls(commit=data["commit"], files=data["files"], deps=data["deps"], opaque=data.get("opaque", []))
+
+
+def _git(repo_path: str | Path, *args: str, input: Optional[bytes] = None) -> bytes:  # noqa: A002
+    if input is None and os.name == "posix":
+        from .session import workspace_session
+
+        return workspace_session(repo_path).git(*args).stdout
+
+    from .cancellation import run_process
+
+    completed = run_process(["git", *args], cwd=str(repo_path), capture_output=True, check=True, input=input)
+    return completed.stdout
+
+
+def _read_python_blobs(repo_path: str | Path, commit: str) -> Dict[str, bytes]:
+    """Contents of every ``.py`` file in ``commit``, read from the object store."""
+    entries = []
+    for record in _git(repo_path, "ls-tree", "-r", "-z", "--full-tree", commit).split(b"\0"):
+        if not record:
+            continue
+        meta, _, path = record.partition(b"\t")
+        _mode, kind, sha = meta.split()
+        if kind == b"blob" and path.endswith(b".py"):
+            entries.append((path.decode("utf-8", "surrogateescape"), sha))
+    if not entries:
+        return {}
+
+    output = _git(repo_path, "cat-file", "--batch", input=b"\n".join(sha for _path, sha in entries) + b"\n")
+    blobs: Dict[str, bytes] = {}
+    offset = 0
+    for path, _sha in entries:
+        header_end = output.index(b"\n", offset)
+        size = int(output[offset:header_end].split()[2])
+        blobs[path] = output[header_end + 1: header_end + 1 + size]
+        offset = header_end + 1 + size + 1
+    return blobs
+
+
+def build_index(repo_path: str | Path, commit: str) -> DependencyIndex:
+    """Parse every Python file of ``commit`` into a :class:`DependencyIndex`."""
+    blobs = _read_python_blobs(repo_path, commit)
+    modules: Dict[str, List[str]] = {}
+    for path in blobs:
+        for name in _module_names(path):
+            modules.setdefault(name, []).append(path)
+    conftests = {str(PurePosixPath(path).parent): path for path in blobs if PurePosixPath(path).name == "conftest.py"}
+
+    deps: Dict[str, List[str]] = {}
+    opaque = []
+    for path, source in blobs.items():
+        targets: Set[str] = set()
+        try:
+            for name in _imported_modules(source, path):
+                targets.update(modules.get(name, ()))
+        except (SyntaxError, ValueError):
+            opaque.append(path)
+        if is_test_file(path):
+            # pytest loads every conftest.py between the rootdir and the test.
+            for parent in PurePosixPath(path).parents:
+                if str(parent) in conftests:
+                    targets.add(conftests[str(parent)])
+        targets.discard(path)
+        deps[path] = sorted(targets)
+    return DependencyIndex(commit=commit, files=sorted(blobs), deps=deps, opaque=sorted(opaque))
+
+
+def load_index(repo_path: str | Path, commit: str) -> DependencyIndex:
+    """:func:`build_index`, cached in memory and under the git directory."""
+    commit = _git(repo_path, "rev-parse", "--verify", f"{commit}^{{commit}}").decode().strip()
+    key = (str(Path(repo_path).resolve()), commit)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    git_dir = Path(repo_path, _git(repo_path, "rev-parse", "--git-dir").decode().strip())
+    cache_file = git_dir / "lingxi" / f"test-index-{commit}.json"
+    index = None
+    if cache_file.exists():
+        try:
+            data = json.loads(cache_file.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION:
+                index = DependencyIndex.from_dict(data)
+        except (OSError, ValueError, KeyError):
+            LOGGER.warning("Ignoring unreadable test index %s", cache_file)
+    if index is None:
+        index = build_index(repo_path, commit)
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_file.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp.write_text(json.dumps(index.to_dict()), encoding="utf-8")
+            tmp.replace(cache_file)
+        except OSError as exc:
+            LOGGER.warning("Unable to cache test index in %s: %s", cache_file, exc)
+
+    with _cache_lock:
+        _cache[key] = index
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return index
+
+
+def changed_files(repo_path: str | Path, base: str, head: str) -> List[str]:
+    """Paths changed between two commits (both sides of renames)."""
+    output = _git(repo_path, "diff", "--name-only", "--no-renames", "-z", base, head)
+    return [path.decode("utf-8", "surrogateescape") for path in output.split(b"\0") if path]
+
+
+@dataclass
+class SelectedTests:
+    """Which tests to run; an empty ``tests`` list means the full suite."""
+
+    mode: str  # "selected" or "full"
+    tests: List[str]
+    changed_files: List[str]
+    reason: str
+
+    @classmethod
+    def full(cls, reason: str, changed: Optional[List[str]] = None) -> "SelectedTests":
+        return cls(mode="full", tests=[], changed_files=changed or [], reason=reason)
+
+
+def select_tests(repo_path: str | Path, base: Optional[str], head: Optional[str]) -> SelectedTests:
+    """Tests of ``base`` affected by the changes from ``base`` to ``head``."""
+    from .session import SessionClosed
+
+    if not base or not head or base == head:
+        return SelectedTests.full("no change to select tests for")
+    if not Path(repo_path, ".git").exists():
+        # Archive workspaces: git would walk up into an enclosing repository.
+        return SelectedTests.full("workspace has no git metadata")
+    try:
+        changed = changed_files(repo_path, base, head)
+        index = load_index(repo_path, base)
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, SessionClosed, OSError, ValueError) as exc:
+        return SelectedTests.full(f"unable to compute change set: {exc}")
+
+    known = set(index.files)
+    unindexed = [
+        path for path in changed
+        if not path.endswith(".py") and not _is_documentation(path)
+    ]
+    if unindexed:
+        return SelectedTests.full(f"non-Python files changed: {', '.join(unindexed[:5])}", changed)
+    tests = index.affected_tests(path for path in changed if path in known)
+    if not tests:
+        return SelectedTests.full("no test imports the changed files", changed)
+    return SelectedTests(
+        mode="selected",
+        tests=tests,
+        changed_files=changed,
+        reason=f"{len(tests)} of {len(index.tests)} test files import the changed files",
+    )
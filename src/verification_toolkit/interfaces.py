@@ -2,8 +2,9 @@
 
 from __future__ import annotations
 
+import inspect
 from dataclasses import dataclass
-from typing import Any, Dict, Protocol
+from typing import Any, Dict, Protocol, Union
 
 
 @dataclass(slots=True)
@@ -22,6 +23,25 @@ class VerificationAgent(Protocol):
         """Execute verification for the provided repository context."""
 
 
+class AsyncVerificationAgent(Protocol):
+    """Agent whose verification is a coroutine, awaited on the event loop.
+
+    Suited to agents that mostly wait on model APIs or subprocesses: no
+    thread is tied up while they wait.
+    """
+
+    async def run_verification(self, context: "RepositoryContext") -> EvaluationResult:
+        """Execute verification for the provided repository context."""
+
+
+AnyVerificationAgent = Union[VerificationAgent, AsyncVerificationAgent]
+
+
+def is_async_agent(agent: Any) -> bool:
+    """Whether ``agent`` (an instance or class) implements :class:`AsyncVerificationAgent`."""
+    return inspect.iscoroutinefunction(getattr(agent, "run_verification", None))
+
+
 class RepositoryContext(Protocol):
     """Minimal view of the repository state used during verification."""
 
@@ -0,0 +1,357 @@
+"""Persistent per-workspace processes: a shell and ``git cat-file``.
+
+Spawning ``git`` (or any command) from a large Python process for every
+small step adds up across a batch. A :class:`WorkspaceSession` keeps one
+long-lived ``sh`` per prepared workspace that runs commands sent over its
+stdin, with stdout and stderr framed by per-command markers, plus
+``git cat-file --batch``/``--batch-check`` processes for object reads.
+Sessions are respawned transparently if they die or their workspace is
+deleted and re-created at the same path, enforce per-command timeouts, and
+are killed together with their children when the current job is cancelled.
+
+Use :func:`workspace_session` to get the shared session for a path, and
+:func:`drop_session` before deleting or recloning a workspace.
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import re
+import selectors
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .cancellation import current_token, kill_process
+
+MAX_SESSIONS = int(os.environ.get("LINGXI_MAX_SESSIONS", "32"))
+
+
+class SessionClosed(RuntimeError):
+    """Raised when a session process exits while a command is running."""
+
+
+def _deadline(timeout: Optional[float]) -> Optional[float]:
+    return None if timeout is None else time.monotonic() + timeout
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+def _dir_identity(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+class _PipeReader:
+    """Buffered reads from a pipe with an overall deadline."""
+
+    def __init__(self, stream):
+        self.fd = stream.fileno()
+        self.buffer = bytearray()
+
+    def fill(self, deadline: Optional[float]) -> bool:
+        """Read whatever is available; False on EOF. Raises TimeoutError."""
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.fd, selectors.EVENT_READ)
+            if not selector.select(_remaining(deadline)):
+                raise TimeoutError
+        chunk = os.read(self.fd, 65536)
+        self.buffer += chunk
+        return bool(chunk)
+
+    def readline(self, deadline: Optional[float]) -> bytes:
+        while b"\n" not in self.buffer:
+            if not self.fill(deadline):
+                raise SessionClosed("process exited")
+        index = self.buffer.index(b"\n") + 1
+        line = bytes(self.buffer[:index])
+        del self.buffer[:index]
+        return line
+
+    def read_exact(self, size: int, deadline: Optional[float]) -> bytes:
+        while len(self.buffer) < size:
+            if not self.fill(deadline):
+                raise SessionClosed("process exited")
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+class _ManagedProcess:
+    """A long-lived child process that is restarted on demand.
+
+    The process keeps the working directory it was started in, so it is
+    restarted if ``cwd`` has since been replaced by a new directory.
+    """
+
+    def __init__(self, args, cwd: str, env: Optional[Dict[str, str]] = None, stderr: bool = True):
+        self.args = args
+        self.cwd = cwd
+        self.env = env
+        self.capture_stderr = stderr
+        self.process: Optional[subprocess.Popen] = None
+        self.identity: Optional[Tuple[int, int]] = None
+        self.lock = threading.Lock()
+        self.spawns = 0
+
+    def ensure(self) -> subprocess.Popen:
+        identity = _dir_identity(self.cwd)
+        if self.process is not None and identity != self.identity:
+            self.kill()  # the directory was deleted (and maybe re-created)
+        if self.process is None or self.process.poll() is not None:
+            self.process = subprocess.Popen(
+                self.args,
+                cwd=self.cwd,
+                env=self.env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE if self.capture_stderr else subprocess.DEVNULL,
+                start_new_session=os.name == "posix",
+            )
+            self.stdout = _PipeReader(self.process.stdout)
+            self.stderr = _PipeReader(self.process.stderr) if self.capture_stderr else None
+            self.identity = identity
+            self.spawns += 1
+        return self.process
+
+    def kill(self) -> None:
+        if self.process is not None:
+            kill_process(self.process)
+            self.process.wait()
+            for stream in (self.process.stdin, self.process.stdout, self.process.stderr):
+                if stream is not None:
+                    stream.close()
+            self.process = None
+
+    def close(self) -> None:
+        with self.lock:
+            self.kill()
+
+
+class ShellSession:
+    """A long-lived ``sh`` that runs one command at a time.
+
+    Each command runs in a subshell with stdin from ``/dev/null``, so a
+    syntax error, ``exit`` or ``cd`` cannot break the session or leak into
+    the next command.
+    """
+
+    def __init__(self, cwd: str | os.PathLike[str], env: Optional[Dict[str, str]] = None, shell: str = "/bin/sh"):
+        self._process = _ManagedProcess([shell], str(cwd), env)
+        self.commands = 0
+
+    @property
+    def spawns(self) -> int:
+        return self._process.spawns
+
+    def run(self, command: str, timeout: Optional[float] = None, check: bool = False) -> subprocess.CompletedProcess:
+        """Run ``command`` and return its exit status and captured output.
+
+        On timeout the session (and the command) is killed and
+        :class:`subprocess.TimeoutExpired` is raised; the next call starts a
+        fresh shell. The current job's cancellation token kills it as well.
+        """
+        marker = f"__lingxi_{uuid.uuid4().hex}__".encode()
+        script = (
+            f"( eval {shlex.quote(command)} ) </dev/null\n"
+            f"printf '\\n%s %d\\n' {marker.decode()} $?\n"
+            f"printf '\\n%s\\n' {marker.decode()} >&2\n"
+        ).encode()
+        end_out = re.compile(rb"\n" + re.escape(marker) + rb" (\d+)\n$")
+        end_err = b"\n" + marker + b"\n"
+        deadline = _deadline(timeout)
+        token = current_token()
+
+        with self._process.lock:
+            process = self._process.ensure()
+            tracked = token.track_process(process) if token is not None else nullcontext()
+            with tracked:
+                try:
+                    process.stdin.write(script)
+                    process.stdin.flush()
+                    out, err = self._process.stdout, self._process.stderr
+                    match = None
+                    while match is None or not err.buffer.endswith(end_err):
+                        self._read_either(out, err, deadline)
+                        match = match or end_out.search(out.buffer)
+                except TimeoutError:
+                    self._process.kill()
+                    raise subprocess.TimeoutExpired(command, timeout) from None
+                except (OSError, SessionClosed) as exc:
+                    self._process.kill()
+                    if token is not None:
+                        token.raise_if_cancelled()
+                    raise SessionClosed(f"shell exited while running {command!r}") from exc
+            returncode = int(match.group(1))
+            stdout = bytes(out.buffer[: match.start()])
+            stderr = bytes(err.buffer[: -len(end_err)])
+            out.buffer.clear()
+            err.buffer.clear()
+            self.commands += 1
+
+        completed = subprocess.CompletedProcess(command, returncode, stdout, stderr)
+        if check:
+            completed.check_returncode()
+        return completed
+
+    @staticmethod
+    def _read_either(out: _PipeReader, err: _PipeReader, deadline: Optional[float]) -> None:
+        with selectors.DefaultSelector() as selector:
+            selector.register(out.fd, selectors.EVENT_READ, out)
+            selector.register(err.fd, selectors.EVENT_READ, err)
+            ready = selector.select(_remaining(deadline))
+        if not ready:
+            raise TimeoutError
+        for key, _events in ready:
+            chunk = os.read(key.fd, 65536)
+            if not chunk:
+                raise SessionClosed("shell exited")
+            key.data.buffer += chunk
+
+    def close(self) -> None:
+        self._process.close()
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    sha: str
+    type: str
+    size: int
+
+
+class GitCatFile:
+    """Persistent ``git cat-file --batch`` / ``--batch-check`` readers."""
+
+    def __init__(self, repo_path: str | os.PathLike[str]):
+        self._batch = _ManagedProcess(["git", "cat-file", "--batch"], str(repo_path), stderr=False)
+        self._check = _ManagedProcess(["git", "cat-file", "--batch-check"], str(repo_path), stderr=False)
+
+    @staticmethod
+    def _header(line: bytes) -> Optional[ObjectInfo]:
+        parts = line.split()
+        if len(parts) != 3:  # "<rev> missing" / "<rev> ambiguous"
+            return None
+        return ObjectInfo(parts[0].decode(), parts[1].decode(), int(parts[2]))
+
+    def _request(self, managed: _ManagedProcess, rev: str, timeout: Optional[float], body: bool):
+        if "\n" in rev:
+            raise ValueError(f"Invalid revision: {rev!r}")
+        deadline = _deadline(timeout)
+        with managed.lock:
+            process = managed.ensure()
+            try:
+                process.stdin.write(rev.encode() + b"\n")
+                process.stdin.flush()
+                info = self._header(managed.stdout.readline(deadline))
+                data = None
+                if body and info is not None:
+                    data = managed.stdout.read_exact(info.size + 1, deadline)[:-1]
+            except TimeoutError:
+                managed.kill()
+                raise subprocess.TimeoutExpired(managed.args, timeout) from None
+            except (OSError, SessionClosed) as exc:
+                managed.kill()
+                raise SessionClosed(f"git cat-file exited while reading {rev!r}") from exc
+        return info, data
+
+    def info(self, rev: str, timeout: Optional[float] = None) -> Optional[ObjectInfo]:
+        """Type and size of ``rev``, or None if it does not exist."""
+        return self._request(self._check, rev, timeout, body=False)[0]
+
+    def read(self, rev: str, timeout: Optional[float] = None) -> Optional[Tuple[ObjectInfo, bytes]]:
+        """Info and contents of ``rev``, or None if it does not exist."""
+        info, data = self._request(self._batch, rev, timeout, body=True)
+        return None if info is None else (info, data)
+
+    @property
+    def spawns(self) -> int:
+        return self._batch.spawns + self._check.spawns
+
+    def close(self) -> None:
+        self._batch.close()
+        self._check.close()
+
+
+class WorkspaceSession:
+    """The shell and object readers kept open for one workspace."""
+
+    def __init__(self, path: str | os.PathLike[str]):
+        self.path = Path(path)
+        self.shell = ShellSession(self.path)
+        self._objects: Optional[GitCatFile] = None
+        self._lock = threading.Lock()
+
+    @property
+    def objects(self) -> GitCatFile:
+        with self._lock:
+            if self._objects is None:
+                self._objects = GitCatFile(self.path)
+            return self._objects
+
+    def git(self, *args: str, timeout: Optional[float] = None, check: bool = True) -> subprocess.CompletedProcess:
+        """Run ``git <args>`` through the session's shell."""
+        return self.shell.run(shlex.join(["git", *args]), timeout=timeout, check=check)
+
+    def close(self) -> None:
+        self.shell.close()
+        if self._objects is not None:
+            self._objects.close()
+
+
+_sessions: "OrderedDict[str, WorkspaceSession]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def workspace_session(path: str | os.PathLike[str]) -> WorkspaceSession:
+    """The shared session for ``path``; the least recently used beyond
+    ``LINGXI_MAX_SESSIONS`` are closed."""
+    key = str(Path(path).resolve())
+    evicted = []
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = _sessions[key] = WorkspaceSession(key)
+        _sessions.move_to_end(key)
+        while len(_sessions) > MAX_SESSIONS:
+            evicted.append(_sessions.popitem(last=False)[1])
+    for old in evicted:
+        old.close()
+    return session
+
+
+def drop_session(path: str | os.PathLike[str]) -> None:
+    """Close the sessions for ``path`` and any workspace below it.
+
+    Call before deleting or recloning a workspace.
+    """
+    root = Path(path).resolve()
+    with _sessions_lock:
+        keys = [key for key in _sessions if Path(key) == root or root in Path(key).parents]
+        dropped = [_sessions.pop(key) for key in keys]
+    for session in dropped:
+        session.close()
+
+
+def close_sessions() -> None:
+    """Close every workspace session (also done at interpreter exit)."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+atexit.register(close_sessions)
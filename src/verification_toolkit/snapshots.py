@@ -0,0 +1,220 @@
+"""Immutable snapshots of prepared workspaces, cloned cheaply.
+
+A :class:`SnapshotStore` captures a workspace produced by
+:class:`~verification_toolkit.github.GitHubIssuePreparer` (checked-out tree,
+``.git`` and the context, including its dependency environment) as a
+template, and hands out private copies of it without running git again:
+
+* ``reflink`` -- ``cp --reflink=always``: copy-on-write clones, on
+  filesystems that support them (btrfs, XFS, ...).
+* ``hardlink`` -- the working tree and git metadata are copied, and only
+  ``.git/objects`` (immutable, and most of a clone's size) is hard-linked
+  to the template, so every clone can be modified freely.
+
+The mode is picked when a snapshot is captured. Dependency environments are
+referenced, not copied: they are already shared read-only by
+:class:`~verification_toolkit.batch_workflow.environments.EnvironmentCache`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import subprocess
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+from typing import List, Optional
+
+from .github import DEFAULT_RUNTIME_DIR, GitHubIssueContext
+from .session import drop_session
+
+LOGGER = logging.getLogger(__name__)
+DEFAULT_SNAPSHOT_DIR = Path(os.environ.get("LINGXI_SNAPSHOT_DIR", DEFAULT_RUNTIME_DIR.parent / "snapshots"))
+META = "snapshot.json"
+_WRITE_BITS = stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH
+
+
+def _reflink_copy(source: Path, dest: Path) -> bool:
+    """Copy-on-write copy of ``source`` to ``dest``; False where unsupported."""
+    if os.name != "posix":  # pragma: no cover - GNU cp only
+        return False
+    try:
+        completed = subprocess.run(
+            ["cp", "-a", "--reflink=always", str(source), str(dest)], capture_output=True
+        )
+    except OSError:
+        return False
+    if completed.returncode != 0:
+        shutil.rmtree(dest, ignore_errors=True)
+        return False
+    return True
+
+
+def _is_git_object(relative: Path) -> bool:
+    return relative.parts[:2] == (".git", "objects")
+
+
+def _link_farm(source: Path, dest: Path) -> None:
+    """Copy ``source`` to ``dest``, hard-linking only its git objects."""
+    for dirpath, dirnames, filenames in os.walk(source):
+        relative = Path(dirpath).relative_to(source)
+        target_dir = dest / relative
+        target_dir.mkdir(parents=True, exist_ok=True)
+        for name in dirnames + filenames:
+            src = Path(dirpath, name)
+            if src.is_symlink():
+                os.symlink(os.readlink(src), target_dir / name)
+                if name in dirnames:
+                    dirnames.remove(name)  # don't descend into linked directories
+            elif name in filenames:
+                if _is_git_object(relative / name):
+                    os.link(src, target_dir / name)
+                else:
+                    shutil.copy2(src, target_dir / name)
+
+
+def _freeze(tree: Path) -> None:
+    """Drop write permission from every file under ``tree`` (directories stay writable)."""
+    for dirpath, _dirnames, filenames in os.walk(tree):
+        for name in filenames:
+            path = Path(dirpath, name)
+            if not path.is_symlink():
+                path.chmod(path.stat().st_mode & ~_WRITE_BITS)
+
+
+def make_private(path: str | os.PathLike[str]) -> None:
+    """Give a hard-linked (or read-only) file its own writable copy."""
+    path = Path(path)
+    info = path.lstat()
+    if not stat.S_ISREG(info.st_mode) or (info.st_nlink == 1 and info.st_mode & stat.S_IWUSR):
+        return
+    tmp = path.with_name(f".{path.name}.private-{os.getpid()}-{threading.get_ident()}")
+    shutil.copyfile(path, tmp)
+    tmp.chmod(stat.S_IMODE(info.st_mode) | stat.S_IWUSR)
+    tmp.replace(path)
+
+
+class SnapshotStore:
+    """Captures prepared workspaces and clones them into new directories.
+
+    Snapshots are keyed by issue URL (see :meth:`key`) and evicted least
+    recently used beyond ``max_entries``, sparing those cloned within the
+    last ``min_idle`` seconds.
+    """
+
+    def __init__(
+        self,
+        root: str | os.PathLike[str] | None = None,
+        max_entries: int = 16,
+        min_idle: float = 3600.0,
+        mode: Optional[str] = None,
+    ):
+        self.root = Path(root) if root else DEFAULT_SNAPSHOT_DIR
+        self.max_entries = max_entries
+        self.min_idle = min_idle
+        # "reflink" or "hardlink"; None picks reflink where supported.
+        self.mode = mode
+
+    @staticmethod
+    def key(issue_url: str, checkout_parent: bool = True) -> str:
+        return hashlib.blake2b(f"{issue_url}\0{checkout_parent}".encode(), digest_size=16).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """The snapshot's metadata, or None if there is no complete snapshot."""
+        try:
+            return json.loads((self.root / key / META).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def capture(self, key: str, context: GitHubIssueContext) -> Path:
+        """Store ``context.repo_path`` as the template for ``key``.
+
+        The workspace is copied (with reflinks where possible), so it may be
+        reused freely afterwards. An existing snapshot for ``key`` is kept.
+        """
+        snapshot_dir = self.root / key
+        if (snapshot_dir / META).exists():
+            return snapshot_dir
+        self.root.mkdir(parents=True, exist_ok=True)
+        partial = self.root / f".{key}.partial-{os.getpid()}-{threading.get_ident()}"
+        start = time.monotonic()
+        try:
+            partial.mkdir()
+            mode = self.mode
+            if mode != "hardlink" and _reflink_copy(Path(context.repo_path), partial / "tree"):
+                mode = "reflink"
+            elif mode == "reflink":
+                raise OSError(f"{self.root} does not support reflinks")
+            else:
+                mode = "hardlink"
+                shutil.copytree(context.repo_path, partial / "tree", symlinks=True)
+                # Objects are shared by every clone; keep them immutable.
+                if (partial / "tree" / ".git" / "objects").is_dir():
+                    _freeze(partial / "tree" / ".git" / "objects")
+            (partial / META).write_text(json.dumps({
+                "mode": mode,
+                "context": asdict(context),
+                "capture_seconds": time.monotonic() - start,
+            }, indent=2), encoding="utf-8")
+            try:
+                partial.rename(snapshot_dir)
+            except OSError:
+                # Another worker captured the same key first.
+                if not (snapshot_dir / META).exists():
+                    raise
+        finally:
+            if partial.exists():
+                shutil.rmtree(partial, ignore_errors=True)
+        LOGGER.info("Captured snapshot %s of %s", key, context.repo_path)
+        self.evict()
+        return snapshot_dir
+
+    def clone(self, key: str, dest: str | os.PathLike[str]) -> Optional[GitHubIssueContext]:
+        """Materialise the snapshot for ``key`` at ``dest`` (replacing it).
+
+        Returns the snapshot's context pointing at ``dest``, or None when
+        there is no snapshot for ``key``.
+        """
+        meta = self.get(key)
+        if meta is None:
+            return None
+        dest = Path(dest)
+        if dest.exists() or dest.is_symlink():
+            drop_session(dest)
+            shutil.rmtree(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tree = self.root / key / "tree"
+        if meta["mode"] != "reflink" or not _reflink_copy(tree, dest):
+            _link_farm(tree, dest)
+        os.utime(self.root / key / META)
+        return GitHubIssueContext(**{**meta["context"], "repo_path": str(dest)})
+
+    def entries(self) -> List[Path]:
+        """Complete snapshots, least recently used first."""
+        if not self.root.exists():
+            return []
+        snapshots = [path for path in self.root.iterdir() if (path / META).exists()]
+        return sorted(snapshots, key=lambda path: (path / META).stat().st_mtime)
+
+    def evict(self) -> List[Path]:
+        """Remove least recently used snapshots beyond ``max_entries``."""
+        snapshots = self.entries()
+        now = time.time()
+        evicted = []
+        for snapshot_dir in snapshots[: max(0, len(snapshots) - self.max_entries)]:
+            if now - (snapshot_dir / META).stat().st_mtime < self.min_idle:
+                continue
+            trash = snapshot_dir.with_name(f".{snapshot_dir.name}.evicted-{os.getpid()}")
+            try:
+                snapshot_dir.rename(trash)
+            except OSError:
+                continue
+            shutil.rmtree(trash, ignore_errors=True)
+            evicted.append(snapshot_dir)
+        return evicted
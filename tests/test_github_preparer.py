@@ -0,0 +1,152 @@
+import os
+import shutil
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = PROJECT_ROOT / "src"
+for path in (SRC_PATH, PROJECT_ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+from benchmarks.fixtures import RepoSpec, make_repo
+from benchmarks.stub_github import StubGitHubConfig, StubGitHubServer
+from verification_toolkit.github import GitHubIssuePreparer
+
+
+@pytest.fixture()
+def fixture_repo(tmp_path):
+    return make_repo(tmp_path / "fixtures", RepoSpec(owner="octo", project="demo", files=10, commits=5))
+
+
+def _preparer(tmp_path, server):
+    return GitHubIssuePreparer(
+        runtime_dir=tmp_path / "runtime",
+        git_base_url=(tmp_path / "fixtures").as_uri(),
+        api_base_url=server.url,
+    )
+
+
+def test_prepare_against_local_fixtures(tmp_path, fixture_repo):
+    closing = fixture_repo.issues[3]
+    with StubGitHubServer() as server:
+        server.add_issue("octo", "demo", 3, "Broken thing", closing)
+        context = _preparer(tmp_path, server).prepare(fixture_repo.issue_url(3))
+
+    assert context.issue_description == "Broken thing"
+    assert context.closing_commit == closing
+    assert context.current_commit == fixture_repo.commits[2]
+    head = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=context.repo_path, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    assert head == context.current_commit
+
+
+def test_prepare_degrades_when_rate_limited(tmp_path, fixture_repo):
+    with StubGitHubServer(StubGitHubConfig(rate_limit=0)) as server:
+        server.add_issue("octo", "demo", 1, "Unreachable", fixture_repo.issues[1])
+        context = _preparer(tmp_path, server).prepare(fixture_repo.issue_url(1))
+        assert server.stats.rate_limited == 2
+
+    assert context.issue_description is None
+    assert context.closing_commit is None
+    assert context.current_commit == fixture_repo.commits[-1]
+
+
+def test_private_workspace_borrows_objects_from_reference(tmp_path, fixture_repo):
+    with StubGitHubServer() as server:
+        server.add_issue("octo", "demo", 2, "Body", fixture_repo.issues[2])
+        shared = _preparer(tmp_path, server)
+        shared.prepare(fixture_repo.issue_url(2))
+        private = GitHubIssuePreparer(
+            runtime_dir=tmp_path / "private",
+            git_base_url=(tmp_path / "fixtures").as_uri(),
+            api_base_url=server.url,
+            reference_dir=shared.runtime_dir,
+        )
+        context = private.prepare(fixture_repo.issue_url(2))
+
+    assert context.repo_path == str(tmp_path / "private" / "octo" / "demo")
+    assert context.current_commit == fixture_repo.commits[1]
+    # --dissociate copies borrowed objects, so the workspace stands alone.
+    assert not (Path(context.repo_path) / ".git" / "objects" / "info" / "alternates").exists()
+
+
+def test_metadata_cache_skips_repeat_api_calls(tmp_path, fixture_repo):
+    with StubGitHubServer() as server:
+        server.add_issue("octo", "demo", 4, "Cached", fixture_repo.issues[4])
+        preparer = GitHubIssuePreparer(
+            runtime_dir=tmp_path / "runtime",
+            git_base_url=(tmp_path / "fixtures").as_uri(),
+            api_base_url=server.url,
+            cache_metadata=True,
+        )
+        first = preparer.prepare(fixture_repo.issue_url(4))
+        second = preparer.prepare(fixture_repo.issue_url(4))
+        assert server.stats.requests == 2
+
+    assert first == second
+
+
+def test_archive_mode_streams_the_commit_tarball(tmp_path, fixture_repo):
+    with StubGitHubServer() as server:
+        server.add_issue("octo", "demo", 3, "Broken thing", fixture_repo.issues[3])
+        server.add_repository("octo", "demo", fixture_repo.path)
+        preparer = _preparer(tmp_path, server)
+        context = preparer.prepare(fixture_repo.issue_url(3), archive=True)
+        again = preparer.prepare(fixture_repo.issue_url(3), archive=True)
+        assert server.stats.tarballs == 1
+
+    assert context == again
+    assert context.current_commit == fixture_repo.commits[2]
+    repo_path = Path(context.repo_path)
+    assert repo_path == tmp_path / "runtime" / "archives" / context.current_commit
+    assert not (repo_path / ".git").exists()
+    assert not (tmp_path / "runtime" / "octo").exists()  # no clone
+    expected = subprocess.run(
+        ["git", "ls-tree", "-r", "--name-only", context.current_commit],
+        cwd=fixture_repo.path, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    files = sorted(p.relative_to(repo_path).as_posix() for p in repo_path.rglob("*") if p.is_file())
+    assert files == sorted(expected)
+    assert all(not p.stat().st_mode & 0o222 for p in repo_path.rglob("*") if p.is_file())
+
+
+def test_job_timeout_kills_a_hung_clone(tmp_path, fixture_repo, monkeypatch):
+    from verification_toolkit.batch_workflow.cancellation import JobTimeoutError
+    from verification_toolkit.batch_workflow.config import JobConfig
+    from verification_toolkit.batch_workflow.executor import JobExecutor
+
+    # A `git` whose clone hangs, recording its PID; other commands are real.
+    real_git = shutil.which("git")
+    pid_file = tmp_path / "clone.pid"
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    fake_git = bin_dir / "git"
+    fake_git.write_text(
+        f'#!/bin/sh\nif [ "$1" = clone ]; then echo $$ > {pid_file}; exec sleep 60; fi\nexec {real_git} "$@"\n'
+    )
+    fake_git.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+
+    with StubGitHubServer() as server:
+        server.add_issue("octo", "demo", 1, "Hangs", fixture_repo.issues[1])
+        preparer = _preparer(tmp_path, server)
+        provider = Mock()
+        provider.prepare_context = lambda job_config: preparer.prepare(job_config.issue_url)
+        job = JobConfig(id="hung", type="github", agent="demo", issue_url=fixture_repo.issue_url(1), timeout=0.5)
+        executor = JobExecutor(job, context_provider=provider, agent=Mock())
+        start = time.monotonic()
+        with pytest.raises(JobTimeoutError):
+            executor.execute_sync()
+
+    assert time.monotonic() - start < 10
+    pid = int(pid_file.read_text())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
+    assert not (tmp_path / "runtime" / "octo" / "demo").exists()
@@ -0,0 +1,143 @@
+import shlex
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from verification_toolkit.demo_agent import DemoVerificationAgent, collected_test_files
+from verification_toolkit.impact import build_index, load_index, select_tests
+from verification_toolkit.session import SessionClosed
+
+FILES = {
+    "src/pkg/__init__.py": "",
+    "src/pkg/util.py": "def double(x):\n    return 2 * x\n",
+    "src/pkg/core.py": "from .util import double\n\ndef quad(x):\n    return double(double(x))\n",
+    "src/pkg/other.py": "VALUE = 1\n",
+    "src/pkg/unused.py": "UNUSED = 1\n",
+    "tests/conftest.py": "import pathlib, sys\nsys.path.insert(0, str(pathlib.Path(__file__).parents[1] / 'src'))\n",
+    "tests/test_core.py": "from pkg import core\n\ndef test_quad():\n    assert core.quad(1) == 4\n",
+    "tests/test_other.py": "from pkg.other import VALUE\n\ndef test_value():\n    assert VALUE == 1\n",
+    "tests/unit/test_util.py": "import pkg.util\n\ndef test_double():\n    assert pkg.util.double(2) == 4\n",
+    "README.md": "demo\n",
+    "setup.cfg": "[metadata]\nname = pkg\n",
+}
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=repo, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+def _commit(repo, changes):
+    for path, content in changes.items():
+        target = repo / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content)
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "change")
+    return _git(repo, "rev-parse", "HEAD")
+
+
+@pytest.fixture()
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    path.mkdir()
+    _git(path, "init", "-q")
+    base = _commit(path, FILES)
+    return path, base
+
+
+def test_index_follows_relative_and_absolute_imports(repo):
+    path, base = repo
+    index = build_index(path, base)
+    assert index.deps["src/pkg/core.py"] == ["src/pkg/__init__.py", "src/pkg/util.py"]
+    assert "tests/conftest.py" in index.deps["tests/unit/test_util.py"]
+    assert set(index.tests) == {"tests/test_core.py", "tests/test_other.py", "tests/unit/test_util.py"}
+
+
+def test_selects_tests_reaching_the_change(repo):
+    path, base = repo
+    head = _commit(path, {"src/pkg/util.py": "def double(x):\n    return x + x\n", "README.md": "docs\n"})
+    selection = select_tests(path, base, head)
+    assert selection.mode == "selected"
+    assert selection.tests == ["tests/test_core.py", "tests/unit/test_util.py"]
+    # The index was cached under the git directory for the next job.
+    assert (path / ".git" / "lingxi" / f"test-index-{base}.json").exists()
+    assert load_index(path, base) is load_index(path, base)
+
+
+@pytest.mark.parametrize("changes, reason", [
+    ({"setup.cfg": "[metadata]\nname = other\n"}, "non-Python files changed"),
+    ({"src/pkg/unused.py": "UNUSED = 2\n"}, "no test imports"),
+])
+def test_falls_back_to_full_suite(repo, changes, reason):
+    path, base = repo
+    selection = select_tests(path, base, _commit(path, changes))
+    assert selection.mode == "full" and selection.tests == []
+    assert reason in selection.reason
+
+
+def test_falls_back_when_git_is_unavailable(repo, tmp_path):
+    path, base = repo
+    head = _commit(path, {"src/pkg/other.py": "VALUE = 2\n"})
+    # An archive workspace inside another repository must not use that one.
+    archive = path / "archives" / "abc"
+    archive.mkdir(parents=True)
+    assert "no git metadata" in select_tests(archive, base, head).reason
+    with patch("verification_toolkit.impact.changed_files", side_effect=SessionClosed("shell exited")):
+        assert select_tests(path, base, head).mode == "full"
+    with patch("verification_toolkit.impact.changed_files", side_effect=subprocess.TimeoutExpired("git", 1)):
+        assert select_tests(path, base, head).mode == "full"
+
+
+def test_conftest_change_selects_tests_below_it(repo):
+    path, base = repo
+    head = _commit(path, {"tests/conftest.py": FILES["tests/conftest.py"] + "# tweak\n"})
+    assert len(select_tests(path, base, head).tests) == 3
+
+
+def test_demo_agent_runs_only_selected_tests(repo):
+    path, base = repo
+    head = _commit(path, {"src/pkg/other.py": "VALUE = 1  # touched\n"})
+    _git(path, "checkout", "-q", base)
+    agent = DemoVerificationAgent(
+        run_tests=True, command=f"{shlex.quote(sys.executable)} -m pytest -q -p no:cacheprovider"
+    )
+    context = SimpleNamespace(
+        owner="o", project="p", issue_number="1", repo_path=str(path),
+        current_commit=base, closing_commit=head, issue_description=None,
+    )
+    result = agent.run_verification(context)
+    assert result.success, result.details
+    assert result.artifacts["selected_tests"] == ["tests/test_other.py"]
+    assert "1 passed" in result.details
+
+
+def test_demo_agent_shards_only_what_pytest_collects(repo):
+    path, _base = repo
+    commit = _commit(path, {
+        "setup.cfg": "[metadata]\nname = pkg\n\n[tool:pytest]\ntestpaths = tests\nnorecursedirs = unit\n",
+        "tests/unit/test_util.py": "def test_skipped_by_norecursedirs():\n    assert False\n",
+        "scripts/test_outside.py": "def test_outside_testpaths():\n    assert False\n",
+    })
+    command = f"{shlex.quote(sys.executable)} -m pytest -q -p no:cacheprovider"
+    assert collected_test_files(shlex.split(command), path) == ["tests/test_core.py", "tests/test_other.py"]
+    assert collected_test_files(["make", "test"], path) == []
+
+    agent = DemoVerificationAgent(run_tests=True, select_tests=False, shards=2, command=command)
+    context = SimpleNamespace(
+        owner="o", project="p", issue_number="1", repo_path=str(path),
+        current_commit=commit, closing_commit=None, issue_description=None,
+    )
+    result = agent.run_verification(context)
+    assert result.success, result.details
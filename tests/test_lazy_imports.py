@@ -0,0 +1,96 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = PROJECT_ROOT / "src"
+
+HEAVY_MODULES = ["requests", "git", "yaml", "http.server"]
+# Loaded only when a runbook enables the feature.
+OPTIONAL_MODULES = [
+    "verification_toolkit.batch_workflow.metrics",
+    "verification_toolkit.batch_workflow.ordering",
+    "verification_toolkit.batch_workflow.environments",
+    "verification_toolkit.batch_workflow.context.swebench",
+    "verification_toolkit.snapshots",
+]
+
+
+def _loaded_after(statement: str, modules: list[str] = HEAVY_MODULES) -> dict[str, bool]:
+    code = (
+        "import json, sys\n"
+        f"sys.path.insert(0, {str(SRC_PATH)!r})\n"
+        f"{statement}\n"
+        f"print(json.dumps({{m: m in sys.modules for m in {modules!r}}}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output)
+
+
+def test_package_import_is_lazy():
+    loaded = _loaded_after("import verification_toolkit")
+    assert loaded == {name: False for name in HEAVY_MODULES}
+
+
+def test_batch_workflow_import_is_lazy():
+    loaded = _loaded_after("import verification_toolkit.batch_workflow")
+    assert loaded == {name: False for name in HEAVY_MODULES}
+
+
+def test_runner_import_does_not_load_network_stack():
+    loaded = _loaded_after("from verification_toolkit.batch_workflow import BatchRunner")
+    assert loaded == {name: False for name in HEAVY_MODULES}
+
+
+def test_runner_imports_optional_features_when_enabled():
+    loaded = _loaded_after("import verification_toolkit.batch_workflow.runner", OPTIONAL_MODULES)
+    assert loaded == {name: False for name in OPTIONAL_MODULES}
+    loaded = _loaded_after(
+        "from verification_toolkit.batch_workflow.config import Runbook\n"
+        "from verification_toolkit.batch_workflow.runner import BatchRunner\n"
+        "BatchRunner(Runbook(name='x', jobs=[], environments=True, snapshots=True, order='longest-first'))",
+        OPTIONAL_MODULES,
+    )
+    assert loaded == {
+        **{name: True for name in OPTIONAL_MODULES},
+        "verification_toolkit.batch_workflow.metrics": False,
+        "verification_toolkit.batch_workflow.context.swebench": False,
+    }
+
+
+def test_lazy_attributes_resolve():
+    sys.path.insert(0, str(SRC_PATH))
+    import verification_toolkit
+    from verification_toolkit import batch_workflow
+    from verification_toolkit.github import GitHubIssuePreparer
+
+    assert verification_toolkit.GitHubIssuePreparer is GitHubIssuePreparer
+    assert verification_toolkit.batch_workflow is batch_workflow
+    assert "BatchRunner" in dir(batch_workflow)
+    try:
+        verification_toolkit.does_not_exist
+    except AttributeError:
+        pass
+    else:  # pragma: no cover - failure path
+        raise AssertionError("unknown attribute should raise AttributeError")
+
+
+def test_preparer_construction_does_not_touch_filesystem(tmp_path):
+    sys.path.insert(0, str(SRC_PATH))
+    from verification_toolkit.github import GitHubIssuePreparer
+
+    runtime_dir = tmp_path / "runtime"
+    preparer = GitHubIssuePreparer(runtime_dir=runtime_dir)
+    assert preparer.runtime_dir == runtime_dir
+    assert not runtime_dir.exists()
+
+
+def test_core_modules_do_not_import_batch_workflow():
+    loaded = _loaded_after(
+        "import verification_toolkit.session, verification_toolkit.github, verification_toolkit.impact",
+        ["verification_toolkit.batch_workflow"],
+    )
+    assert loaded == {"verification_toolkit.batch_workflow": False}
@@ -0,0 +1,118 @@
+import shutil
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from verification_toolkit.cancellation import CancellationToken, JobCancelled, use_token
+from verification_toolkit.session import GitCatFile, ShellSession, close_sessions, drop_session, workspace_session
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="sessions use a POSIX shell")
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=repo, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture()
+def session(tmp_path):
+    shell = ShellSession(tmp_path)
+    yield shell
+    shell.close()
+
+
+def test_output_is_framed_per_command(session):
+    first = session.run("printf 'no newline'; printf 'err' >&2; exit 3")
+    assert (first.returncode, first.stdout, first.stderr) == (3, b"no newline", b"err")
+    second = session.run("echo ok")
+    assert (second.returncode, second.stdout, second.stderr) == (0, b"ok\n", b"")
+    assert session.run("if then").returncode != 0  # syntax errors don't kill the shell
+    assert session.run("cd / && pwd").stdout == b"/\n"
+    assert session.run("pwd").stdout != b"/\n"  # nor does state leak between commands
+    assert session.spawns == 1 and session.commands == 5
+
+
+def test_check_raises_called_process_error(session):
+    with pytest.raises(subprocess.CalledProcessError):
+        session.run("false", check=True)
+
+
+def test_timeout_kills_and_next_command_respawns(session):
+    with pytest.raises(subprocess.TimeoutExpired):
+        session.run("sleep 30", timeout=0.3)
+    assert session.run("echo back").stdout == b"back\n"
+    assert session.spawns == 2
+
+
+def test_cancelling_the_job_kills_the_command(session):
+    token = CancellationToken()
+    threading.Timer(0.3, token.cancel).start()
+    with use_token(token), pytest.raises(JobCancelled):
+        session.run("sleep 30")
+    assert session.run("echo back").returncode == 0
+
+
+def test_cat_file_reads_objects_over_one_process(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "a.txt").write_bytes(b"line\n\x00binary")
+    _git(tmp_path, "add", "a.txt")
+    _git(tmp_path, "commit", "-q", "-m", "c")
+    objects = GitCatFile(tmp_path)
+    try:
+        info, data = objects.read("HEAD:a.txt")
+        assert (info.type, info.size, data) == ("blob", 12, b"line\n\x00binary")
+        assert objects.info("HEAD").type == "commit"
+        assert objects.info("HEAD:missing.txt") is None
+        assert objects.read("HEAD:a.txt")[1] == data
+        assert objects.spawns == 2
+    finally:
+        objects.close()
+
+
+def test_workspace_sessions_are_shared_per_path(tmp_path):
+    _git(tmp_path, "init", "-q")
+    try:
+        session = workspace_session(tmp_path)
+        assert workspace_session(tmp_path / ".") is session
+        assert session.git("rev-parse", "--is-inside-work-tree").stdout == b"true\n"
+    finally:
+        close_sessions()
+
+
+def test_recreated_workspace_gets_fresh_processes(tmp_path):
+    repo = tmp_path / "repo"
+
+    def recreate():
+        if repo.exists():
+            shutil.rmtree(repo)
+        repo.mkdir()
+        _git(repo, "init", "-q")
+        (repo / "a.txt").write_text("a\n")
+        _git(repo, "add", "a.txt")
+        _git(repo, "commit", "-q", "-m", "c")
+
+    try:
+        recreate()
+        session = workspace_session(repo)
+        assert session.git("status", "--porcelain").returncode == 0
+        assert session.objects.info("HEAD:a.txt").type == "blob"
+
+        recreate()  # same path, new directory: processes are respawned
+        assert workspace_session(repo).git("status", "--porcelain").returncode == 0
+        assert session.objects.info("HEAD:a.txt").type == "blob"
+        assert session.shell.spawns == 2
+
+        drop_session(tmp_path)  # sessions below a deleted directory are closed
+        assert workspace_session(repo) is not session
+    finally:
+        close_sessions()
@@ -0,0 +1,110 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+SRC_PATH = PROJECT_ROOT / "src"
+if str(SRC_PATH) not in sys.path:
+    sys.path.insert(0, str(SRC_PATH))
+
+from verification_toolkit import GitHubIssueContext
+from verification_toolkit.batch_workflow.context.github import GitHubContextProvider
+from verification_toolkit.snapshots import SnapshotStore, make_private
+
+ISSUE_URL = "https://github.com/o/p/issues/1"
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args],
+        cwd=repo, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+@pytest.fixture()
+def context(tmp_path):
+    repo = tmp_path / "workspace"
+    (repo / "pkg").mkdir(parents=True)
+    (repo / "pkg" / "mod.py").write_text("VALUE = 1\n")
+    (repo / "link.py").symlink_to("pkg/mod.py")
+    _git(repo, "init", "-q")
+    _git(repo, "add", "-A")
+    _git(repo, "commit", "-q", "-m", "c")
+    return GitHubIssueContext(
+        issue_url=ISSUE_URL, owner="o", project="p", issue_number="1", repo_path=str(repo),
+        current_commit=_git(repo, "rev-parse", "HEAD"), closing_commit=None, issue_description="d",
+        environment_path="/envs/abc",
+    )
+
+
+def _objects(tree):
+    return sorted(p for p in (tree / ".git" / "objects").rglob("*") if p.is_file())
+
+
+def test_hardlink_clones_share_only_git_objects(tmp_path, context):
+    store = SnapshotStore(tmp_path / "snapshots", mode="hardlink")
+    key = store.key(ISSUE_URL)
+    store.capture(key, context)
+    (Path(context.repo_path) / "pkg" / "mod.py").write_text("VALUE = 2\n")  # the workspace moves on
+
+    clone = store.clone(key, tmp_path / "clone")
+    other = store.clone(key, tmp_path / "other")
+    assert clone.repo_path == str(tmp_path / "clone")
+    assert (clone.current_commit, clone.environment_path) == (context.current_commit, "/envs/abc")
+    template_tree = store.root / key / "tree"
+    mod = tmp_path / "clone" / "pkg" / "mod.py"
+    assert mod.read_text() == "VALUE = 1\n"
+    assert not os.path.samefile(mod, template_tree / "pkg" / "mod.py")
+    assert all(os.path.samefile(a, b) for a, b in zip(_objects(tmp_path / "clone"), _objects(template_tree)))
+    assert (tmp_path / "clone" / "link.py").is_symlink()
+    assert _git(tmp_path / "clone", "status", "--porcelain") == ""
+
+    # In-place edits (which root could make even to read-only files) stay private.
+    with open(mod, "w") as f:
+        f.write("agent edit\n")
+    assert (template_tree / "pkg" / "mod.py").read_text() == "VALUE = 1\n"
+    assert (Path(other.repo_path) / "pkg" / "mod.py").read_text() == "VALUE = 1\n"
+    _git(tmp_path / "clone", "checkout", "--", "pkg/mod.py")
+    assert mod.read_text() == "VALUE = 1\n"
+
+    make_private(mod)  # a no-op on a private file
+    assert mod.read_text() == "VALUE = 1\n"
+
+    assert store.clone(key, tmp_path / "clone").repo_path == clone.repo_path  # replaces the old copy
+    assert store.clone(store.key("https://github.com/o/p/issues/2"), tmp_path / "other") is None
+
+
+def test_default_mode_picks_a_working_strategy(tmp_path, context):
+    store = SnapshotStore(tmp_path / "snapshots")
+    key = store.key(ISSUE_URL)
+    store.capture(key, context)
+    assert store.get(key)["mode"] in ("reflink", "hardlink")
+    clone = store.clone(key, tmp_path / "clone")
+    assert (Path(clone.repo_path) / "pkg" / "mod.py").read_text() == "VALUE = 1\n"
+
+
+def test_eviction_keeps_recently_cloned(tmp_path, context):
+    store = SnapshotStore(tmp_path / "snapshots", mode="hardlink", max_entries=1, min_idle=0)
+    store.capture("a", context)
+    store.capture("b", context)
+    assert [path.name for path in store.entries()] == ["b"]
+
+
+def test_provider_clones_snapshot_into_private_workspace(tmp_path, context):
+    store = SnapshotStore(tmp_path / "snapshots", mode="hardlink")
+    preparer = Mock()
+    preparer.prepare.return_value = context
+    job = SimpleNamespace(id="1", issue_url=ISSUE_URL)
+
+    first = GitHubContextProvider(preparer, snapshots=store).prepare_context(job)
+    assert first is context and store.get(store.key(ISSUE_URL)) is not None
+
+    workspace = tmp_path / "hedge"
+    retry = GitHubContextProvider(preparer, workspace_dir=str(workspace), snapshots=store).prepare_context(job)
+    assert retry.repo_path == str(workspace / "snapshot")
+    assert preparer.prepare.call_count == 1